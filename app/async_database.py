@@ -0,0 +1,79 @@
+"""Async access to a storage backend"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from app.exceptions import ServiceUnavailableException
+from app.repository import Repository
+
+class AsyncRepository:
+    """Awaitable wrapper exposing every Repository method as a coroutine
+
+    Backends that block (``repository.blocking``) run on a bounded thread
+    pool, so a slow query only delays the request that issued it. At most
+    ``max_workers`` calls run at once, at most ``max_pending`` may be queued
+    or running before new calls are rejected, and each call fails with a
+    503 if it has not completed within ``timeout`` seconds. Non-blocking
+    backends such as the in-memory store are called inline. Backends that
+    are not ``thread_safe`` get a single worker thread.
+    """
+
+    def __init__(self, repository: Repository, max_workers: int = 8,
+                 max_pending: int = 64, timeout: Optional[float] = 5.0):
+        self.repository = repository
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.repository, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a storage call without blocking the event loop"""
+        if not self.repository.blocking:
+            return fn(*args, **kwargs)
+
+        if self.pending >= self.max_pending:
+            raise ServiceUnavailableException("Storage is overloaded, please retry", "STORAGE_OVERLOADED")
+
+        if self._executor is None:
+            workers = self.max_workers if self.repository.thread_safe else 1
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        work = self._executor.submit(fn, *args, **kwargs)
+        # A timed-out call keeps its slot until the worker thread really finishes
+        work.add_done_callback(functools.partial(self._on_done, loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(work), self.timeout)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailableException("Storage request timed out", "STORAGE_TIMEOUT")
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, _) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop that issued the call has already closed
+            self._release()
+
+    def _release(self) -> None:
+        self.pending -= 1
+
+    def close(self) -> None:
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,112 @@
+"""Bounded LRU cache of serialised task list responses"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+from app.config import settings
+from app.records import TaskRecord
+
+# Rough per-entry cost of the key, ETag and bookkeeping, counted against the budget
+ENTRY_OVERHEAD = 256
+
+class ResponseCache:
+    """LRU of encoded list pages, keyed by user and query, within a byte budget
+
+    Entries remember the ETag they were encoded under and only hit while the
+    caller's current ETag matches, so a page is never served after its
+    user's collection changed, even when the write happened elsewhere.
+    Writes seen through ``on_task_write`` (a Repository listener) also drop
+    the writer's entries right away so stale pages do not hold memory.
+    Safe to use from storage worker threads.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[str, bytes]]" = OrderedDict()
+        self._user_keys: Dict[int, Set[Tuple[int, Hashable]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, user_id: int, query: Hashable, etag: str) -> Optional[bytes]:
+        """Return the cached body for a page if it was encoded under etag"""
+        key = (user_id, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: int, query: Hashable, etag: str, body: bytes) -> None:
+        """Store an encoded page, evicting least recently used pages to fit"""
+        size = len(body) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        key = (user_id, query)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (etag, body)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached page of a user"""
+        with self._lock:
+            keys = self._user_keys.pop(user_id, ())
+            for key in keys:
+                _, body = self._entries.pop(key)
+                self.bytes -= len(body) + ENTRY_OVERHEAD
+            self.invalidations += len(keys)
+
+    def on_task_write(self, event: str, task: TaskRecord) -> None:
+        """Repository listener: a user's pages are stale once any of their tasks changes"""
+        self.invalidate_user(task.user_id)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _discard(self, key: Tuple[int, Hashable]) -> None:
+        """Remove one entry (lock held)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= len(entry[1]) + ENTRY_OVERHEAD
+        user_keys = self._user_keys.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._user_keys[key[0]]
+
+# Shared cache for GET /tasks pages
+list_cache = ResponseCache(settings.LIST_CACHE_MAX_BYTES)
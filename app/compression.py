@@ -0,0 +1,193 @@
+"""Negotiated gzip/brotli response compression"""
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.etags import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+})
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether a media type is worth compressing"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "text/event-stream":
+        # Events must reach the client as soon as they are sent
+        return False
+    return (
+        media_type in COMPRESSIBLE_TYPES
+        or media_type.startswith("text/")
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, or None for identity"""
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    # On a tie brotli wins, it compresses smaller
+    for coding in available:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+class _Encoder:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self._compress = self._compressor.compress
+        self.encoding = encoding
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress data and flush it so the client can decode it right away"""
+        if self.encoding == "br":
+            return self._compress(data) + self._compressor.flush()
+        return self._compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last data and end the stream"""
+        if self.encoding == "br":
+            return self._compress(data) + self._compressor.finish()
+        return self._compress(data) + self._compressor.flush()
+
+class CompressionMiddleware:
+    """Compress responses with the best encoding the client accepts
+
+    Complete bodies are compressed only from ``minimum_size`` bytes;
+    streamed bodies are compressed chunk by chunk as they are sent, without
+    buffering, unless a Content-Length below the threshold is declared.
+    Only compressible media types without a Content-Encoding are touched.
+    Strong ETags of compressed bodies get an encoding suffix (see
+    ``encoded_etag``), and so do those of 304s the client asked with one.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        # HEAD responses declare the length of a body they do not carry
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, encoding, send, headers.get("if-none-match")))
+
+class _CompressingSend:
+    """ASGI send wrapper deciding per response whether to compress"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send,
+                 if_none_match: Optional[str] = None):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.if_none_match = if_none_match
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            await self._send_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is not None:
+            data = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+            if data or not more_body:
+                await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        if not self._should_compress(headers, body, more_body):
+            if self.start["status"] == 304:
+                self._revalidated_etag(headers)
+            self.passthrough = True
+            self.start["headers"] = headers.raw
+            await self._send_start()
+            await self.send(message)
+            return
+
+        middleware = self.middleware
+        self.encoder = _Encoder(self.encoding, middleware.gzip_level, middleware.brotli_quality)
+        headers["Content-Encoding"] = self.encoding
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        if more_body:
+            del headers["Content-Length"]
+            data = self.encoder.chunk(body)
+        else:
+            data = self.encoder.finish(body)
+            headers["Content-Length"] = str(len(data))
+        self.start["headers"] = headers.raw
+        await self._send_start()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        """Decide from the first body message"""
+        status_code = self.start["status"]
+        if status_code < 200 or status_code in (204, 304) or "content-encoding" in headers:
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+        # Compressed or not, the representation depends on Accept-Encoding
+        headers.add_vary_header("Accept-Encoding")
+        declared = headers.get("content-length")
+        if declared is not None and declared.isdigit():
+            return int(declared) >= self.middleware.minimum_size
+        return more_body or len(body) >= self.middleware.minimum_size
+
+    def _revalidated_etag(self, headers: MutableHeaders) -> None:
+        """Give a 304 the tag the client cached, when that was the compressed one"""
+        if "etag" not in headers or not self.if_none_match:
+            return
+        etag = encoded_etag(headers["etag"], self.encoding)
+        if etag in (candidate.strip() for candidate in self.if_none_match.split(",")):
+            headers["ETag"] = etag
+
+    async def _send_start(self) -> None:
+        """Send the held response start once"""
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self.send(start)
@@ -1,5 +1,6 @@
 """Configuration settings for the Task API"""
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,15 +12,67 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "change-this-secret-key-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Password for the "admin" account created at startup; unset, none is created
+    ADMIN_PASSWORD: Optional[str] = os.getenv("ADMIN_PASSWORD") or None
     
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+    REDIS_TIMEOUT_SECONDS: float = float(os.getenv("REDIS_TIMEOUT_SECONDS", "0.25"))
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    # fixed, sliding or token_bucket; the bucket refills RATE_LIMIT_PER_MINUTE
+    # a minute and holds RATE_LIMIT_BURST (0: RATE_LIMIT_PER_MINUTE)
+    RATE_LIMIT_ALGORITHM: str = os.getenv("RATE_LIMIT_ALGORITHM", "fixed")
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "0"))
+    # Hits each worker leases per client from Redis (0 disables leasing),
+    # how long a lease lasts and how many clients hold one
+    RATE_LIMIT_LEASE_SIZE: int = int(os.getenv("RATE_LIMIT_LEASE_SIZE", "0"))
+    RATE_LIMIT_LEASE_SECONDS: float = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "1"))
+    RATE_LIMIT_LEASE_KEYS: int = int(os.getenv("RATE_LIMIT_LEASE_KEYS", "10000"))
+    # In-process limiter used while Redis is down: clients it tracks, and
+    # how long it waits after a Redis failure before trying Redis again
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "100000"))
+    RATE_LIMIT_REDIS_RETRY_SECONDS: float = float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", "5"))
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./tasks.db")
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "4"))
+    DATABASE_MAX_WORKERS: int = int(os.getenv("DATABASE_MAX_WORKERS", "8"))
+    DATABASE_MAX_PENDING: int = int(os.getenv("DATABASE_MAX_PENDING", "64"))
+    DATABASE_TIMEOUT_SECONDS: float = float(os.getenv("DATABASE_TIMEOUT_SECONDS", "5"))
+    
+    # Journal (journal:// databases): always, batch or off
+    JOURNAL_FSYNC: str = os.getenv("JOURNAL_FSYNC", "batch")
+    JOURNAL_FSYNC_INTERVAL_MS: int = int(os.getenv("JOURNAL_FSYNC_INTERVAL_MS", "10"))
+    JOURNAL_SNAPSHOT_EVERY: int = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "100000"))
+    
+    # How long deleted tasks stay visible to GET /tasks/changes (default 30 days)
+    TOMBSTONE_RETENTION_SECONDS: int = int(os.getenv("TOMBSTONE_RETENTION_SECONDS", str(30 * 24 * 3600)))
+    
+    # Cache of encoded GET /tasks pages (0 disables it)
+    LIST_CACHE_MAX_BYTES: int = int(os.getenv("LIST_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    
+    # Response compression (gzip, and brotli when installed)
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    
+    # Task event feed (GET /tasks/events); slow consumers: disconnect or drop
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+    EVENTS_REPLAY_SIZE: int = int(os.getenv("EVENTS_REPLAY_SIZE", "10000"))
+    EVENTS_SLOW_CONSUMER: str = os.getenv("EVENTS_SLOW_CONSUMER", "disconnect")
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    
+    # Batch endpoints
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "500"))
+    
+    # Bulk import (POST /tasks/import)
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    IMPORT_MAX_RECORD_BYTES: int = int(os.getenv("IMPORT_MAX_RECORD_BYTES", str(64 * 1024)))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+    IMPORT_HISTORY: int = int(os.getenv("IMPORT_HISTORY", "20"))
     
     # API
     API_V1_PREFIX: str = "/api/v1"
@@ -1,46 +1,76 @@
-"""In-memory database for simplicity"""
-from typing import Dict, List, Optional
-from datetime import datetime
-from app.models import User, Task, UserRole, TaskStatus
+"""In-memory database and backend selection"""
+import logging
+import secrets
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from app.auth import hash_password
+from app.config import settings
+from app.indexes import SortedIndex
+from app.models import UserRole, TaskStatus
+from app.records import TaskRecord, TaskTombstone, UserRecord, now_us
+from app.search import SearchIndex
+from app.repository import (
+    Repository, SORT_FIELDS, UPDATABLE_TASK_FIELDS, TASK_CREATED, TASK_UPDATED, TASK_DELETED,
+    TaskChange, change_key, parse_sort
+)
+
+# Ordered indexes: the public sort fields plus task ID for scans
+INDEXED_FIELDS = SORT_FIELDS + ("id",)
 
-class Database:
+class Database(Repository):
     """Simple in-memory database"""
     
+    # Pure dict operations, safe to call on the event loop
+    blocking = False
+    
     def __init__(self):
-        self.users: Dict[int, Dict] = {}
-        self.tasks: Dict[int, Dict] = {}
+        self.users: Dict[int, UserRecord] = {}
+        self.tasks: Dict[int, TaskRecord] = {}
         self.user_id_counter = 1
         self.task_id_counter = 1
         self.username_index: Dict[str, int] = {}
         self.email_index: Dict[str, int] = {}
+        # Secondary task indexes: user_id -> {task_id: task} and
+        # (user_id, status) -> {task_id: task}, kept in insertion order
+        self.user_tasks_index: Dict[int, Dict[int, TaskRecord]] = {}
+        self.user_status_index: Dict[Tuple[int, TaskStatus], Dict[int, TaskRecord]] = {}
+        # Tasks per status across all users; per-user counts are the sizes
+        # of the user_status_index buckets
+        self.status_counts: Dict[TaskStatus, int] = dict.fromkeys(TaskStatus, 0)
+        # Ordered (value, task_id) indexes per (user_id, status or None, field in INDEXED_FIELDS).
+        # Built on first use and maintained incrementally afterwards.
+        self.sort_indexes: Dict[Tuple[int, Optional[TaskStatus], str], SortedIndex] = {}
+        # user_id -> full-text index of the user's tasks, also built on first use
+        self.search_indexes: Dict[int, SearchIndex] = {}
+        # user_id -> ordered (deleted_ts, task_id) of the user's tombstones,
+        # and every tombstone in deletion order for purging
+        self.tombstones: Dict[int, SortedIndex] = {}
+        self.tombstone_log: Deque[TaskTombstone] = deque()
+        # user_id -> version of the user's task collection. Versions restart
+        # with the process, so ETags carry a per-instance salt.
+        self.collection_versions: Dict[int, int] = {}
+        self.etag_salt = secrets.token_hex(4)
+        # Latest updated/deleted time handed out; see _write_ts
+        self.last_write_ts = 0
     
     # User operations
-    def create_user(self, email: str, username: str, hashed_password: str, role: UserRole = UserRole.USER) -> Dict:
+    def create_user(self, email: str, username: str, hashed_password: str, role: UserRole = UserRole.USER) -> UserRecord:
         """Create a new user"""
         user_id = self.user_id_counter
         self.user_id_counter += 1
         
-        user = {
-            "id": user_id,
-            "email": email,
-            "username": username,
-            "hashed_password": hashed_password,
-            "role": role,
-            "created_at": datetime.utcnow()
-        }
-        
-        self.users[user_id] = user
-        self.username_index[username] = user_id
-        self.email_index[email] = user_id
-        
+        user = UserRecord(user_id, email, username, hashed_password, UserRole(role), now_us())
+        self._store_user(user)
         return user
     
-    def get_user_by_username(self, username: str) -> Optional[Dict]:
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
         """Get user by username"""
         user_id = self.username_index.get(username)
         return self.users.get(user_id) if user_id else None
     
-    def get_user_by_id(self, user_id: int) -> Optional[Dict]:
+    def get_user_by_id(self, user_id: int) -> Optional[UserRecord]:
         """Get user by ID"""
         return self.users.get(user_id)
     
@@ -53,87 +83,406 @@ class Database:
         return email in self.email_index
     
     # Task operations
-    def create_task(self, user_id: int, title: str, description: Optional[str], status: TaskStatus) -> Dict:
+    def create_task(self, user_id: int, title: str, description: Optional[str], status: TaskStatus) -> TaskRecord:
         """Create a new task"""
-        task_id = self.task_id_counter
-        self.task_id_counter += 1
+        task_id = self._next_task_id()
+        now = self._write_ts()
+        task = TaskRecord(task_id, user_id, title, description, TaskStatus(status), now, now)
+        self._store_task(task)
+        self._notify(TASK_CREATED, task)
+        return task
+    
+    def create_tasks(self, user_id: int, tasks: List[Dict[str, Any]]) -> List[TaskRecord]:
+        """Create several tasks, updating each index once for the whole batch"""
+        if not tasks:
+            return []
+        now = self._write_ts()
+        created = []
+        user_bucket = self.user_tasks_index.setdefault(user_id, {})
+        for fields in tasks:
+            status = TaskStatus(fields.get("status") or TaskStatus.TODO)
+            task = TaskRecord(self._next_task_id(), user_id, fields["title"], fields.get("description"), status, now, now)
+            self.tasks[task.id] = task
+            user_bucket[task.id] = task
+            self.user_status_index.setdefault((user_id, status), {})[task.id] = task
+            self.status_counts[status] += 1
+            created.append(task)
         
-        now = datetime.utcnow()
-        task = {
-            "id": task_id,
-            "user_id": user_id,
-            "title": title,
-            "description": description,
-            "status": status,
-            "created_at": now,
-            "updated_at": now
-        }
+        # One merge per materialised ordered index instead of an insert per task
+        if self.sort_indexes:
+            for field in INDEXED_FIELDS:
+                for scope in (None, *TaskStatus):
+                    index = self.sort_indexes.get((user_id, scope, field))
+                    if index is not None:
+                        index.update(
+                            self._sort_key(task, field) for task in created if scope is None or task.status is scope
+                        )
+        search_index = self.search_indexes.get(user_id)
+        if search_index is not None:
+            for task in created:
+                search_index.add(task)
+        self._bump_collection(user_id)
         
-        self.tasks[task_id] = task
-        return task
+        for task in created:
+            self._notify(TASK_CREATED, task)
+        return created
     
-    def get_task(self, task_id: int) -> Optional[Dict]:
+    def get_task(self, task_id: int) -> Optional[TaskRecord]:
         """Get task by ID"""
         return self.tasks.get(task_id)
     
     def get_user_tasks(self, user_id: int, skip: int = 0, limit: int = 100, 
-                       status: Optional[TaskStatus] = None, sort_by: str = "created_at") -> List[Dict]:
-        """Get tasks for a user with filtering and pagination"""
-        user_tasks = [t for t in self.tasks.values() if t["user_id"] == user_id]
-        
-        # Filter by status
-        if status:
-            user_tasks = [t for t in user_tasks if t["status"] == status]
+                       status: Optional[TaskStatus] = None, sort_by: str = "created_at",
+                       after: Optional[Tuple[Any, int]] = None) -> List[TaskRecord]:
+        """Get tasks for a user with filtering and pagination
         
-        # Sort
-        reverse = True
-        if sort_by.startswith("-"):
-            sort_by = sort_by[1:]
-            reverse = False
-        
-        user_tasks.sort(key=lambda x: x.get(sort_by, ""), reverse=reverse)
-        
-        # Paginate
-        return user_tasks[skip:skip + limit]
+        Ties on the sort field are broken by task ID in the same direction.
+        When ``after`` is a (sort value, task ID) key, the page starts right
+        after that key (keyset pagination) instead of at ``skip``.
+        """
+        field, descending = parse_sort(sort_by)
+        index = self._sort_index(user_id, status, field)
+        if after is not None:
+            keys = index.page_after(after, limit, reverse=descending)
+        else:
+            keys = index.page(skip, limit, reverse=descending)
+        return [self.tasks[key[1]] for key in keys]
     
     def count_user_tasks(self, user_id: int, status: Optional[TaskStatus] = None) -> int:
         """Count user tasks"""
-        user_tasks = [t for t in self.tasks.values() if t["user_id"] == user_id]
-        if status:
-            user_tasks = [t for t in user_tasks if t["status"] == status]
-        return len(user_tasks)
+        return len(self._user_task_bucket(user_id, status))
+    
+    def count_tasks_by_status(self, user_id: Optional[int] = None) -> Dict[TaskStatus, int]:
+        """Count tasks per status, for one user or all"""
+        if user_id is None:
+            return dict(self.status_counts)
+        index = self.user_status_index
+        return {status: len(index.get((user_id, status), ())) for status in TaskStatus}
     
-    def update_task(self, task_id: int, **kwargs) -> Optional[Dict]:
+    def count_tasks_by_user(self) -> Dict[int, Dict[TaskStatus, int]]:
+        """Per-status task counts of every user with tasks"""
+        return {user_id: self.count_tasks_by_status(user_id) for user_id in sorted(self.user_tasks_index)}
+    
+    def update_task(self, task_id: int, expected_version: Optional[int] = None, **kwargs) -> Optional[TaskRecord]:
         """Update a task"""
         task = self.tasks.get(task_id)
-        if not task:
+        if not task or (expected_version is not None and task.version != expected_version):
             return None
         
-        for key, value in kwargs.items():
-            if value is not None:
-                task[key] = value
-        
-        task["updated_at"] = datetime.utcnow()
+        self._apply_update(task, kwargs, self._write_ts())
+        self._notify(TASK_UPDATED, task)
         return task
     
-    def delete_task(self, task_id: int) -> bool:
+    def delete_task(self, task_id: int, expected_version: Optional[int] = None) -> bool:
         """Delete a task"""
-        if task_id in self.tasks:
-            del self.tasks[task_id]
-            return True
-        return False
+        task = self.tasks.get(task_id)
+        if task is None or (expected_version is not None and task.version != expected_version):
+            return False
+        self._remove_task(task, self._write_ts())
+        self._notify(TASK_DELETED, task)
+        return True
+    
+    def get_task_version(self, task_id: int) -> Optional[Tuple[int, int]]:
+        """Get (owner user ID, version) of a task"""
+        task = self.tasks.get(task_id)
+        return (task.user_id, task.version) if task else None
+    
+    def get_collection_version(self, user_id: int) -> int:
+        """Get the version of a user's task collection"""
+        return self.collection_versions.get(user_id, 0)
+    
+    def get_changes(self, user_id: int, after: Tuple[int, int], limit: int = 100) -> Optional[List[TaskChange]]:
+        """Get a user's task changes after a position in their change order"""
+        if after[0] < now_us() - self.tombstone_retention_us:
+            return None
+        # Both indexes hold (time, task ID) keys, so one page of each covers the merged page
+        keys = self._sort_index(user_id, None, "updated_at").page_after(after, limit)
+        changes: List[TaskChange] = [self.tasks[task_id] for _, task_id in keys]
+        tombstones = self.tombstones.get(user_id)
+        if tombstones is not None:
+            changes.extend(
+                TaskTombstone(task_id, user_id, deleted_ts)
+                for deleted_ts, task_id in tombstones.page_after(after, limit)
+            )
+            changes.sort(key=change_key)
+        return changes[:limit]
     
-    def get_all_tasks(self) -> List[Dict]:
+    def search_tasks(self, user_id: int, query: str, skip: int = 0, limit: int = 20) -> Tuple[List[TaskRecord], int]:
+        """Full-text search over a user's task titles and descriptions"""
+        index = self.search_indexes.get(user_id)
+        if index is None:
+            index = SearchIndex(self._user_task_bucket(user_id).values())
+            self.search_indexes[user_id] = index
+        task_ids, total = index.search(query, skip, limit)
+        return [self.tasks[task_id] for task_id in task_ids], total
+    
+    def get_all_tasks(self) -> List[TaskRecord]:
         """Get all tasks (admin only)"""
         return list(self.tasks.values())
+    
+    def scan_tasks(self, after_id: int = 0, limit: int = 1000, status: Optional[TaskStatus] = None,
+                   user_id: Optional[int] = None, created_after: Optional[int] = None) -> List[TaskRecord]:
+        """Get the next batch of tasks in ID order (admin only)"""
+        if user_id is not None:
+            task_ids = self._ids_after(self._sort_index(user_id, status, "id"), after_id, limit)
+        else:
+            # IDs are allocated in increasing order, so walk the range
+            task_ids = self._task_ids_after(after_id)
+        
+        status = TaskStatus(status) if status else None
+        batch = []
+        for task_id in task_ids:
+            task = self.tasks.get(task_id)
+            if task is None or (status and task.status is not status):
+                continue
+            if created_after is not None and task.created_ts <= created_after:
+                continue
+            batch.append(task)
+            if len(batch) >= limit:
+                break
+        return batch
+    
+    # ID and timestamp allocation
+    def _next_task_id(self) -> int:
+        """Allocate the next task ID"""
+        task_id = self.task_id_counter
+        self.task_id_counter += 1
+        return task_id
+    
+    def _task_ids_after(self, after_id: int) -> Iterable[int]:
+        """Every task ID this store may have allocated after after_id, in order"""
+        return range(after_id + 1, self.task_id_counter)
+    
+    def _write_ts(self) -> int:
+        """Current time for a task write, strictly after every earlier write
+        
+        A change feed position (time, task ID) then never has a later write
+        sorting before it, even within one microsecond or if the clock steps back.
+        """
+        now = max(now_us(), self.last_write_ts + 1)
+        self.last_write_ts = now
+        return now
+    
+    # Record storage, shared by the public operations and journal replay
+    def _store_user(self, user: UserRecord) -> None:
+        """Store a user with a preassigned ID"""
+        self.users[user.id] = user
+        self.username_index[user.username] = user.id
+        self.email_index[user.email] = user.id
+        self.user_id_counter = max(self.user_id_counter, user.id + 1)
+    
+    def _store_task(self, task: TaskRecord) -> None:
+        """Store and index a task with a preassigned ID"""
+        self.tasks[task.id] = task
+        self._index_task(task)
+        self._bump_collection(task.user_id)
+        self.task_id_counter = max(self.task_id_counter, task.id + 1)
+    
+    def _remove_task(self, task: TaskRecord, deleted_ts: int) -> None:
+        """Remove a stored task, leaving a tombstone"""
+        del self.tasks[task.id]
+        self._unindex_task(task)
+        self._purge_tombstones(now_us())
+        self._store_tombstone(TaskTombstone(task.id, task.user_id, deleted_ts))
+        self._bump_collection(task.user_id)
+    
+    def _store_tombstone(self, tombstone: TaskTombstone) -> None:
+        """Record a deleted task for get_changes"""
+        index = self.tombstones.get(tombstone.user_id)
+        if index is None:
+            index = self.tombstones[tombstone.user_id] = SortedIndex()
+        index.add((tombstone.deleted_ts, tombstone.id))
+        self.tombstone_log.append(tombstone)
+    
+    def _purge_tombstones(self, now: int) -> None:
+        """Forget tombstones older than the retention window"""
+        cutoff = now - self.tombstone_retention_us
+        log = self.tombstone_log
+        while log and log[0].deleted_ts < cutoff:
+            tombstone = log.popleft()
+            index = self.tombstones[tombstone.user_id]
+            index.discard((tombstone.deleted_ts, tombstone.id))
+            if not index:
+                del self.tombstones[tombstone.user_id]
+    
+    def _apply_update(self, task: TaskRecord, changes: Dict[str, Any], updated_ts: int) -> None:
+        """Apply the non-None UPDATABLE_TASK_FIELDS in changes and reindex the task"""
+        self._unindex_sorted(task)
+        # Text changes move the task in its user's full-text index
+        search_index = None
+        if changes.get("title") is not None or changes.get("description") is not None:
+            search_index = self.search_indexes.get(task.user_id)
+            if search_index is not None:
+                search_index.discard(task)
+        
+        new_status = changes.get("status")
+        if new_status is not None and new_status != task.status:
+            self._unindex_task(task, status_only=True)
+            task.status = TaskStatus(new_status)
+            self._index_task(task, status_only=True)
+        
+        for key in UPDATABLE_TASK_FIELDS:
+            value = changes.get(key)
+            if value is not None and key != "status":
+                setattr(task, key, value)
+        
+        task.updated_ts = updated_ts
+        task.version += 1
+        self._index_sorted(task)
+        if search_index is not None:
+            search_index.add(task)
+        self._bump_collection(task.user_id)
+    
+    def _bump_collection(self, user_id: int) -> None:
+        self.collection_versions[user_id] = self.collection_versions.get(user_id, 0) + 1
+    
+    # Index maintenance
+    def _user_task_bucket(self, user_id: int, status: Optional[TaskStatus] = None) -> Dict[int, TaskRecord]:
+        """Return the indexed tasks of a user, optionally narrowed to one status"""
+        if status:
+            return self.user_status_index.get((user_id, TaskStatus(status)), {})
+        return self.user_tasks_index.get(user_id, {})
+    
+    def _index_task(self, task: TaskRecord, status_only: bool = False) -> None:
+        """Add a task to the user and (user, status) indexes"""
+        if not status_only:
+            self.user_tasks_index.setdefault(task.user_id, {})[task.id] = task
+        self.user_status_index.setdefault((task.user_id, task.status), {})[task.id] = task
+        self.status_counts[task.status] += 1
+        if not status_only:
+            self._index_sorted(task)
+            search_index = self.search_indexes.get(task.user_id)
+            if search_index is not None:
+                search_index.add(task)
+    
+    def _unindex_task(self, task: TaskRecord, status_only: bool = False) -> None:
+        """Remove a task from the user and (user, status) indexes"""
+        task_id = task.id
+        if not status_only:
+            self._unindex_sorted(task)
+            search_index = self.search_indexes.get(task.user_id)
+            if search_index is not None:
+                search_index.discard(task)
+        
+        user_bucket = None if status_only else self.user_tasks_index.get(task.user_id)
+        if user_bucket is not None:
+            user_bucket.pop(task_id, None)
+            if not user_bucket:
+                del self.user_tasks_index[task.user_id]
+        
+        status_key = (task.user_id, task.status)
+        status_bucket = self.user_status_index.get(status_key)
+        if status_bucket is not None and status_bucket.pop(task_id, None) is not None:
+            self.status_counts[task.status] -= 1
+            if not status_bucket:
+                del self.user_status_index[status_key]
+    
+    def _sort_index(self, user_id: int, status: Optional[TaskStatus], field: str) -> SortedIndex:
+        """Return the ordered index for a user's tasks, building it on first use"""
+        status = TaskStatus(status) if status else None
+        key = (user_id, status, field)
+        index = self.sort_indexes.get(key)
+        if index is None:
+            bucket = self._user_task_bucket(user_id, status)
+            index = SortedIndex(self._sort_key(task, field) for task in bucket.values())
+            self.sort_indexes[key] = index
+        return index
+    
+    def _task_sort_indexes(self, task: TaskRecord):
+        """Yield (field, index) for every materialised ordered index covering a task"""
+        user_id = task.user_id
+        status = task.status
+        for field in INDEXED_FIELDS:
+            for scope in (None, status):
+                index = self.sort_indexes.get((user_id, scope, field))
+                if index is not None:
+                    yield field, index
+    
+    def _index_sorted(self, task: TaskRecord) -> None:
+        """Add a task to its materialised ordered indexes"""
+        if not self.sort_indexes:
+            return
+        for field, index in self._task_sort_indexes(task):
+            index.add(self._sort_key(task, field))
+    
+    def _unindex_sorted(self, task: TaskRecord) -> None:
+        """Remove a task from its materialised ordered indexes"""
+        if not self.sort_indexes:
+            return
+        for field, index in self._task_sort_indexes(task):
+            index.discard(self._sort_key(task, field))
+    
+    @staticmethod
+    def _ids_after(index: SortedIndex, after_id: int, chunk: int) -> Iterator[int]:
+        """Iterate task IDs greater than after_id from an ID index"""
+        key = (after_id, after_id)
+        while True:
+            keys = index.page_after(key, chunk)
+            if not keys:
+                return
+            for key in keys:
+                yield key[1]
+    
+    @staticmethod
+    def _sort_key(task: TaskRecord, field: str) -> Tuple[Any, int]:
+        """Ordered index key for a task: (sort value, task ID)"""
+        return (task.sort_value(field), task.id)
+
+logger = logging.getLogger(__name__)
+
+def create_database(url: str) -> Repository:
+    """Create the storage backend selected by a DATABASE_URL
+    
+    ``memory://`` keeps everything in process memory (``memory://?shards=N``
+    partitions it into N locked shards for multi-threaded use), ``journal:///dir``
+    keeps it in memory but journals writes to a directory, ``sqlite:///path``
+    (or ``sqlite:///:memory:``) uses SQLite.
+    """
+    if url.startswith("memory://"):
+        query = parse_qs(urlsplit(url).query)
+        if "shards" in query:
+            from app.sharded_database import ShardedDatabase
+            return ShardedDatabase(int(query["shards"][0]))
+        return Database()
+    if url.startswith("journal:///"):
+        from app.journaled_database import JournaledDatabase
+        return JournaledDatabase(
+            url[len("journal:///"):],
+            fsync=settings.JOURNAL_FSYNC,
+            fsync_interval_ms=settings.JOURNAL_FSYNC_INTERVAL_MS,
+            snapshot_every=settings.JOURNAL_SNAPSHOT_EVERY
+        )
+    if url.startswith("sqlite:///"):
+        from app.sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(url[len("sqlite:///"):], pool_size=settings.DATABASE_POOL_SIZE)
+    raise ValueError(f"Unsupported DATABASE_URL: {url}")
+
+def create_default_admin(database: Repository, password: Optional[str] = None) -> None:
+    """Create the default admin user if it does not exist yet
+    
+    The password defaults to ``settings.ADMIN_PASSWORD``; without one no
+    admin is created.
+    """
+    password = password or settings.ADMIN_PASSWORD
+    if not password:
+        logger.warning("ADMIN_PASSWORD is not set; no default admin account created")
+        return
+    if database.username_exists("admin"):
+        return
+    database.create_user(
+        email="admin@example.com",
+        username="admin",
+        hashed_password=_admin_password_hash(password),
+        role=UserRole.ADMIN
+    )
+
+@lru_cache(maxsize=4)
+def _admin_password_hash(password: str) -> str:
+    # bcrypt is slow on purpose; hash once per process, not once per database
+    return hash_password(password)
 
 # Global database instance
-db = Database()
+db = create_database(settings.DATABASE_URL)
 
 # Create default admin user
-db.create_user(
-    email="admin@example.com",
-    username="admin",
-    hashed_password="$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYG6CJxb4M2",  # "Admin123"
-    role=UserRole.ADMIN
-)
+create_default_admin(db)
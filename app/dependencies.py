@@ -2,11 +2,40 @@
 from fastapi import Depends, Header
 from typing import Optional
 from app.auth import decode_access_token
-from app.database import db
+from app import database
+from app.async_database import AsyncRepository
+from app.cache import list_cache
+from app.config import settings
+from app.events import task_events
 from app.models import User, UserRole
 from app.exceptions import UnauthorizedException, ForbiddenException
 
-async def get_current_user(authorization: Optional[str] = Header(None)) -> User:
+_async_db: Optional[AsyncRepository] = None
+
+def get_db() -> AsyncRepository:
+    """Get the async adapter for the active storage backend"""
+    global _async_db
+    if _async_db is None or _async_db.repository is not database.db:
+        if _async_db is not None:
+            _async_db.repository.remove_listener(list_cache.on_task_write)
+            _async_db.repository.remove_listener(task_events.on_task_write)
+            _async_db.close()
+        # Pages cached from another store are meaningless
+        list_cache.clear()
+        database.db.add_listener(list_cache.on_task_write)
+        database.db.add_listener(task_events.on_task_write)
+        _async_db = AsyncRepository(
+            database.db,
+            max_workers=settings.DATABASE_MAX_WORKERS,
+            max_pending=settings.DATABASE_MAX_PENDING,
+            timeout=settings.DATABASE_TIMEOUT_SECONDS
+        )
+    return _async_db
+
+async def get_current_user(
+    authorization: Optional[str] = Header(None),
+    db: AsyncRepository = Depends(get_db)
+) -> User:
     """Get the current authenticated user"""
     if not authorization:
         raise UnauthorizedException("Missing authorization header")
@@ -24,11 +53,11 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> User:
     if not user_id:
         raise UnauthorizedException("Invalid token payload")
     
-    user_data = db.get_user_by_id(int(user_id))
+    user_data = await db.get_user_by_id(int(user_id))
     if not user_data:
         raise UnauthorizedException("User not found")
     
-    return User(**user_data)
+    return User.model_validate(user_data)
 
 async def require_admin(current_user: User = Depends(get_current_user)) -> User:
     """Require admin role"""
@@ -0,0 +1,64 @@
+"""ETags and conditional request helpers"""
+import zlib
+from typing import Any, Optional, Tuple
+
+# Content codings CompressionMiddleware may apply
+ENCODINGS = ("gzip", "br")
+
+def task_etag(salt: str, task_id: int, version: int, fields: Optional[Tuple[str, ...]] = None) -> str:
+    """ETag of a single task at a version
+
+    A projection (normalized by ``parse_fields``) is a different
+    representation, so its field set goes into the tag.
+    """
+    if fields is None:
+        return f'"{salt}.t{task_id}.v{version}"'
+    fields_hash = zlib.crc32(",".join(fields).encode())
+    return f'"{salt}.t{task_id}.v{version}.f{fields_hash:08x}"'
+
+def collection_etag(salt: str, user_id: int, version: int, *query: Any) -> str:
+    """ETag of a page of a user's tasks
+
+    The page is fully determined by the collection version and the query
+    parameters, so both go into the tag.
+    """
+    query_hash = zlib.crc32(repr(query).encode())
+    return f'"{salt}.u{user_id}.v{version}.{query_hash:08x}"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of a response body compressed with ``encoding``
+
+    Compressed bytes differ from the identity ones, so a strong ETag gets
+    the encoding as a suffix inside its quotes. Weak ETags are kept.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def _strip_encoding(etag: str) -> str:
+    """The identity ETag of one from ``encoded_etag``"""
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Check an If-None-Match (weak) or If-Match (strong) header against an ETag
+
+    Tags of compressed bodies (see ``encoded_etag``) match their identity
+    tag: they name the same task version.
+    """
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag or _strip_encoding(candidate) == etag:
+            return True
+    return False
@@ -0,0 +1,177 @@
+"""In-process pub/sub of task changes for the SSE event feed"""
+import asyncio
+import secrets
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import orjson
+from app.config import settings
+from app.records import TaskRecord
+from app.serialization import task_to_dict
+
+# What to do when a subscriber's queue is full
+DROP = "drop"
+DISCONNECT = "disconnect"
+
+class TaskEvent:
+    """A published task change, encoded once as an SSE frame"""
+
+    __slots__ = ("seq", "user_id", "frame")
+
+    def __init__(self, seq: int, user_id: int, frame: bytes):
+        self.seq = seq
+        self.user_id = user_id
+        self.frame = frame
+
+class Subscription:
+    """One client's bounded queue of events, consumed on its event loop"""
+
+    def __init__(self, broker: "EventBroker", user_id: int, max_queue: int):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Optional[TaskEvent]]" = asyncio.Queue(max_queue)
+        self.dropped = 0
+        self.closed = False
+
+    async def get(self, timeout: float) -> Optional[TaskEvent]:
+        """Next event, or None after timeout seconds or once closed"""
+        if self.closed:
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def take_dropped(self) -> int:
+        """Number of events dropped since the last call"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def _push(self, event: TaskEvent) -> None:
+        """Hand an event to the subscriber's loop (any thread, broker lock held)"""
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # The client's event loop is gone
+            self.closed = True
+
+    def _deliver(self, event: TaskEvent) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.broker._slow_consumer(self)
+
+    def _close(self) -> None:
+        """Stop delivering and wake the consumer (on the subscriber's loop)"""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+class EventBroker:
+    """Fans task writes out to per-user subscribers and keeps a replay buffer
+
+    Subscribe ``on_task_write`` as a Repository listener. Every event gets
+    a sequence number, and its SSE ``id`` is ``<epoch>-<seq>`` where the
+    epoch is random per broker, so IDs from before a restart never resume.
+    The last ``replay_size`` events (all users) are kept so a client that
+    reconnects with ``Last-Event-ID`` receives what it missed; when the
+    events it missed are no longer buffered it is told to resync instead.
+
+    A subscriber whose queue of ``queue_size`` events is full is either
+    disconnected (``disconnect``; it can then resume from the buffer) or
+    has the event dropped and is told how many it missed (``drop``).
+    """
+
+    def __init__(self, replay_size: int = 10_000, queue_size: int = 256, slow_consumer: str = DISCONNECT):
+        if slow_consumer not in (DROP, DISCONNECT):
+            raise ValueError(f"slow_consumer must be '{DROP}' or '{DISCONNECT}'")
+        self.queue_size = queue_size
+        self.slow_consumer = slow_consumer
+        self.epoch = secrets.token_hex(4)
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+        self._seq = 0
+        self._replay: Deque[TaskEvent] = deque(maxlen=replay_size)
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def on_task_write(self, event: str, task: TaskRecord) -> None:
+        """Repository listener: publish the change to the task's owner"""
+        self.publish(event, task)
+
+    def publish(self, event: str, task: TaskRecord) -> None:
+        """Publish a created, updated or deleted event for a task"""
+        # Encode now: the record may change again before anyone reads it
+        data = orjson.dumps(task_to_dict(task))
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            frame = b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (self.epoch.encode(), seq, event.encode(), data)
+            task_event = TaskEvent(seq, task.user_id, frame)
+            self._replay.append(task_event)
+            self.published += 1
+            # Pushed under the lock so every subscriber sees events in order
+            for subscription in self._subscribers.get(task.user_id, ()):
+                subscription._push(task_event)
+
+    def subscribe(self, user_id: int, last_event_id: Optional[str] = None) -> Tuple[Subscription, Optional[List[TaskEvent]]]:
+        """Subscribe to a user's events (call on the consumer's event loop)
+
+        Returns the subscription and the buffered events after
+        ``last_event_id`` for the user, or None for the events when some of
+        them are no longer buffered and the client has to resync.
+        """
+        with self._lock:
+            subscription = Subscription(self, user_id, self.queue_size)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            return subscription, self._events_after(user_id, last_event_id)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to a subscription"""
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring the feed"""
+        with self._lock:
+            return {
+                "subscribers": sum(len(subscriptions) for subscriptions in self._subscribers.values()),
+                "published": self.published,
+                "buffered": len(self._replay),
+                "dropped": self.dropped,
+                "disconnected": self.disconnected,
+            }
+
+    def _events_after(self, user_id: int, last_event_id: Optional[str]) -> Optional[List[TaskEvent]]:
+        """Buffered events of a user after an SSE id (lock held)"""
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.strip().rpartition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        after = int(seq)
+        oldest = self._replay[0].seq if self._replay else self._seq + 1
+        if after < oldest - 1:
+            return None
+        return [event for event in self._replay if event.seq > after and event.user_id == user_id]
+
+    def _slow_consumer(self, subscription: Subscription) -> None:
+        """Apply the slow consumer policy to a full subscription"""
+        if self.slow_consumer == DROP:
+            subscription.dropped += 1
+            self.dropped += 1
+        else:
+            subscription._close()
+            self.disconnected += 1
+
+# Shared broker for GET /tasks/events
+task_events = EventBroker(settings.EVENTS_REPLAY_SIZE, settings.EVENTS_QUEUE_SIZE, settings.EVENTS_SLOW_CONSUMER)
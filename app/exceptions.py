@@ -29,8 +29,23 @@ class NotFoundException(APIException):
     def __init__(self, detail: str = "Resource not found", error_code: str = "NOT_FOUND"):
         super().__init__(404, detail, error_code)
 
+class GoneException(APIException):
+    """410 Gone"""
+    def __init__(self, detail: str = "Resource is no longer available", error_code: str = "GONE"):
+        super().__init__(410, detail, error_code)
+
 class TooManyRequestsException(APIException):
     """429 Too Many Requests"""
     def __init__(self, detail: str = "Rate limit exceeded", error_code: str = "RATE_LIMIT_EXCEEDED", retry_after: int = 60):
         super().__init__(429, detail, error_code)
         self.retry_after = retry_after
+
+class ServiceUnavailableException(APIException):
+    """503 Service Unavailable"""
+    def __init__(self, detail: str = "Service temporarily unavailable", error_code: str = "SERVICE_UNAVAILABLE"):
+        super().__init__(503, detail, error_code)
+
+class PreconditionFailedException(APIException):
+    """412 Precondition Failed"""
+    def __init__(self, detail: str = "Resource has been modified", error_code: str = "PRECONDITION_FAILED"):
+        super().__init__(412, detail, error_code)
@@ -0,0 +1,273 @@
+"""Incremental parsing, validation and progress of bulk task imports"""
+import csv
+import secrets
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import orjson
+from pydantic import ValidationError
+from app.config import settings
+from app.models import TaskCreate
+from app.records import now_us, us_to_datetime
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+# CSV columns an import understands; others are ignored
+CSV_COLUMNS = ("title", "description", "status", "user_id")
+
+def validation_message(error: ValidationError) -> str:
+    """One-line summary of a pydantic validation error"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'item'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+class RecordSplitter:
+    """Splits a byte stream into records as the bytes arrive
+
+    A record is a line, or for CSV as many lines as it takes to close its
+    quoted fields. Yields (first line number, record) for each complete
+    record, with None instead of the record when it exceeded
+    ``max_record_bytes``: those bytes are skipped, never buffered.
+    """
+
+    def __init__(self, csv_quotes: bool, max_record_bytes: int):
+        self.csv_quotes = csv_quotes
+        self.max_record_bytes = max_record_bytes
+        self._partial = b""
+        self._lines: List[bytes] = []
+        self._size = 0
+        self._quotes = 0
+        self._oversized = False
+        self._line = 0
+        self._first_line = 0
+
+    def feed(self, data: bytes) -> Iterator[Tuple[int, Optional[bytes]]]:
+        """Consume the next bytes, yielding the records they complete"""
+        buffer = self._partial + data if self._partial else data
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            yield from self._end_line(buffer[start:end])
+            start = end + 1
+        self._partial = buffer[start:]
+        if not self._oversized and self._size + len(self._partial) > self.max_record_bytes:
+            self._skip_record(self._line + 1)
+        if self._oversized:
+            self._count_quotes(self._partial)
+            self._partial = b""
+
+    def finish(self) -> Iterator[Tuple[int, Optional[bytes]]]:
+        """Yield the last record, closing it if the stream ended inside it"""
+        if self._partial or self._lines or self._oversized:
+            yield from self._end_line(self._partial, last=True)
+            self._partial = b""
+
+    def _end_line(self, line: bytes, last: bool = False) -> Iterator[Tuple[int, Optional[bytes]]]:
+        self._line += 1
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if not self._oversized and self._size + len(line) > self.max_record_bytes:
+            self._skip_record(self._line)
+        self._count_quotes(line)
+        if not self._oversized:
+            if not self._lines:
+                self._first_line = self._line
+            self._lines.append(line)
+            self._size += len(line) + 1
+        if self._quotes % 2 and not last:
+            return
+        record = None if self._oversized else b"\n".join(self._lines)
+        self._lines = []
+        self._size = 0
+        self._quotes = 0
+        self._oversized = False
+        yield self._first_line, record
+
+    def _count_quotes(self, data: bytes) -> None:
+        if self.csv_quotes:
+            self._quotes += data.count(b'"')
+
+    def _skip_record(self, line: int) -> None:
+        """Stop buffering the current record, which has reached ``line``"""
+        if not self._lines:
+            self._first_line = line
+        self._oversized = True
+        self._lines = []
+        self._size = 0
+
+class ImportRow:
+    """One parsed record: a task to create for a user, or why it cannot be"""
+
+    __slots__ = ("line", "user_id", "fields", "error")
+
+    def __init__(self, line: int, user_id: Optional[int] = None, fields: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None):
+        self.line = line
+        self.user_id = user_id
+        self.fields = fields
+        self.error = error
+
+class TaskImportParser:
+    """Parses and validates a streamed NDJSON or CSV import, record by record
+
+    NDJSON lines are objects and CSV files start with a header row; both
+    use the ``CSV_COLUMNS`` fields and ignore any others (so an NDJSON
+    admin dump imports as is). Rows without a ``user_id`` belong to
+    ``default_user_id``. Blank records are skipped. Raises ValueError when
+    the CSV header is malformed or has no ``title`` column.
+    """
+
+    def __init__(self, import_format: str, default_user_id: int,
+                 max_record_bytes: int = settings.IMPORT_MAX_RECORD_BYTES):
+        if import_format not in (NDJSON, CSV):
+            raise ValueError(f"Unknown import format '{import_format}'")
+        self.format = import_format
+        self.default_user_id = default_user_id
+        self.columns: Optional[List[str]] = None
+        self._splitter = RecordSplitter(import_format == CSV, max_record_bytes)
+
+    def feed(self, data: bytes) -> List[ImportRow]:
+        """Parse the records completed by the next bytes of the body"""
+        return self._parse(self._splitter.feed(data))
+
+    def finish(self) -> List[ImportRow]:
+        """Parse what is left once the body has ended"""
+        return self._parse(self._splitter.finish())
+
+    def _parse(self, records: Iterator[Tuple[int, Optional[bytes]]]) -> List[ImportRow]:
+        rows = []
+        for line, record in records:
+            if record is None:
+                if self.format == CSV and self.columns is None:
+                    raise ValueError("CSV header is too long")
+                rows.append(ImportRow(line, error=f"Record exceeds {self._splitter.max_record_bytes} bytes"))
+                continue
+            if not record.strip():
+                continue
+            if self.format == CSV and self.columns is None:
+                # A bad header fails the whole import
+                self._read_header(record)
+                continue
+            try:
+                raw = self._decode(record)
+            except ValueError as e:
+                rows.append(ImportRow(line, error=str(e)))
+                continue
+            rows.append(self._validate(line, raw))
+        return rows
+
+    def _read_header(self, record: bytes) -> None:
+        columns = [value.strip().lstrip("\ufeff").lower() for value in _csv_values(record)]
+        if "title" not in columns:
+            raise ValueError("CSV header must have a title column")
+        self.columns = columns
+
+    def _decode(self, record: bytes) -> Dict[str, Any]:
+        """Raw fields of a record"""
+        if self.format == NDJSON:
+            try:
+                raw = orjson.loads(record)
+            except orjson.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON: {e}")
+            if not isinstance(raw, dict):
+                raise ValueError("Expected a JSON object")
+            return raw
+
+        values = _csv_values(record)
+        if len(values) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} CSV fields, got {len(values)}")
+        # Empty CSV fields mean "not given"
+        return {
+            column: value for column, value in zip(self.columns, values)
+            if column in CSV_COLUMNS and value != ""
+        }
+
+    def _validate(self, line: int, raw: Dict[str, Any]) -> ImportRow:
+        user_id = raw.get("user_id", self.default_user_id)
+        if isinstance(user_id, str) and user_id.strip().isdigit():
+            user_id = int(user_id)
+        if type(user_id) is not int or user_id < 1:
+            return ImportRow(line, error="user_id: must be a positive integer")
+        try:
+            task = TaskCreate.model_validate(
+                {key: raw[key] for key in ("title", "description", "status") if key in raw}
+            )
+        except ValidationError as e:
+            return ImportRow(line, error=validation_message(e))
+        return ImportRow(line, user_id, task.model_dump())
+
+def _csv_values(record: bytes) -> List[str]:
+    try:
+        return next(csv.reader([record.decode()], strict=True))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"Invalid CSV: {e}")
+
+class ImportJob:
+    """Progress of one import, readable while it runs"""
+
+    def __init__(self, import_format: str, admin_id: int, max_errors: int):
+        self.id = secrets.token_hex(8)
+        self.format = import_format
+        self.admin_id = admin_id
+        self.state = "running"
+        self.started_ts = now_us()
+        self.finished_ts: Optional[int] = None
+        self.records = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.max_errors = max_errors
+        self.detail: Optional[str] = None
+
+    def record_error(self, line: int, message: str) -> None:
+        """Count a rejected record, keeping the first ``max_errors`` messages"""
+        self.records += 1
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def record_imported(self, count: int) -> None:
+        self.records += count
+        self.imported += count
+
+    def finish(self, state: str = "completed", detail: Optional[str] = None) -> None:
+        self.state = state
+        self.detail = detail
+        self.finished_ts = now_us()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.format,
+            "state": self.state,
+            "detail": self.detail,
+            "started_at": us_to_datetime(self.started_ts),
+            "finished_at": us_to_datetime(self.finished_ts) if self.finished_ts else None,
+            "records": self.records,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+class ImportRegistry:
+    """The running and most recent imports of this process"""
+
+    def __init__(self, history: int = 20, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self._jobs: Deque[ImportJob] = deque(maxlen=history)
+
+    def start(self, import_format: str, admin_id: int) -> ImportJob:
+        job = ImportJob(import_format, admin_id, self.max_errors)
+        self._jobs.append(job)
+        return job
+
+    def jobs(self) -> List[ImportJob]:
+        """Imports, newest first"""
+        return list(reversed(self._jobs))
+
+# Shared registry behind GET /tasks/imports
+task_imports = ImportRegistry(settings.IMPORT_HISTORY, settings.IMPORT_MAX_ERRORS)
@@ -0,0 +1,163 @@
+"""Ordered in-memory indexes"""
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from typing import Any, Iterable, Iterator, List
+
+class SortedIndex:
+    """Sorted collection of comparable keys stored as a list of bounded chunks
+
+    Inserts and removals touch a single chunk, so they stay cheap as the index
+    grows, and reading a page from either end only visits the chunks it needs.
+    """
+
+    LOAD = 512
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        self._load(sorted(keys))
+
+    def _load(self, ordered: List[Any]) -> None:
+        """Replace the contents with already sorted keys"""
+        self._chunks: List[List[Any]] = [
+            ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)
+        ]
+        self._maxes: List[Any] = [chunk[-1] for chunk in self._chunks]
+        self._len = len(ordered)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __contains__(self, key: Any) -> bool:
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        chunk = self._chunks[pos]
+        i = bisect_left(chunk, key)
+        return i < len(chunk) and chunk[i] == key
+
+    def add(self, key: Any) -> None:
+        """Insert a key"""
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+        else:
+            pos = bisect_right(self._maxes, key)
+            if pos == len(self._maxes):
+                pos -= 1
+                self._chunks[pos].append(key)
+                self._maxes[pos] = key
+            else:
+                insort(self._chunks[pos], key)
+
+            chunk = self._chunks[pos]
+            if len(chunk) > 2 * self.LOAD:
+                self._chunks.insert(pos + 1, chunk[self.LOAD:])
+                del chunk[self.LOAD:]
+                self._maxes.insert(pos, chunk[-1])
+        self._len += 1
+
+    def update(self, keys: Iterable[Any]) -> None:
+        """Insert many keys, merging each run of them into its chunk at once"""
+        keys = sorted(keys)
+        if not keys:
+            return
+        if not self._chunks or len(keys) * 8 >= self._len:
+            # Large batches: one pass over everything beats touching most chunks
+            self._load(list(merge(self, keys)))
+            return
+
+        # Split the keys into runs, one per chunk they land in
+        runs = []
+        start = 0
+        last = len(self._chunks) - 1
+        while start < len(keys):
+            pos = min(bisect_left(self._maxes, keys[start]), last)
+            end = len(keys) if pos == last else bisect_right(keys, self._maxes[pos], start)
+            runs.append((pos, start, end))
+            start = end
+
+        # Right to left, so splitting a chunk leaves the positions still to visit alone
+        for pos, start, end in reversed(runs):
+            chunk = self._chunks[pos]
+            chunk.extend(keys[start:end])
+            chunk.sort()
+            pieces = [chunk[i:i + self.LOAD] for i in range(0, len(chunk), self.LOAD)] \
+                if len(chunk) > 2 * self.LOAD else [chunk]
+            self._chunks[pos:pos + 1] = pieces
+            self._maxes[pos:pos + 1] = [piece[-1] for piece in pieces]
+        self._len += len(keys)
+
+    def discard(self, key: Any) -> None:
+        """Remove a key if present"""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return
+        chunk = self._chunks[pos]
+        i = bisect_left(chunk, key)
+        if i == len(chunk) or chunk[i] != key:
+            return
+
+        del chunk[i]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[pos]
+            del self._maxes[pos]
+        else:
+            self._maxes[pos] = chunk[-1]
+
+    def page_after(self, key: Any, limit: int, reverse: bool = False) -> List[Any]:
+        """Return up to ``limit`` keys strictly after ``key`` in the chosen direction"""
+        if limit <= 0 or not self._chunks:
+            return []
+
+        result: List[Any] = []
+        if reverse:
+            pos = bisect_left(self._maxes, key)
+            if pos == len(self._maxes):
+                pos -= 1
+            end = bisect_left(self._chunks[pos], key)
+            while pos >= 0 and len(result) < limit:
+                chunk = self._chunks[pos]
+                start = max(0, end - (limit - len(result)))
+                result.extend(reversed(chunk[start:end]))
+                pos -= 1
+                if pos >= 0:
+                    end = len(self._chunks[pos])
+        else:
+            pos = bisect_right(self._maxes, key)
+            if pos == len(self._maxes):
+                return []
+            start = bisect_right(self._chunks[pos], key)
+            while pos < len(self._chunks) and len(result) < limit:
+                chunk = self._chunks[pos]
+                result.extend(chunk[start:start + limit - len(result)])
+                pos += 1
+                start = 0
+        return result
+
+    def page(self, skip: int, limit: int, reverse: bool = False) -> List[Any]:
+        """Return up to ``limit`` keys after skipping ``skip`` from the chosen end"""
+        if limit <= 0 or skip >= self._len:
+            return []
+
+        chunks = reversed(self._chunks) if reverse else iter(self._chunks)
+        result: List[Any] = []
+        for chunk in chunks:
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+
+            if reverse:
+                end = len(chunk) - skip
+                start = max(0, end - (limit - len(result)))
+                result.extend(reversed(chunk[start:end]))
+            else:
+                result.extend(chunk[skip:skip + limit - len(result)])
+            skip = 0
+
+            if len(result) >= limit:
+                break
+        return result
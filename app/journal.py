@@ -0,0 +1,175 @@
+"""Append-only operation journal with group commit"""
+import json
+import os
+import threading
+from typing import Any, Iterator, List, Optional
+
+FSYNC_POLICIES = ("always", "batch", "off")
+
+class Journal:
+    """Append-only log of JSON-encoded entries, one per line
+
+    Each entry is stored as ``[seq, *fields]`` where ``seq`` increases by one
+    per append, so a snapshot can record the last sequence number it covers
+    and replay can skip older entries.
+
+    ``fsync`` selects durability:
+
+    - ``always``: every append is flushed and fsynced before returning
+    - ``batch``: appends are buffered; a background thread flushes and
+      fsyncs them together every ``interval_ms`` (group commit), so at most
+      that window of acknowledged writes can be lost. The fsync runs
+      outside the append lock, so appends never wait for the disk;
+      ``synced_seq`` is the last entry known durable
+    - ``off``: appends are flushed to the OS on the same schedule but never
+      fsynced
+    """
+
+    def __init__(self, path: str, fsync: str = "batch", interval_ms: int = 10):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy '{fsync}'. Allowed: {', '.join(FSYNC_POLICIES)}")
+        self.path = path
+        self.fsync = fsync
+        self.interval = interval_ms / 1000
+        self.seq = 0
+        self.appended = 0
+        self.syncs = 0
+        self.synced_seq = 0
+        self._lock = threading.Lock()
+        # Held across a background fsync, so the file is not closed under it
+        self._sync_lock = threading.Lock()
+        self._dirty = False
+        self._file = None
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def read(self, after_seq: int = 0, path: Optional[str] = None) -> Iterator[List[Any]]:
+        """Yield the fields of every entry newer than after_seq
+
+        ``path`` reads a log moved aside by ``detach`` instead of this one.
+        A torn final line (from a crash mid-write) is dropped and truncated
+        away so new appends start on a clean line. Call before ``open``.
+        """
+        path = path or self.path
+        self.seq = after_seq
+        valid_bytes = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        entry = None
+                    if entry is None:
+                        break
+                    valid_bytes += len(line)
+                    seq = entry[0]
+                    if seq > after_seq:
+                        self.seq = seq
+                        yield entry[1:]
+            if valid_bytes < os.path.getsize(path):
+                os.truncate(path, valid_bytes)
+
+    def open(self) -> None:
+        """Open the log for appending"""
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self.fsync != "always" and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True)
+            self._flusher.start()
+
+    def append(self, *fields: Any) -> int:
+        """Append one entry and return its sequence number"""
+        with self._lock:
+            self.seq += 1
+            self._file.write(json.dumps([self.seq, *fields], separators=(",", ":")) + "\n")
+            self.appended += 1
+            if self.fsync == "always":
+                self._sync()
+            else:
+                self._dirty = True
+            return self.seq
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.interval):
+            if self._dirty:
+                self.sync()
+
+    def _sync(self) -> None:
+        """Flush buffered entries and fsync them as the policy requires (lock held)"""
+        self._file.flush()
+        if self.fsync != "off":
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+        self._dirty = False
+        self.synced_seq = self.seq
+
+    def sync(self) -> None:
+        """Make every appended entry durable now
+
+        Only the flush to the OS holds the append lock; appends made during
+        the fsync are left for the next sync.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if self._file is None:
+                    return
+                self._file.flush()
+                self._dirty = False
+                seq = self.seq
+            if self.fsync != "off":
+                os.fsync(self._file.fileno())
+                self.syncs += 1
+            self.synced_seq = seq
+
+    def rotate(self) -> None:
+        """Start an empty log once a snapshot covers every entry so far"""
+        with self._sync_lock, self._lock:
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._dirty = False
+
+    def detach(self, path: str) -> None:
+        """Move every entry so far to path and continue in an empty log
+
+        Lets a snapshot cut the log at ``seq`` and be written afterwards:
+        the moved entries stay on disk until the snapshot covering them is.
+        """
+        with self._sync_lock, self._lock:
+            self._sync()
+            self._file.close()
+            os.replace(self.path, path)
+            self._file = open(self.path, "w", encoding="utf-8")
+            _fsync_directory(self.path)
+            self._dirty = False
+
+    def close(self) -> None:
+        """Write out pending entries and stop the flusher"""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        with self._sync_lock, self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+def write_atomically(path: str, lines: Iterator[str]) -> None:
+    """Write lines to path via a fsynced temporary file and an atomic rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Persist the rename itself
+    _fsync_directory(path)
+
+def _fsync_directory(path: str) -> None:
+    """Make renames and creations in path's directory durable"""
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,262 @@
+"""In-memory database made durable by a journal and snapshots"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.database import Database
+from app.journal import Journal, write_atomically
+from app.models import UserRole, TaskStatus
+from app.records import TaskRecord, TaskTombstone, UserRecord
+from app.repository import UPDATABLE_TASK_FIELDS
+
+SNAPSHOT_FILE = "snapshot.jsonl"
+JOURNAL_FILE = "journal.jsonl"
+# Entries cut off by a snapshot that is still being written
+DETACHED_JOURNAL_FILE = "journal.detached.jsonl"
+# Snapshots of any other version are refused rather than guessed at
+SNAPSHOT_VERSION = 3
+
+STATUS_BY_VALUE = {status.value: status for status in TaskStatus}
+
+# Length of each journal entry, operation included
+ENTRY_LENGTHS = {"ct": 9, "ut": 4, "dt": 3, "cu": 7}
+
+# Records per snapshot line; big enough that decoding stays in C
+SNAPSHOT_CHUNK = 10000
+
+logger = logging.getLogger(__name__)
+
+class JournaledDatabase(Database):
+    """In-memory database that survives restarts
+
+    Every create_user, create_task, update_task and delete_task is appended
+    to a journal after it is applied (bulk operations journal one entry per
+    task).
+    Every ``snapshot_every`` journal entries the whole store is written to a
+    compact snapshot and the journal starts over. The write that crosses
+    the threshold only copies the store's rows and moves the journal
+    aside; a background thread encodes and fsyncs the snapshot. On startup
+    the newest snapshot is loaded and the journal tail replayed on top of it.
+
+    With ``fsync="always"`` every write waits for the disk, so the store is
+    ``blocking`` and AsyncRepository calls it off the event loop, on a
+    single thread since the in-memory indexes are not thread-safe.
+    """
+
+    thread_safe = False
+
+    def __init__(self, directory: str, fsync: str = "batch", fsync_interval_ms: int = 10,
+                 snapshot_every: int = 100000):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.detached_path = os.path.join(directory, DETACHED_JOURNAL_FILE)
+        self.snapshot_every = snapshot_every
+        self.journal = Journal(os.path.join(directory, JOURNAL_FILE), fsync, fsync_interval_ms)
+        self.blocking = fsync == "always"
+        self._since_snapshot = 0
+        self._snapshotter: Optional[threading.Thread] = None
+        self._recover()
+
+    # Journaled operations
+    def create_user(self, email: str, username: str, hashed_password: str, role: UserRole = UserRole.USER) -> UserRecord:
+        """Create a new user"""
+        user = super().create_user(email, username, hashed_password, role)
+        self._log("cu", user.id, user.email, user.username, user.hashed_password, user.role.value, user.created_ts)
+        return user
+
+    def create_task(self, user_id: int, title: str, description: Optional[str], status: TaskStatus) -> TaskRecord:
+        """Create a new task"""
+        task = super().create_task(user_id, title, description, status)
+        self._log("ct", *_task_fields(task))
+        return task
+
+    def create_tasks(self, user_id: int, tasks: List[Dict[str, Any]]) -> List[TaskRecord]:
+        """Create several tasks"""
+        created = super().create_tasks(user_id, tasks)
+        self._log_many(("ct", *_task_fields(task)) for task in created)
+        return created
+
+    def update_task(self, task_id: int, expected_version: Optional[int] = None, **kwargs) -> Optional[TaskRecord]:
+        """Update a task"""
+        task = super().update_task(task_id, expected_version, **kwargs)
+        if task is not None:
+            changes = {key: kwargs[key] for key in UPDATABLE_TASK_FIELDS if kwargs.get(key) is not None}
+            if "status" in changes:
+                changes["status"] = TaskStatus(changes["status"]).value
+            self._log("ut", task_id, changes, task.updated_ts)
+        return task
+
+    def delete_task(self, task_id: int, expected_version: Optional[int] = None) -> bool:
+        """Delete a task"""
+        deleted = super().delete_task(task_id, expected_version)
+        if deleted:
+            # The deletion just left the newest tombstone
+            self._log("dt", task_id, self.tombstone_log[-1].deleted_ts)
+        return deleted
+
+    def _log(self, *fields: Any) -> None:
+        self._log_many((fields,))
+
+    def _log_many(self, entries: Iterable[Tuple[Any, ...]]) -> None:
+        # Snapshot only once every entry is in: the snapshot already holds their effects
+        for fields in entries:
+            self.journal.append(*fields)
+            self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self._start_snapshot()
+
+    # Snapshots and recovery
+    def snapshot(self) -> None:
+        """Write the whole store to a snapshot and truncate the journal"""
+        self._start_snapshot()
+        self._wait_for_snapshot()
+
+    def _start_snapshot(self) -> None:
+        """Cut the store and the journal at the current entry, then write the cut in the background"""
+        self._wait_for_snapshot()
+        cut = self._snapshot_cut()
+        if os.path.exists(self.detached_path):
+            # The last snapshot failed; its entries must not be overwritten
+            write_atomically(self.snapshot_path, _snapshot_lines(*cut))
+            os.remove(self.detached_path)
+            self.journal.rotate()
+        else:
+            self.journal.detach(self.detached_path)
+            self._snapshotter = threading.Thread(
+                target=self._write_snapshot, args=(cut,), name="journal-snapshot", daemon=True
+            )
+            self._snapshotter.start()
+        self._since_snapshot = 0
+
+    def _write_snapshot(self, cut: tuple) -> None:
+        try:
+            write_atomically(self.snapshot_path, _snapshot_lines(*cut))
+            os.remove(self.detached_path)
+        except Exception:
+            # Recovery still replays the detached entries
+            logger.exception("Writing the snapshot failed")
+
+    def _wait_for_snapshot(self) -> None:
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+            self._snapshotter = None
+
+    def _snapshot_cut(self) -> tuple:
+        """Copies of every row as of ``journal.seq``, for _snapshot_lines"""
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "seq": self.journal.seq,
+            "user_id_counter": self.user_id_counter,
+            "task_id_counter": self.task_id_counter,
+        }
+        users = [(u.id, u.email, u.username, u.hashed_password, u.role.value, u.created_ts)
+                 for u in self.users.values()]
+        tasks = [_task_fields(t) for t in self.tasks.values()]
+        tombstones = [(t.id, t.user_id, t.deleted_ts) for t in self.tombstone_log]
+        return header, users, tasks, tombstones
+
+    def _recover(self) -> None:
+        """Load the newest snapshot, replay the journal tail and reopen it"""
+        after_seq = 0
+        if os.path.exists(self.snapshot_path):
+            after_seq = self._load_snapshot()
+
+        # Entries detached for a snapshot that never finished come first
+        if os.path.exists(self.detached_path):
+            for entry in self.journal.read(after_seq, self.detached_path):
+                self._replay(entry)
+                self._since_snapshot += 1
+            after_seq = self.journal.seq
+        for entry in self.journal.read(after_seq):
+            self._replay(entry)
+            self._since_snapshot += 1
+        self.journal.open()
+        # New writes must sort after recovered ones even if the clock stepped back
+        self.last_write_ts = max(
+            max((task.updated_ts for task in self.tasks.values()), default=0),
+            max((tombstone.deleted_ts for tombstone in self.tombstone_log), default=0)
+        )
+
+    def _load_snapshot(self) -> int:
+        with open(self.snapshot_path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Unsupported snapshot version {header.get('version')!r} in {self.snapshot_path}, "
+                    f"expected {SNAPSHOT_VERSION}"
+                )
+            for line in f:
+                kind, rows = json.loads(line)
+                if kind == "users":
+                    for user_id, email, username, hashed_password, role, created_ts in rows:
+                        self._store_user(UserRecord(user_id, email, username, hashed_password,
+                                                    UserRole(role), created_ts))
+                elif kind == "tombstones":
+                    for task_id, user_id, deleted_ts in rows:
+                        self._store_tombstone(TaskTombstone(task_id, user_id, deleted_ts))
+                elif kind == "tasks":
+                    for row in rows:
+                        self._store_task(_task_from_fields(row))
+                else:
+                    raise ValueError(f"Unsupported snapshot section {kind!r} in {self.snapshot_path}")
+        # Counters also cover records deleted before the snapshot
+        self.user_id_counter = max(self.user_id_counter, header["user_id_counter"])
+        self.task_id_counter = max(self.task_id_counter, header["task_id_counter"])
+        return header["seq"]
+
+    def _replay(self, entry: list) -> None:
+        """Apply one journal entry without journaling it again"""
+        op = entry[0]
+        if ENTRY_LENGTHS.get(op) != len(entry):
+            raise ValueError(f"Unsupported journal entry {entry!r}")
+        if op == "ct":
+            self._store_task(_task_from_fields(entry[1:]))
+        elif op == "ut":
+            task_id, changes, updated_ts = entry[1:]
+            task = self.tasks.get(task_id)
+            if task is not None:
+                self._apply_update(task, changes, updated_ts)
+        elif op == "dt":
+            task_id, deleted_ts = entry[1:]
+            task = self.tasks.get(task_id)
+            if task is not None:
+                self._remove_task(task, deleted_ts)
+        else:
+            user_id, email, username, hashed_password, role, created_ts = entry[1:]
+            self._store_user(UserRecord(user_id, email, username, hashed_password, UserRole(role), created_ts))
+
+    def close(self) -> None:
+        """Finish a running snapshot and write out pending journal entries"""
+        self._wait_for_snapshot()
+        self.journal.close()
+
+def _task_fields(task: TaskRecord) -> tuple:
+    return (task.id, task.user_id, task.title, task.description, task.status.value,
+            task.created_ts, task.updated_ts, task.version)
+
+def _task_from_fields(fields: Any) -> TaskRecord:
+    if len(fields) != 8:
+        raise ValueError(f"Unsupported task record {fields!r}")
+    task_id, user_id, title, description, status, created_ts, updated_ts, version = fields
+    return TaskRecord(task_id, user_id, title, description, STATUS_BY_VALUE[status],
+                      created_ts, updated_ts, version)
+
+def _snapshot_lines(header: dict, users: list, tasks: list, tombstones: list) -> Iterator[str]:
+    yield json.dumps(header) + "\n"
+    yield from _chunked_lines("users", users)
+    yield from _chunked_lines("tasks", tasks)
+    yield from _chunked_lines("tombstones", tombstones)
+
+def _chunked_lines(kind: str, rows: Iterator[tuple]) -> Iterator[str]:
+    """Encode rows as snapshot lines of up to SNAPSHOT_CHUNK records"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= SNAPSHOT_CHUNK:
+            yield json.dumps([kind, chunk], separators=(",", ":")) + "\n"
+            chunk = []
+    if chunk:
+        yield json.dumps([kind, chunk], separators=(",", ":")) + "\n"
@@ -1,11 +1,15 @@
 """Middleware for request ID tracking, logging, and rate limiting"""
+import asyncio
 import time
 import uuid
 import logging
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Callable, Dict, Optional
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.exceptions import TooManyRequestsException
+from app.rate_limit import FixedWindowPolicy, LeaseCache, RateLimitFallback, RateLimitPolicy, RateLimitResult
 
 # Configure logging
 logging.basicConfig(
@@ -14,101 +18,175 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
+def _send_with_headers(send: Send, headers: Callable[[Message], Dict[str, str]]) -> Send:
+    """Wrap ``send`` to add headers to the response start, computed from it when it is sent"""
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            response_headers = MutableHeaders(raw=list(message.get("headers", [])))
+            for name, value in headers(message).items():
+                response_headers[name] = value
+            message["headers"] = response_headers.raw
+        await send(message)
+    return wrapped
+
+class RequestIDMiddleware:
     """Add request ID to all requests"""
     
-    async def dispatch(self, request: Request, call_next):
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
+        # request.state reads scope["state"]
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
         
-        return response
+        await self.app(scope, receive, _send_with_headers(send, lambda start: {"X-Request-ID": request_id}))
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """Log all API requests and responses"""
     
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         start_time = time.time()
-        request_id = getattr(request.state, "request_id", "unknown")
+        request_id = scope.get("state", {}).get("request_id", "unknown")
         
         # Log request
-        logger.info(f"Request {request_id}: {request.method} {request.url.path}")
-        
-        response = await call_next(request)
+        logger.info(f"Request {request_id}: {scope['method']} {scope['path']}")
         
-        # Log response
-        process_time = time.time() - start_time
-        logger.info(f"Response {request_id}: {response.status_code} - {process_time:.3f}s")
+        def log_response(start: Message) -> Dict[str, str]:
+            # Logged when the headers go out, before the body
+            process_time = time.time() - start_time
+            logger.info(f"Response {request_id}: {start['status']} - {process_time:.3f}s")
+            return {"X-Process-Time": str(process_time)}
         
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
+        await self.app(scope, receive, _send_with_headers(send, log_response))
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting using Redis"""
+class RateLimitMiddleware:
+    """Rate limiting using Redis, or in-process counters while it is unavailable"""
     
-    def __init__(self, app, redis_client, limit_per_minute: int = 60):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, redis_client, limit_per_minute: int = 60, timeout: float = 0.25,
+                 policy: Optional[RateLimitPolicy] = None, leases: Optional[LeaseCache] = None,
+                 fallback: Optional[RateLimitFallback] = None):
+        """``redis_client`` is an asyncio client (``redis.asyncio``), or None to
+        count in-process only. Redis calls failing or taking longer than
+        ``timeout`` seconds switch decisions to ``fallback`` until Redis
+        answers again. ``policy`` picks the algorithm (see app.rate_limit),
+        by default a fixed one-minute window of ``limit_per_minute``
+        requests. With ``leases``, most hits are decided from tokens this
+        worker leased earlier."""
+        self.app = app
         self.redis_client = redis_client
-        self.limit_per_minute = limit_per_minute
+        self.policy = policy or FixedWindowPolicy(limit_per_minute)
+        self.limit_per_minute = self.policy.limit
+        self.timeout = timeout
+        self.leases = leases
+        self.fallback = fallback or RateLimitFallback()
+        if redis_client is None:
+            self.fallback.mode = "local"
+            self._script = None
+        else:
+            self._script = redis_client.register_script(self.policy.script)
+    
+    async def _count(self, client_id: str, amount: int, now: float) -> RateLimitResult:
+        """Count ``amount`` hits for ``client_id`` under the policy, in Redis if it is up"""
+        keys, args = self.policy.keys(client_id, now), self.policy.args(amount, now)
+        if self._script is not None and self.fallback.use_redis(now):
+            try:
+                reply = await asyncio.wait_for(self._script(keys=keys, args=args), self.timeout)
+            except Exception as e:
+                logger.error(f"Rate limiting error: {e!r}")
+                self.fallback.redis_failed(e, now)
+            else:
+                self.fallback.redis_ok(now)
+                return self.policy.result(reply, amount, now)
+        return self.policy.result(self.fallback.run(self.policy, keys, args, now), amount, now)
     
-    async def dispatch(self, request: Request, call_next):
+    async def _hit(self, client_id: str, amount: int) -> RateLimitResult:
+        """Count ``amount`` hits for ``client_id``, from its lease when it has one"""
+        now = time.time()
+        if self.leases is None or self.fallback.mode != "redis":
+            return await self._count(client_id, amount, now)
+        
+        result = self.leases.spend(client_id, amount, now)
+        if result is not None:
+            return result
+        
+        asked = self.leases.ask(client_id, amount, now)
+        result = await self._count(client_id, asked, now)
+        if not result.allowed and asked > amount:
+            # The lease did not fit; the hit alone may
+            asked = amount
+            result = await self._count(client_id, amount, now)
+        return self.leases.store(client_id, amount, asked, result, now)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Skip rate limiting for health checks
-        if request.url.path.startswith("/health"):
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"].startswith("/health"):
+            await self.app(scope, receive, send)
+            return
         
         # Get client identifier (use IP or user ID if authenticated)
-        client_id = request.client.host
+        client = scope.get("client")
+        client_id = client[0] if client else "unknown"
         
         # Check authorization header for user-based rate limiting
-        auth_header = request.headers.get("Authorization")
+        auth_header = Headers(scope=scope).get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             client_id = f"user:{auth_header}"
         
-        # Rate limit key
-        key = f"rate_limit:{client_id}:{int(time.time() // 60)}"
+        result = await self._hit(client_id, 1)
         
-        try:
-            # Increment counter
-            current = self.redis_client.incr(key)
-            
-            # Set expiry on first request
-            if current == 1:
-                self.redis_client.expire(key, 60)
-            
-            # Check limit
-            if current > self.limit_per_minute:
-                remaining = 0
-                retry_after = 60 - (int(time.time()) % 60)
-                
-                return JSONResponse(
-                    status_code=429,
-                    content={
-                        "error": {
-                            "code": "RATE_LIMIT_EXCEEDED",
-                            "message": "Too many requests. Please try again later.",
-                            "retry_after": retry_after
-                        }
-                    },
-                    headers={
-                        "X-RateLimit-Limit": str(self.limit_per_minute),
-                        "X-RateLimit-Remaining": "0",
-                        "X-RateLimit-Reset": str(int(time.time()) + retry_after),
-                        "Retry-After": str(retry_after)
+        # Check limit
+        if not result.allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={
+                    "error": {
+                        "code": "RATE_LIMIT_EXCEEDED",
+                        "message": "Too many requests. Please try again later.",
+                        "retry_after": result.retry_seconds
                     }
-                )
-            
-            # Add rate limit headers
-            response = await call_next(request)
-            response.headers["X-RateLimit-Limit"] = str(self.limit_per_minute)
-            response.headers["X-RateLimit-Remaining"] = str(self.limit_per_minute - current)
-            response.headers["X-RateLimit-Reset"] = str(int(time.time()) + (60 - (int(time.time()) % 60)))
-            
-            return response
-            
-        except Exception as e:
-            logger.error(f"Rate limiting error: {e}")
-            # If Redis fails, allow the request through
-            return await call_next(request)
+                },
+                headers=result.headers()
+            )
+            await response(scope, receive, send)
+            return
+        
+        # Let batch endpoints charge their extra operations (see charge_rate_limit)
+        state = scope.setdefault("state", {})
+        state["rate_limiter"] = self
+        state["rate_limit_client"] = client_id
+        state["rate_limit_result"] = result
+        
+        # Add rate limit headers, from the latest charge
+        await self.app(scope, receive, _send_with_headers(send, lambda start: state["rate_limit_result"].headers()))
+    
+    async def charge(self, request: Request, amount: int) -> None:
+        """Count ``amount`` more operations against the current request's client"""
+        result = await self._hit(request.state.rate_limit_client, amount)
+        request.state.rate_limit_result = result
+        if not result.allowed:
+            raise TooManyRequestsException(
+                "Too many requests. Please try again later.",
+                retry_after=result.retry_seconds
+            )
+
+async def charge_rate_limit(request: Request, cost: int) -> None:
+    """Count a request as ``cost`` operations against the caller's rate limit
+    
+    RateLimitMiddleware has already counted the request once; this charges
+    the remainder. A no-op when rate limiting is disabled.
+    """
+    limiter = getattr(request.state, "rate_limiter", None)
+    if limiter is not None and cost > 1:
+        await limiter.charge(request, cost - 1)
@@ -1,8 +1,9 @@
 """Database models and schemas"""
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 from enum import Enum
+from app.config import settings
 
 # Enums
 class UserRole(str, Enum):
@@ -85,6 +86,88 @@ class Task(TaskBase):
 class TaskListResponse(BaseModel):
     """Paginated task list response"""
     tasks: List[Task]
-    total: int
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
+
+class DeletedTask(BaseModel):
+    """Task deleted since the last sync"""
+    id: int
+    deleted_at: datetime
+
+class TaskChangesResponse(BaseModel):
+    """Tasks changed since the last sync"""
+    tasks: List[Task]
+    deleted: List[DeletedTask]
+    next_cursor: str
+    has_more: bool
+
+class TaskStats(BaseModel):
+    """Task counts by status"""
+    total: int
+    by_status: Dict[TaskStatus, int]
+
+class UserTaskStats(TaskStats):
+    """One user's task counts by status"""
+    user_id: int
+
+class TaskStatsOverview(TaskStats):
+    """Global and per-user task counts (admin)"""
+    users: List[UserTaskStats]
+
+# Batch Models
+class TaskBatchCreate(BaseModel):
+    """Batch task creation - each item is validated as a TaskCreate"""
+    tasks: List[Dict[str, Any]] = Field(..., min_length=1, max_length=settings.BATCH_MAX_SIZE)
+
+class TaskBatchUpdateItem(TaskUpdate):
+    """One update in a batch"""
+    id: int
+
+class TaskBatchUpdate(BaseModel):
+    """Batch task update - each item is validated as a TaskBatchUpdateItem"""
+    tasks: List[Dict[str, Any]] = Field(..., min_length=1, max_length=settings.BATCH_MAX_SIZE)
+
+class TaskBatchDelete(BaseModel):
+    """Batch task deletion"""
+    ids: List[int] = Field(..., min_length=1, max_length=settings.BATCH_MAX_SIZE)
+
+class BatchItemError(BaseModel):
+    """Error for a single batch item"""
+    code: str
+    message: str
+
+class TaskBatchResult(BaseModel):
+    """Outcome of a single batch item"""
+    index: int
+    id: Optional[int] = None
+    status_code: int
+    task: Optional[Task] = None
+    error: Optional[BatchItemError] = None
+
+class TaskBatchResponse(BaseModel):
+    """Per-item results of a batch request"""
+    results: List[TaskBatchResult]
+    succeeded: int
+    failed: int
+
+# Import Models
+class TaskImportError(BaseModel):
+    """A record an import rejected"""
+    line: int
+    error: str
+
+class TaskImportStatus(BaseModel):
+    """Progress or outcome of a bulk import"""
+    id: str
+    format: str
+    state: str
+    detail: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    records: int
+    imported: int
+    failed: int
+    errors: List[TaskImportError]
+    errors_truncated: bool
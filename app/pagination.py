@@ -0,0 +1,56 @@
+"""Opaque cursors for keyset pagination"""
+import base64
+import json
+from typing import Any, Optional, Tuple
+from app.records import TaskRecord
+from app.repository import parse_sort
+
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+def encode_cursor(task: TaskRecord, sort_by: str, status: Optional[str] = None) -> str:
+    """Encode the position just after ``task`` for a list query"""
+    field, _ = parse_sort(sort_by)
+    payload = {"s": sort_by, "f": status, "v": task.sort_value(field), "id": task.id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, status: Optional[str] = None) -> Tuple[Any, int]:
+    """Decode a cursor into the (sort value, task ID) key it points after
+
+    Raises ValueError if the cursor is malformed or was issued for a
+    different sort order or status filter.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        cursor_sort, cursor_status = payload["s"], payload["f"]
+        value, task_id = payload["v"], int(payload["id"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if cursor_sort != sort_by or cursor_status != status:
+        raise ValueError("Cursor does not match the sort_by and status of this query")
+
+    field, _ = parse_sort(sort_by)
+    expected_type = int if field in TIMESTAMP_FIELDS else str
+    if type(value) is not expected_type:
+        raise ValueError("Invalid cursor")
+
+    return value, task_id
+
+def encode_change_cursor(key: Tuple[int, int]) -> str:
+    """Encode a (change time, task ID) position of a delta sync"""
+    raw = json.dumps({"c": key[0], "id": key[1]}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a delta sync cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        change_ts, task_id = payload["c"], payload["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if type(change_ts) is not int or type(task_id) is not int:
+        raise ValueError("Invalid cursor")
+    return change_ts, task_id
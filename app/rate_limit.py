@@ -0,0 +1,484 @@
+"""Rate limit algorithms, each checked and counted atomically in Redis
+
+A policy supplies a Lua script together with the keys and arguments it
+runs with, and turns the script's reply into a RateLimitResult. The
+caller passes the current time in, so app servers share one clock per
+decision and tests can move it. LeaseCache saves Redis round trips by
+counting hits ahead; RateLimitFallback runs the same algorithms
+in-process while Redis is unavailable.
+"""
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class RateLimitResult:
+    """The outcome of counting a hit against a client's limit"""
+
+    __slots__ = ("allowed", "limit", "remaining", "reset_at", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_at: float, retry_after: float = 0.0):
+        self.allowed = allowed
+        self.limit = limit
+        # Whole requests the client can still make right now
+        self.remaining = remaining
+        # Unix time at which the client's full allowance is back
+        self.reset_at = reset_at
+        # Seconds until the denied hit would be allowed (0 when allowed)
+        self.retry_after = retry_after
+
+    def headers(self) -> dict:
+        """X-RateLimit-* headers, plus Retry-After for a denied hit"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_at)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_seconds)
+        return headers
+
+    @property
+    def retry_seconds(self) -> int:
+        """``retry_after`` rounded up to whole seconds, at least 1"""
+        return max(1, math.ceil(self.retry_after))
+
+class RateLimitPolicy(ABC):
+    """How hits are counted against a client's limit"""
+
+    name: str
+    script: str
+    limit: int
+
+    @abstractmethod
+    def keys(self, client_id: str, now: float) -> List[str]:
+        """Redis keys the script reads and writes for this client"""
+
+    @abstractmethod
+    def args(self, amount: int, now: float) -> list:
+        """Script arguments for counting ``amount`` hits"""
+
+    @abstractmethod
+    def result(self, reply: Sequence, amount: int, now: float) -> RateLimitResult:
+        """Turn the script's reply into a RateLimitResult"""
+
+    @abstractmethod
+    def local(self, store: "RateLimitFallback", keys: List[str], args: list, now: float):
+        """Run the script against in-process state, returning the same reply"""
+
+class FixedWindowPolicy(RateLimitPolicy):
+    """``limit`` hits per calendar window of ``window`` seconds
+
+    Denied hits are counted too, and everyone's window resets at the same
+    moment, so clients can burst up to twice the limit across a boundary.
+    """
+
+    name = "fixed"
+    # INCRBY the window's counter and, when that created it, set its expiry
+    script = """
+local current = redis.call('INCRBY', KEYS[1], ARGV[1])
+if current == tonumber(ARGV[1]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return current
+"""
+
+    def __init__(self, limit: int, window: int = 60):
+        self.limit = limit
+        self.window = window
+
+    def keys(self, client_id: str, now: float) -> List[str]:
+        return [f"rate_limit:{client_id}:{int(now // self.window)}"]
+
+    def args(self, amount: int, now: float) -> list:
+        return [amount, self.window]
+
+    def result(self, reply, amount: int, now: float) -> RateLimitResult:
+        current = int(reply)
+        reset_at = (now // self.window + 1) * self.window
+        allowed = current <= self.limit
+        return RateLimitResult(allowed, self.limit, self.limit - current, reset_at, 0.0 if allowed else reset_at - now)
+
+    def local(self, store, keys, args, now):
+        amount, ttl = args
+        current = store.incrby(keys[0], amount, now)
+        if current == amount:
+            store.expire(keys[0], ttl, now)
+        return current
+
+class SlidingWindowPolicy(RateLimitPolicy):
+    """``limit`` hits in any ``window`` seconds, by the sliding window counter
+
+    The previous window's count is weighted by how much of it still
+    overlaps the last ``window`` seconds. Denied hits are not counted, and
+    each client gets its own Retry-After from when its usage slides down.
+    """
+
+    name = "sliding"
+    # KEYS: current and previous window counters
+    # ARGV: amount, limit, fraction of the current window elapsed, TTL
+    # Returns whether the hit was counted and both counters after it
+    script = """
+local amount = tonumber(ARGV[1])
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if previous * (1 - tonumber(ARGV[3])) + current + amount > tonumber(ARGV[2]) then
+    return {0, previous, current}
+end
+current = redis.call('INCRBY', KEYS[1], amount)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {1, previous, current}
+"""
+
+    def __init__(self, limit: int, window: int = 60):
+        self.limit = limit
+        self.window = window
+
+    def keys(self, client_id: str, now: float) -> List[str]:
+        index = int(now // self.window)
+        return [f"rate_limit:{client_id}:{index}", f"rate_limit:{client_id}:{index - 1}"]
+
+    def args(self, amount: int, now: float) -> list:
+        # Counters are read for two windows, so they live for two
+        return [amount, self.limit, repr((now % self.window) / self.window), 2 * self.window]
+
+    def result(self, reply, amount: int, now: float) -> RateLimitResult:
+        allowed, previous, current = (int(value) for value in reply)
+        window_start = now // self.window * self.window
+        elapsed = now - window_start
+        used = previous * (1 - elapsed / self.window) + current
+        # Everything counted so far has slid out by the end of the next window
+        if current:
+            reset_at = window_start + 2 * self.window
+        elif previous:
+            reset_at = window_start + self.window
+        else:
+            reset_at = now
+        retry_after = 0.0 if allowed else self._retry_after(previous, current, amount, elapsed)
+        return RateLimitResult(bool(allowed), self.limit, math.floor(self.limit - used), reset_at, retry_after)
+
+    def local(self, store, keys, args, now):
+        amount, limit, elapsed, ttl = int(args[0]), args[1], float(args[2]), args[3]
+        previous = store.get(keys[1], now) or 0
+        current = store.get(keys[0], now) or 0
+        if previous * (1 - elapsed) + current + amount > limit:
+            return [0, previous, current]
+        current = store.incrby(keys[0], amount, now)
+        store.expire(keys[0], ttl, now)
+        return [1, previous, current]
+
+    def _retry_after(self, previous: int, current: int, amount: int, elapsed: float) -> float:
+        """Seconds until ``amount`` more hits fit under the limit"""
+        room = self.limit - current - amount
+        if amount > self.limit:
+            return 2 * self.window - elapsed
+        if room >= 0:
+            # The previous window's weight falls enough within this window
+            return max(0.0, self.window * (1 - room / previous) - elapsed) if previous else 0.0
+        # Wait for this window to become the previous one and slide down
+        return self.window - elapsed + self.window * max(0.0, 1 - (self.limit - amount) / current)
+
+class TokenBucketPolicy(RateLimitPolicy):
+    """Buckets of ``burst`` tokens refilled at ``refill_per_second``
+
+    A client can spend its whole bucket at once, then proceeds at the
+    refill rate. Denied hits take no tokens.
+    """
+
+    name = "token_bucket"
+    # KEYS: the bucket hash (tokens, ts)
+    # ARGV: amount, burst, refill per second, now
+    # Returns whether the hit was taken and the tokens left, as a string
+    # since Redis truncates Lua numbers to integers. Tokens are kept to the
+    # 14 significant digits tostring stores, so a bucket is decided on the
+    # value it reports.
+    script = """
+local amount = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+now = math.max(now, ts)
+tokens = tonumber(string.format('%.14g', math.min(burst, tokens + (now - ts) * rate)))
+local allowed = 0
+if tokens >= amount then
+    tokens = tonumber(string.format('%.14g', tokens - amount))
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, burst: int, refill_per_second: float):
+        self.limit = burst
+        self.burst = burst
+        self.refill_per_second = refill_per_second
+
+    def keys(self, client_id: str, now: float) -> List[str]:
+        return [f"rate_limit:bucket:{client_id}"]
+
+    def args(self, amount: int, now: float) -> list:
+        return [amount, self.burst, repr(self.refill_per_second), repr(now)]
+
+    def result(self, reply, amount: int, now: float) -> RateLimitResult:
+        allowed, tokens = int(reply[0]), float(reply[1])
+        reset_at = now + (self.burst - tokens) / self.refill_per_second
+        if allowed:
+            retry_after = 0.0
+        elif amount > self.burst:
+            retry_after = self.burst / self.refill_per_second
+        else:
+            retry_after = (amount - tokens) / self.refill_per_second
+        return RateLimitResult(bool(allowed), self.burst, math.floor(tokens), reset_at, retry_after)
+
+    def local(self, store, keys, args, now):
+        amount, burst, rate, at = args[0], args[1], float(args[2]), float(args[3])
+        tokens, ts = store.get(keys[0], now) or (burst, at)
+        at = max(at, ts)
+        tokens = float(f"{min(burst, tokens + (at - ts) * rate):.14g}")
+        allowed = 0
+        if tokens >= amount:
+            tokens = float(f"{tokens - amount:.14g}")
+            allowed = 1
+        store.set(keys[0], (tokens, at), now)
+        store.expire(keys[0], math.ceil(burst / rate) + 1, now)
+        return [allowed, repr(tokens)]
+
+class TokenLease:
+    """Hits a worker has already counted in Redis and may hand out locally"""
+
+    __slots__ = ("granted", "tokens", "result", "expires_at", "retry_at")
+
+    def __init__(self, tokens: int, result: RateLimitResult, now: float, seconds: float):
+        self.granted = tokens
+        self.tokens = tokens
+        # The Redis decision the lease came with (a denial is cached as-is)
+        self.result = result
+        self.retry_at = now + result.retry_after
+        self.expires_at = now + seconds if result.allowed else min(now + seconds, self.retry_at)
+
+class LeaseCache:
+    """Per-worker LRU of token leases, so most requests skip Redis
+
+    When a client's hit has to go to Redis, extra hits are counted there
+    along with it and the worker keeps them as a lease, spending them
+    locally for up to ``seconds``. A denial is remembered the same way
+    until the client may retry. Lease sizes follow the client's traffic on
+    this worker: they double (up to ``size``) when a lease runs out in
+    time, drop to what was used when one expires, and never exceed the
+    client's last known remaining allowance.
+
+    Leased hits are counted in Redis before they are used, so clients are
+    never let past the limit. The error is the other way: each worker can
+    hold up to ``size`` hits per client that expire unused, so a client
+    may be limited up to workers x ``size`` hits early. In a fixed window,
+    hits leased just before the boundary can be spent up to ``seconds``
+    after it. Only the ``max_keys`` most recent clients hold leases.
+    """
+
+    def __init__(self, size: int, seconds: float = 1.0, max_keys: int = 10000):
+        self.size = size
+        self.seconds = seconds
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._leases: "OrderedDict[str, TokenLease]" = OrderedDict()
+
+    def spend(self, client_id: str, amount: int, now: float) -> Optional[RateLimitResult]:
+        """Decide a hit from the client's lease, or return None to ask Redis"""
+        lease = self._leases.get(client_id)
+        if lease is None or lease.expires_at <= now or (lease.result.allowed and lease.tokens < amount):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._leases.move_to_end(client_id)
+        result = lease.result
+        if not result.allowed:
+            return RateLimitResult(False, result.limit, 0, result.reset_at, lease.retry_at - now)
+        lease.tokens -= amount
+        return RateLimitResult(True, result.limit, result.remaining + lease.tokens, result.reset_at)
+
+    def ask(self, client_id: str, amount: int, now: float) -> int:
+        """How many hits to count in Redis for a hit of ``amount``: it plus a new lease"""
+        lease = self._leases.get(client_id)
+        if lease is None:
+            return amount + min(1, self.size)
+        if lease.expires_at <= now:
+            # Lease only what this worker used of the last one
+            extra = lease.granted - lease.tokens
+        else:
+            extra = 2 * lease.granted or 1
+        return amount + min(self.size, extra, max(0, lease.result.remaining - amount))
+
+    def store(self, client_id: str, amount: int, asked: int, result: RateLimitResult, now: float) -> RateLimitResult:
+        """Keep what Redis granted beyond ``amount`` as the client's lease
+
+        Returns the decision for the hit itself.
+        """
+        tokens = asked - amount if result.allowed else 0
+        self._leases[client_id] = TokenLease(tokens, result, now, self.seconds)
+        self._leases.move_to_end(client_id)
+        while len(self._leases) > self.max_keys:
+            self._leases.popitem(last=False)
+            self.evictions += 1
+        if not tokens:
+            return result
+        return RateLimitResult(True, result.limit, result.remaining + tokens, result.reset_at)
+
+    def stats(self) -> dict:
+        """Clients holding leases, and how often a lease answered"""
+        return {
+            "keys": len(self._leases),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+class RateLimitFallback:
+    """In-process rate limit state, used while Redis is absent or failing
+
+    Runs the policies' scripts against dicts in this worker, so limits keep
+    their semantics during an outage, though each worker then enforces
+    them on its own. Keys expire like their Redis counterparts; each of
+    the ``shards`` dicts is swept for expired keys at most once a second
+    when written, and beyond ``max_keys`` the oldest keys are dropped.
+
+    ``mode`` says where decisions are made: "redis" or "local". After a
+    Redis failure the limiter stays local for ``retry_seconds`` before
+    trying Redis again, so an outage does not cost every request a timeout.
+    """
+
+    def __init__(self, max_keys: int = 100000, shards: int = 16, retry_seconds: float = 5.0):
+        self.max_keys = max_keys
+        self.retry_seconds = retry_seconds
+        self.mode = "redis"
+        self.since = time.time()
+        self.switches = 0
+        self.redis_errors = 0
+        self.local_decisions = 0
+        self.evictions = 0
+        self._retry_at = 0.0
+        # key -> [value, expires_at or None]
+        self._shards: List[Dict[str, list]] = [{} for _ in range(shards)]
+        self._swept_at = [0.0] * shards
+        self._shard_max_keys = max(1, max_keys // shards)
+
+    def use_redis(self, now: float) -> bool:
+        """Whether to try Redis for this decision"""
+        return self.mode == "redis" or now >= self._retry_at
+
+    def redis_failed(self, error: Exception, now: float) -> None:
+        """Decide locally until ``retry_seconds`` from now"""
+        self.redis_errors += 1
+        self._retry_at = now + self.retry_seconds
+        if self.mode != "local":
+            logger.warning(f"Rate limiting falls back to in-process counters: {error!r}")
+            self._switch("local", now)
+
+    def redis_ok(self, now: float) -> None:
+        if self.mode != "redis":
+            logger.info("Redis is back; rate limiting through Redis again")
+            self._switch("redis", now)
+
+    def _switch(self, mode: str, now: float) -> None:
+        self.mode = mode
+        self.since = now
+        self.switches += 1
+
+    def run(self, policy: RateLimitPolicy, keys: List[str], args: list, now: float):
+        """Run ``policy``'s script locally"""
+        self.local_decisions += 1
+        return policy.local(self, keys, args, now)
+
+    def _shard(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def get(self, key: str, now: float):
+        shard = self._shards[self._shard(key)]
+        entry = shard.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del shard[key]
+            return None
+        return entry[0]
+
+    def set(self, key: str, value, now: float) -> None:
+        """Set a key's value, keeping its expiry (like HSET)"""
+        index = self._shard(key)
+        shard = self._shards[index]
+        entry = shard.get(key)
+        if entry is not None and (entry[1] is None or entry[1] > now):
+            entry[0] = value
+            return
+        shard.pop(key, None)
+        if now - self._swept_at[index] >= 1.0 or len(shard) >= self._shard_max_keys:
+            self._sweep(index, now)
+        shard[key] = [value, None]
+
+    def incrby(self, key: str, amount: int, now: float) -> int:
+        value = (self.get(key, now) or 0) + amount
+        self.set(key, value, now)
+        return value
+
+    def expire(self, key: str, seconds: float, now: float) -> None:
+        entry = self._shards[self._shard(key)].get(key)
+        if entry is not None:
+            entry[1] = now + float(seconds)
+
+    def _sweep(self, index: int, now: float) -> None:
+        """Drop a shard's expired keys, then its oldest while it is full"""
+        shard = self._shards[index]
+        self._swept_at[index] = now
+        for key in [key for key, (_, expires_at) in shard.items() if expires_at is not None and expires_at <= now]:
+            del shard[key]
+        while len(shard) >= self._shard_max_keys:
+            del shard[next(iter(shard))]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Which limiter is active, and counters for the local one"""
+        return {
+            "mode": self.mode,
+            "since": self.since,
+            "switches": self.switches,
+            "redis_errors": self.redis_errors,
+            "local_decisions": self.local_decisions,
+            "local_keys": sum(len(shard) for shard in self._shards),
+            "local_evictions": self.evictions,
+        }
+
+POLICIES = {policy.name: policy for policy in (FixedWindowPolicy, SlidingWindowPolicy, TokenBucketPolicy)}
+
+def create_policy(algorithm: str, limit_per_minute: int, burst: int = 0, window: int = 60) -> RateLimitPolicy:
+    """Build the policy named ``algorithm`` (fixed, sliding or token_bucket)
+
+    The token bucket refills ``limit_per_minute`` tokens a minute and holds
+    ``burst`` (default ``limit_per_minute``).
+    """
+    if algorithm not in POLICIES:
+        raise ValueError(f"Unknown rate limit algorithm {algorithm!r}, expected one of {', '.join(POLICIES)}")
+    if algorithm == TokenBucketPolicy.name:
+        return TokenBucketPolicy(burst or limit_per_minute, limit_per_minute / 60)
+    return POLICIES[algorithm](limit_per_minute, window)
+
+# This worker's fallback and leases (None when leasing is off), reported
+# by /health/detailed
+rate_limit_fallback = RateLimitFallback(
+    settings.RATE_LIMIT_LOCAL_MAX_KEYS,
+    retry_seconds=settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+)
+rate_limit_leases = LeaseCache(
+    settings.RATE_LIMIT_LEASE_SIZE,
+    seconds=settings.RATE_LIMIT_LEASE_SECONDS,
+    max_keys=settings.RATE_LIMIT_LEASE_KEYS
+) if settings.RATE_LIMIT_LEASE_SIZE > 0 else None
@@ -0,0 +1,130 @@
+"""Compact storage records for users and tasks"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from app.models import UserRole, TaskStatus
+
+EPOCH = datetime(1970, 1, 1)
+
+def now_us() -> int:
+    """Current UTC time as integer microseconds since the epoch"""
+    return time.time_ns() // 1000
+
+def us_to_datetime(us: int) -> datetime:
+    """Convert epoch microseconds to a naive UTC datetime, exactly"""
+    return EPOCH + timedelta(microseconds=us)
+
+def datetime_to_us(value: datetime) -> int:
+    """Convert a datetime (naive UTC or timezone-aware) to epoch microseconds, exactly"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+class UserRecord:
+    """Stored user
+
+    Timestamps are epoch microseconds; ``created_at`` converts on access.
+    Readable by pydantic models configured with ``from_attributes``.
+    """
+
+    __slots__ = ("id", "email", "username", "hashed_password", "role", "created_ts")
+
+    def __init__(self, id: int, email: str, username: str, hashed_password: str,
+                 role: UserRole, created_ts: int):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.hashed_password = hashed_password
+        self.role = role
+        self.created_ts = created_ts
+
+    @property
+    def created_at(self) -> datetime:
+        return us_to_datetime(self.created_ts)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, UserRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"UserRecord(id={self.id!r}, username={self.username!r}, role={self.role.value!r})"
+
+class TaskRecord:
+    """Stored task
+
+    ``status`` holds a shared TaskStatus member and timestamps are epoch
+    microseconds, so reading hot fields never allocates. ``created_at`` and
+    ``updated_at`` convert to datetimes on access for the API models.
+    ``version`` starts at 1 and increases with every update.
+    """
+
+    __slots__ = ("id", "user_id", "title", "description", "status", "created_ts", "updated_ts", "version")
+
+    def __init__(self, id: int, user_id: int, title: str, description: Optional[str],
+                 status: TaskStatus, created_ts: int, updated_ts: int, version: int = 1):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.description = description
+        self.status = status
+        self.created_ts = created_ts
+        self.updated_ts = updated_ts
+        self.version = version
+
+    @property
+    def created_at(self) -> datetime:
+        return us_to_datetime(self.created_ts)
+
+    @property
+    def updated_at(self) -> datetime:
+        return us_to_datetime(self.updated_ts)
+
+    def sort_value(self, field: str) -> Any:
+        """Value ordered indexes and cursors use for a sort field"""
+        if field == "created_at":
+            return self.created_ts
+        if field == "updated_at":
+            return self.updated_ts
+        if field == "status":
+            return self.status.value
+        return getattr(self, field)
+
+    def copy(self) -> "TaskRecord":
+        """Detached copy, for handing a record out of a store's lock"""
+        return TaskRecord(self.id, self.user_id, self.title, self.description, self.status,
+                          self.created_ts, self.updated_ts, self.version)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, TaskRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"TaskRecord(id={self.id!r}, user_id={self.user_id!r}, title={self.title!r}, status={self.status.value!r})"
+
+class TaskTombstone:
+    """Marker left by a deleted task so delta syncs can report the deletion
+
+    Kept for the store's tombstone retention window after ``deleted_ts``
+    (epoch microseconds).
+    """
+
+    __slots__ = ("id", "user_id", "deleted_ts")
+
+    def __init__(self, id: int, user_id: int, deleted_ts: int):
+        self.id = id
+        self.user_id = user_id
+        self.deleted_ts = deleted_ts
+
+    @property
+    def deleted_at(self) -> datetime:
+        return us_to_datetime(self.deleted_ts)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, TaskTombstone):
+            return NotImplemented
+        return (self.id, self.user_id, self.deleted_ts) == (other.id, other.user_id, other.deleted_ts)
+
+    def __repr__(self) -> str:
+        return f"TaskTombstone(id={self.id!r}, user_id={self.user_id!r}, deleted_ts={self.deleted_ts!r})"
@@ -0,0 +1,243 @@
+"""Storage interface shared by every database backend"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from app.config import settings
+from app.models import UserRole, TaskStatus
+from app.records import TaskRecord, TaskTombstone, UserRecord
+from app.search import SearchIndex
+
+# Fields accepted by get_user_tasks(sort_by=...)
+SORT_FIELDS = ("created_at", "updated_at", "title", "status")
+
+# Fields update_task(**kwargs) may change
+UPDATABLE_TASK_FIELDS = ("title", "description", "status")
+
+# Events passed to task write listeners
+TASK_CREATED = "created"
+TASK_UPDATED = "updated"
+TASK_DELETED = "deleted"
+
+TaskListener = Callable[[str, TaskRecord], None]
+
+# An entry of a delta sync: a live task or the tombstone of a deleted one
+TaskChange = Union[TaskRecord, TaskTombstone]
+
+def parse_sort(sort_by: str) -> Tuple[str, bool]:
+    """Split a sort expression into (field, descending)
+
+    Plain field names sort descending, a leading "-" sorts ascending.
+    """
+    descending = True
+    field = sort_by
+    if field.startswith("-"):
+        field = field[1:]
+        descending = False
+
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort field '{field}'. Allowed: {', '.join(SORT_FIELDS)}")
+    return field, descending
+
+def change_key(change: TaskChange) -> Tuple[int, int]:
+    """Position of a change in a user's change order: (updated or deleted time, task ID)"""
+    if isinstance(change, TaskTombstone):
+        return (change.deleted_ts, change.id)
+    return (change.updated_ts, change.id)
+
+class Repository(ABC):
+    """Users and tasks storage
+
+    Backends return users and tasks as UserRecord and TaskRecord objects,
+    which the ``User`` and ``Task`` models read via ``from_attributes``.
+    ``blocking`` tells AsyncRepository whether calls may wait on I/O and
+    must therefore run off the event loop; ``thread_safe`` whether such
+    calls may run on several threads at once (if not, they run on one).
+
+    Every task carries a ``version`` and every user's task collection has
+    one too, both bumped on each write, for ETags. ``etag_salt`` is mixed
+    into ETags so versions from another store instance (e.g. an in-memory
+    store before a restart) never validate.
+
+    Deleting a task leaves a TaskTombstone that ``get_changes`` reports
+    for ``tombstone_retention_us`` microseconds before it may be purged.
+    """
+
+    blocking = True
+    thread_safe = True
+    etag_salt = ""
+    tombstone_retention_us = settings.TOMBSTONE_RETENTION_SECONDS * 1_000_000
+    _listeners: Tuple[TaskListener, ...] = ()
+
+    # Write notifications
+    def add_listener(self, listener: TaskListener) -> None:
+        """Call listener(event, task) after every task create, update and delete
+
+        Listeners run synchronously on the writing thread (a storage worker
+        thread for blocking backends), so they must be quick and thread-safe.
+        For deletes, ``task`` is the record as it was when deleted.
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener: TaskListener) -> None:
+        """Stop notifying a listener"""
+        self._listeners = tuple(l for l in self._listeners if l != listener)
+
+    def _notify(self, event: str, task: TaskRecord) -> None:
+        for listener in self._listeners:
+            listener(event, task)
+
+    # User operations
+    @abstractmethod
+    def create_user(self, email: str, username: str, hashed_password: str, role: UserRole = UserRole.USER) -> UserRecord:
+        """Create a new user"""
+
+    @abstractmethod
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
+        """Get user by username"""
+
+    @abstractmethod
+    def get_user_by_id(self, user_id: int) -> Optional[UserRecord]:
+        """Get user by ID"""
+
+    @abstractmethod
+    def username_exists(self, username: str) -> bool:
+        """Check if username exists"""
+
+    @abstractmethod
+    def email_exists(self, email: str) -> bool:
+        """Check if email exists"""
+
+    # Task operations
+    @abstractmethod
+    def create_task(self, user_id: int, title: str, description: Optional[str], status: TaskStatus) -> TaskRecord:
+        """Create a new task"""
+
+    @abstractmethod
+    def get_task(self, task_id: int) -> Optional[TaskRecord]:
+        """Get task by ID"""
+
+    @abstractmethod
+    def get_user_tasks(self, user_id: int, skip: int = 0, limit: int = 100,
+                       status: Optional[TaskStatus] = None, sort_by: str = "created_at",
+                       after: Optional[Tuple[Any, int]] = None) -> List[TaskRecord]:
+        """Get tasks for a user with filtering and pagination
+
+        Results are ordered by the sort field, ties broken by task ID in the
+        same direction. When ``after`` is a (TaskRecord.sort_value, task ID)
+        key, the page starts right after that key instead of at ``skip``.
+        Raises ValueError for an unknown sort field.
+        """
+
+    @abstractmethod
+    def count_user_tasks(self, user_id: int, status: Optional[TaskStatus] = None) -> int:
+        """Count user tasks"""
+
+    @abstractmethod
+    def count_tasks_by_status(self, user_id: Optional[int] = None) -> Dict[TaskStatus, int]:
+        """Count a user's tasks, or every task when user_id is None, per status
+
+        Every status is present in the result. Backends keep these counts up
+        to date on each write, so this does not scan tasks.
+        """
+
+    @abstractmethod
+    def count_tasks_by_user(self) -> Dict[int, Dict[TaskStatus, int]]:
+        """Per-status task counts of every user that has tasks (admin only)"""
+
+    @abstractmethod
+    def update_task(self, task_id: int, expected_version: Optional[int] = None, **kwargs) -> Optional[TaskRecord]:
+        """Update a task, ignoring fields passed as None
+
+        With ``expected_version`` the update only applies if the task is
+        still at that version; otherwise None is returned.
+        """
+
+    @abstractmethod
+    def delete_task(self, task_id: int, expected_version: Optional[int] = None) -> bool:
+        """Delete a task, only if it is at ``expected_version`` when given"""
+
+    @abstractmethod
+    def get_task_version(self, task_id: int) -> Optional[Tuple[int, int]]:
+        """Get (owner user ID, version) of a task without loading it"""
+
+    @abstractmethod
+    def get_collection_version(self, user_id: int) -> int:
+        """Get the version of a user's task collection
+
+        Changes whenever one of the user's tasks is created, updated or
+        deleted; 0 if nothing has been written yet.
+        """
+
+    @abstractmethod
+    def get_changes(self, user_id: int, after: Tuple[int, int], limit: int = 100) -> Optional[List[TaskChange]]:
+        """Get a user's task changes after a position in their change order
+
+        Changes are live tasks keyed by ``updated_ts`` and tombstones keyed
+        by ``deleted_ts``, ordered by ``change_key``; returns up to ``limit``
+        of those after the ``after`` key, oldest first. A task appears once,
+        at its latest change. Returns None when ``after`` is older than the
+        tombstone retention window, as deletions may have been forgotten.
+        """
+
+    @abstractmethod
+    def get_all_tasks(self) -> List[TaskRecord]:
+        """Get all tasks (admin only)"""
+
+    @abstractmethod
+    def scan_tasks(self, after_id: int = 0, limit: int = 1000, status: Optional[TaskStatus] = None,
+                   user_id: Optional[int] = None, created_after: Optional[int] = None) -> List[TaskRecord]:
+        """Get the next batch of tasks in ID order (admin only)
+
+        Returns up to ``limit`` tasks with an ID greater than ``after_id``
+        that match the filters (``created_after`` is epoch microseconds).
+        An empty list means the scan is complete. Pass the last ID of a
+        batch as ``after_id`` to continue.
+        """
+
+    def search_tasks(self, user_id: int, query: str, skip: int = 0, limit: int = 20) -> Tuple[List[TaskRecord], int]:
+        """Full-text search over a user's task titles and descriptions
+
+        Returns (tasks on the page, best match first; total matches). Ranking
+        and matching follow SearchIndex. This default indexes the user's
+        tasks for every call; backends with a persistent index override it.
+        """
+        index = SearchIndex()
+        tasks: Dict[int, TaskRecord] = {}
+        after_id = 0
+        while True:
+            batch = self.scan_tasks(after_id=after_id, user_id=user_id)
+            if not batch:
+                break
+            for task in batch:
+                index.add(task)
+                tasks[task.id] = task
+            after_id = batch[-1].id
+        task_ids, total = index.search(query, skip, limit)
+        return [tasks[task_id] for task_id in task_ids], total
+
+    # Bulk task operations. Backends may override these to apply a whole
+    # batch at once (e.g. in one transaction); results keep input order.
+    def get_tasks(self, task_ids: List[int]) -> List[Optional[TaskRecord]]:
+        """Get several tasks by ID"""
+        return [self.get_task(task_id) for task_id in task_ids]
+
+    def create_tasks(self, user_id: int, tasks: List[Dict[str, Any]]) -> List[TaskRecord]:
+        """Create several tasks from dicts with title, description and status"""
+        return [
+            self.create_task(user_id, task["title"], task.get("description"), task.get("status", TaskStatus.TODO))
+            for task in tasks
+        ]
+
+    def update_tasks(self, updates: List[Tuple[int, Dict[str, Any]]]) -> List[Optional[TaskRecord]]:
+        """Apply several (task_id, changes) updates"""
+        return [self.update_task(task_id, **changes) for task_id, changes in updates]
+
+    def delete_tasks(self, task_ids: List[int]) -> List[bool]:
+        """Delete several tasks"""
+        return [self.delete_task(task_id) for task_id in task_ids]
+
+    def ping(self) -> bool:
+        """Check that the backend is reachable"""
+        return True
+
+    def close(self) -> None:
+        """Release any resources held by the backend"""
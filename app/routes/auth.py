@@ -1,7 +1,8 @@
 """Authentication routes"""
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from app.models import UserCreate, UserLogin, Token, User
-from app.database import db
+from app.async_database import AsyncRepository
+from app.dependencies import get_db
 from app.auth import hash_password, verify_password, create_access_token
 from app.exceptions import BadRequestException, UnauthorizedException
 import logging
@@ -15,21 +16,25 @@ def send_welcome_email(email: str, username: str):
     # In production, this would send an actual email
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, background_tasks: BackgroundTasks):
+async def register(
+    user_data: UserCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncRepository = Depends(get_db)
+):
     """Register a new user"""
     # Check if username exists
-    if db.username_exists(user_data.username):
+    if await db.username_exists(user_data.username):
         raise BadRequestException("Username already exists")
     
     # Check if email exists
-    if db.email_exists(user_data.email):
+    if await db.email_exists(user_data.email):
         raise BadRequestException("Email already exists")
     
     # Hash password
     hashed_password = hash_password(user_data.password)
     
     # Create user
-    user = db.create_user(
+    user = await db.create_user(
         email=user_data.email,
         username=user_data.username,
         hashed_password=hashed_password
@@ -39,28 +44,28 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks):
     background_tasks.add_task(send_welcome_email, user_data.email, user_data.username)
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user["id"])})
+    access_token = create_access_token(data={"sub": str(user.id)})
     
-    user_model = User(**user)
+    user_model = User.model_validate(user)
     
     return Token(access_token=access_token, user=user_model)
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, db: AsyncRepository = Depends(get_db)):
     """Login and get access token"""
     # Get user by username
-    user = db.get_user_by_username(credentials.username)
+    user = await db.get_user_by_username(credentials.username)
     
     if not user:
         raise UnauthorizedException("Invalid username or password")
     
     # Verify password
-    if not verify_password(credentials.password, user["hashed_password"]):
+    if not verify_password(credentials.password, user.hashed_password):
         raise UnauthorizedException("Invalid username or password")
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user["id"])})
+    access_token = create_access_token(data={"sub": str(user.id)})
     
-    user_model = User(**user)
+    user_model = User.model_validate(user)
     
     return Token(access_token=access_token, user=user_model)
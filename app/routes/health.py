@@ -1,10 +1,15 @@
 """Health check and async endpoints"""
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, Depends
 from typing import Dict
 import httpx
 import time
 import redis
 from app.config import settings
+from app.async_database import AsyncRepository
+from app.dependencies import get_db
+from app.cache import list_cache
+from app.events import task_events
+from app import rate_limit
 import logging
 
 router = APIRouter(tags=["Health & Async"])
@@ -19,7 +24,7 @@ async def health_check() -> Dict[str, str]:
     }
 
 @router.get("/health/detailed")
-async def detailed_health_check() -> Dict:
+async def detailed_health_check(db: AsyncRepository = Depends(get_db)) -> Dict:
     """Detailed health check with dependency status"""
     health_status = {
         "status": "healthy",
@@ -39,8 +44,23 @@ async def detailed_health_check() -> Dict:
             "error": str(e)
         }
     
-    # Check database (in-memory, always healthy)
-    health_status["dependencies"]["database"] = {"status": "healthy"}
+    # Check database
+    try:
+        # Through the async adapter, so a blocking backend pings off the event loop
+        await db.ping()
+        health_status["dependencies"]["database"] = {"status": "healthy"}
+    except Exception as e:
+        health_status["status"] = "degraded"
+        health_status["dependencies"]["database"] = {
+            "status": "unhealthy",
+            "error": str(e)
+        }
+    
+    health_status["list_cache"] = list_cache.stats()
+    health_status["task_events"] = task_events.stats()
+    health_status["rate_limit"] = rate_limit.rate_limit_fallback.stats()
+    leases = rate_limit.rate_limit_leases
+    health_status["rate_limit"]["leases"] = leases.stats() if leases else None
     
     return health_status
 
@@ -1,129 +1,636 @@
 """Task management routes"""
-from fastapi import APIRouter, Depends, status, Query
-from typing import Optional, List
-from app.models import Task, TaskCreate, TaskUpdate, TaskListResponse, TaskStatus, User
-from app.database import db
-from app.dependencies import get_current_user, require_admin
-from app.exceptions import NotFoundException, ForbiddenException
+from fastapi import APIRouter, Depends, Header, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple, Type
+from app.models import (
+    Task, TaskCreate, TaskUpdate, TaskListResponse, TaskStatus, User,
+    TaskBatchCreate, TaskBatchUpdate, TaskBatchUpdateItem, TaskBatchDelete,
+    TaskBatchResult, TaskBatchResponse, BatchItemError, TaskStats, UserTaskStats, TaskStatsOverview,
+    TaskChangesResponse, TaskImportStatus
+)
+from app.dependencies import get_current_user, get_db, require_admin
+from app.etags import collection_etag, etag_matches, task_etag
+from app.exceptions import (
+    APIException, BadRequestException, GoneException, NotFoundException, ForbiddenException,
+    PreconditionFailedException
+)
+from app.middleware import charge_rate_limit
+from app.pagination import encode_cursor, decode_cursor, encode_change_cursor, decode_change_cursor
+from app.records import TaskRecord, TaskTombstone, datetime_to_us
+from app.async_database import AsyncRepository
+from app.cache import list_cache
+from app.config import settings
+from app.events import Subscription, TaskEvent, task_events
+from app.importer import CSV, NDJSON, ImportJob, ImportRow, TaskImportParser, task_imports, validation_message
+from app.repository import change_key, parse_sort
+from app.search import query_terms
+from app.serialization import (
+    RecordJSONResponse, TaskEncoder, dump_tasks, dump_tasks_ndjson, parse_fields, task_encoder,
+    task_list_to_dict, task_to_dict
+)
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+# Tasks read from storage and encoded per chunk by the admin dump
+STREAM_BATCH_SIZE = 500
+
+# Routes taking ``fields`` declare the full models, but send only the named
+# task fields; their responses skip the model (see app.serialization)
+PROJECTED_TASK = "The task; with `fields`, only the named fields of it"
+PROJECTED_TASKS = "The tasks; with `fields`, only the named fields of each"
+PROJECTED_PAGE = "A page of tasks; with `fields`, only the named fields of each task"
+
 @router.post("", response_model=Task, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
 ):
     """Create a new task"""
-    task = db.create_task(
+    task = await db.create_task(
         user_id=current_user.id,
         title=task_data.title,
         description=task_data.description,
         status=task_data.status
     )
     
-    return Task(**task)
+    return RecordJSONResponse(
+        task_to_dict(task),
+        status_code=status.HTTP_201_CREATED,
+        headers={"ETag": task_etag(db.etag_salt, task.id, task.version)}
+    )
 
-@router.get("", response_model=TaskListResponse)
+@router.get("", response_model=TaskListResponse, response_description=PROJECTED_PAGE)
 async def list_tasks(
     skip: int = Query(0, ge=0, description="Number of tasks to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of tasks to return"),
     status: Optional[TaskStatus] = Query(None, description="Filter by status"),
     sort_by: str = Query("created_at", description="Sort field (prefix with - for ascending)"),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Include the total count in the response"),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to return (default all)"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
 ):
-    """List tasks with pagination, filtering, and sorting"""
-    tasks = db.get_user_tasks(
+    """List tasks with pagination, filtering, and sorting
+    
+    Supports offset pagination (skip/limit) and keyset pagination: pass the
+    ``next_cursor`` of a page as ``cursor`` to fetch the page after it.
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    while the user's tasks are unchanged. ``fields`` limits each task to
+    the named fields.
+    """
+    status_value = status.value if status else None
+    try:
+        parse_sort(sort_by)
+        after = decode_cursor(cursor, sort_by, status_value) if cursor else None
+        projection = parse_fields(fields)
+    except ValueError as e:
+        raise BadRequestException(str(e))
+    
+    if after is not None and skip:
+        raise BadRequestException("cursor cannot be combined with skip")
+    
+    # Read the version before the tasks: a concurrent write can then only
+    # make the ETag older than the body, which at worst costs a cache miss
+    version = await db.get_collection_version(current_user.id)
+    query = (skip, limit, status_value, sort_by, cursor, include_total, projection)
+    etag = collection_etag(db.etag_salt, current_user.id, version, *query)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    if list_cache.enabled:
+        body = list_cache.get(current_user.id, query, etag)
+        if body is not None:
+            return Response(body, media_type="application/json", headers={"ETag": etag})
+    
+    # Fetch one extra task to know whether another page follows
+    tasks = await db.get_user_tasks(
         user_id=current_user.id,
         skip=skip,
-        limit=limit,
+        limit=limit + 1,
         status=status,
-        sort_by=sort_by
+        sort_by=sort_by,
+        after=after
     )
     
-    total = db.count_user_tasks(current_user.id, status=status)
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1], sort_by, status_value)
     
-    task_models = [Task(**task) for task in tasks]
+    total = await db.count_user_tasks(current_user.id, status=status) if include_total else None
     
-    return TaskListResponse(
-        tasks=task_models,
-        total=total,
-        skip=skip,
-        limit=limit
+    # Stored tasks are already valid; encode them without revalidating
+    page = task_list_to_dict(tasks, total, skip, limit, next_cursor, task_encoder(projection))
+    response = RecordJSONResponse(page, headers={"ETag": etag})
+    if list_cache.enabled:
+        list_cache.put(current_user.id, query, etag, response.body)
+    return response
+
+@router.get("/stats", response_model=TaskStats)
+async def get_task_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Count your tasks by status"""
+    return _task_stats(await db.count_tasks_by_status(current_user.id))
+
+@router.get("/search", response_model=TaskListResponse, response_description=PROJECTED_PAGE)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in title or description"),
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Number of results to return"),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to return (default all)"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Search your tasks by title and description
+    
+    Every word of ``q`` must appear in the task, either whole or as the
+    start of a longer word. Results are ranked best first: rarer words,
+    title matches and whole-word matches count more.
+    """
+    projection = _parse_fields(fields)
+    if not query_terms(q):
+        raise BadRequestException("q must contain at least one word")
+    
+    version = await db.get_collection_version(current_user.id)
+    etag = collection_etag(db.etag_salt, current_user.id, version, "search", q, skip, limit, projection)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    tasks, total = await db.search_tasks(current_user.id, q, skip=skip, limit=limit)
+    page = task_list_to_dict(tasks, total, skip, limit, encode=task_encoder(projection))
+    return RecordJSONResponse(page, headers={"ETag": etag})
+
+@router.get("/changes", response_model=TaskChangesResponse)
+async def get_task_changes(
+    since: Optional[datetime] = Query(None, description="Start from changes made at or after this time (UTC)"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor of the previous sync"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of changes to return"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Tasks created, updated or deleted since your last sync
+    
+    Start with ``since`` (or fetch everything with ``GET /tasks`` first),
+    then pass each response's ``next_cursor`` as ``cursor``, immediately
+    while ``has_more`` is true and on your next sync otherwise. Changes come
+    oldest first and a task appears once, as it is now or as deleted. Each
+    sync costs in proportion to the changes, not to the number of tasks.
+    Deletions are only kept for a while: a 410 means the position is older
+    than that, so refetch everything and start over.
+    """
+    if (since is None) == (cursor is None):
+        raise BadRequestException("Pass exactly one of since and cursor")
+    if cursor is not None:
+        try:
+            after = decode_change_cursor(cursor)
+        except ValueError as e:
+            raise BadRequestException(str(e))
+    else:
+        # Task IDs start at 1, so this includes changes made at exactly `since`
+        after = (datetime_to_us(since), 0)
+    
+    changes = await db.get_changes(current_user.id, after, limit + 1)
+    if changes is None:
+        raise GoneException("Changes this old are no longer tracked; resync all tasks", "SYNC_EXPIRED")
+    
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return RecordJSONResponse({
+        "tasks": [task_to_dict(change) for change in changes if isinstance(change, TaskRecord)],
+        "deleted": [
+            {"id": change.id, "deleted_at": change.deleted_at}
+            for change in changes if isinstance(change, TaskTombstone)
+        ],
+        "next_cursor": encode_change_cursor(change_key(changes[-1]) if changes else after),
+        "has_more": has_more,
+    })
+
+@router.get("/events")
+async def stream_task_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Stream changes to your tasks as server-sent events
+    
+    Each event is ``created``, ``updated`` or ``deleted`` with the task as
+    its data. Reconnecting with ``Last-Event-ID`` replays the events you
+    missed; a ``resync`` event means some were lost (too old to replay,
+    or dropped because you read too slowly) and you should refetch.
+    """
+    subscription, missed = task_events.subscribe(current_user.id, last_event_id)
+    return StreamingResponse(
+        _event_frames(subscription, missed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/batch", response_model=TaskBatchResponse)
+async def create_tasks_batch(
+    batch: TaskBatchCreate,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Create several tasks in one request
+    
+    Items are validated one by one; invalid items are reported in their
+    result and the valid ones are created in a single bulk write.
+    """
+    await charge_rate_limit(request, len(batch.tasks))
+    results: List[Optional[TaskBatchResult]] = [None] * len(batch.tasks)
+    
+    valid = _validate_items(batch.tasks, TaskCreate, results)
+    created = await db.create_tasks(current_user.id, [item.model_dump() for _, item in valid])
+    
+    for (index, _), task in zip(valid, created):
+        results[index] = TaskBatchResult(
+            index=index, id=task.id, status_code=status.HTTP_201_CREATED, task=Task.model_validate(task)
+        )
+    return _batch_response(results)
+
+@router.patch("/batch", response_model=TaskBatchResponse)
+async def update_tasks_batch(
+    batch: TaskBatchUpdate,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Partially update several tasks in one request"""
+    await charge_rate_limit(request, len(batch.tasks))
+    results: List[Optional[TaskBatchResult]] = [None] * len(batch.tasks)
+    
+    valid = _validate_items(batch.tasks, TaskBatchUpdateItem, results)
+    owned = await _owned_items(db, [(index, item.id) for index, item in valid], current_user, results)
+    items = dict(valid)
+    updated = await db.update_tasks([(task_id, items[index].model_dump(exclude={"id"})) for index, task_id in owned])
+    
+    for (index, task_id), task in zip(owned, updated):
+        if task is None:
+            results[index] = _item_error(index, task_id, NotFoundException(f"Task {task_id} not found"))
+        else:
+            results[index] = TaskBatchResult(
+                index=index, id=task_id, status_code=status.HTTP_200_OK, task=Task.model_validate(task)
+            )
+    return _batch_response(results)
+
+@router.delete("/batch", response_model=TaskBatchResponse)
+async def delete_tasks_batch(
+    batch: TaskBatchDelete,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Delete several tasks in one request"""
+    await charge_rate_limit(request, len(batch.ids))
+    results: List[Optional[TaskBatchResult]] = [None] * len(batch.ids)
+    
+    owned = await _owned_items(db, list(enumerate(batch.ids)), current_user, results)
+    deleted = await db.delete_tasks([task_id for _, task_id in owned])
+    
+    for (index, task_id), ok in zip(owned, deleted):
+        if ok:
+            results[index] = TaskBatchResult(index=index, id=task_id, status_code=status.HTTP_204_NO_CONTENT)
+        else:
+            results[index] = _item_error(index, task_id, NotFoundException(f"Task {task_id} not found"))
+    return _batch_response(results)
+
+@router.post("/import", response_model=TaskImportStatus)
+async def import_tasks(
+    request: Request,
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$",
+                                         description="ndjson or csv (default from Content-Type)"),
+    user_id: Optional[int] = Query(None, ge=1, description="Owner of records without a user_id (default you)"),
+    current_user: User = Depends(require_admin),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Bulk-load tasks from an NDJSON or CSV body (admin only)
+    
+    The body is parsed and validated as it streams in and valid records
+    are created in chunks of ``IMPORT_CHUNK_SIZE``, so memory stays flat
+    however large the file. NDJSON lines and CSV rows (after a header
+    row) carry title, description, status and optionally user_id. Invalid
+    records are skipped and reported by line; follow a running import
+    with ``GET /tasks/imports``.
+    """
+    if import_format is None:
+        content_type = request.headers.get("content-type", "")
+        import_format = CSV if content_type.startswith("text/csv") else NDJSON
+    job = task_imports.start(import_format, current_user.id)
+    parser = TaskImportParser(import_format, user_id or current_user.id)
+    owners: Dict[int, bool] = {}
+    
+    try:
+        rows: List[ImportRow] = []
+        async for data in request.stream():
+            rows.extend(parser.feed(data))
+            if len(rows) >= settings.IMPORT_CHUNK_SIZE:
+                await _import_rows(db, job, rows, owners)
+                rows = []
+        rows.extend(parser.finish())
+        await _import_rows(db, job, rows, owners)
+    except ValueError as e:
+        job.finish("failed", str(e))
+        raise BadRequestException(str(e))
+    except BaseException as e:
+        # Includes the client going away mid-upload
+        job.finish("failed", str(e) or type(e).__name__)
+        raise
+    
+    job.finish()
+    return RecordJSONResponse(job.to_dict())
+
+@router.get("/imports", response_model=List[TaskImportStatus])
+async def list_task_imports(current_user: User = Depends(require_admin)):
+    """Running and recent bulk imports of this instance, newest first (admin only)"""
+    return RecordJSONResponse([job.to_dict() for job in task_imports.jobs()])
+
+async def _import_rows(db: AsyncRepository, job: ImportJob, rows: List[ImportRow], owners: Dict[int, bool]) -> None:
+    """Create one chunk of parsed records with a bulk write per owner"""
+    by_owner: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if row.error is None and row.user_id not in owners:
+            owners[row.user_id] = await db.get_user_by_id(row.user_id) is not None
+        if row.error is not None:
+            job.record_error(row.line, row.error)
+        elif not owners[row.user_id]:
+            job.record_error(row.line, f"user_id: user {row.user_id} not found")
+        else:
+            by_owner.setdefault(row.user_id, []).append(row.fields)
+    for owner_id, tasks in by_owner.items():
+        job.record_imported(len(await db.create_tasks(owner_id, tasks)))
+
+def _validate_items(items: List[Dict[str, Any]], model: Type[BaseModel],
+                    results: List[Optional[TaskBatchResult]]) -> List[Tuple[int, Any]]:
+    """Validate raw batch items, recording a 422 result for each invalid one"""
+    valid = []
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = TaskBatchResult(
+                index=index,
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                error=BatchItemError(code="VALIDATION_ERROR", message=validation_message(e))
+            )
+    return valid
+
+async def _owned_items(db: AsyncRepository, items: List[Tuple[int, int]], current_user: User,
+                       results: List[Optional[TaskBatchResult]]) -> List[Tuple[int, int]]:
+    """Keep the (index, task_id) pairs the user owns, recording 404/403 results for the rest"""
+    tasks = await db.get_tasks([task_id for _, task_id in items])
+    owned = []
+    for (index, task_id), task in zip(items, tasks):
+        if task is None:
+            results[index] = _item_error(index, task_id, NotFoundException(f"Task {task_id} not found"))
+        elif task.user_id != current_user.id:
+            results[index] = _item_error(index, task_id, ForbiddenException("You don't have access to this task"))
+        else:
+            owned.append((index, task_id))
+    return owned
+
+def _item_error(index: int, task_id: int, exc: APIException) -> TaskBatchResult:
+    return TaskBatchResult(
+        index=index,
+        id=task_id,
+        status_code=exc.status_code,
+        error=BatchItemError(code=exc.error_code, message=exc.detail)
     )
 
-@router.get("/{task_id}", response_model=Task)
+def _batch_response(results: List[TaskBatchResult]) -> TaskBatchResponse:
+    failed = sum(1 for result in results if result.error is not None)
+    return TaskBatchResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+@router.get("/{task_id}", response_model=Task, response_description=PROJECTED_TASK)
 async def get_task(
     task_id: int,
-    current_user: User = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to return (default all)"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
 ):
-    """Get a specific task"""
-    task = db.get_task(task_id)
+    """Get a specific task
     
-    if not task:
+    Returns 304 when If-None-Match holds the task's current ETag.
+    ``fields`` limits the task to the named fields, under an ETag of its own.
+    """
+    projection = _parse_fields(fields)
+    encode = task_encoder(projection)
+    owner_version = await db.get_task_version(task_id)
+    
+    if not owner_version:
         raise NotFoundException(f"Task {task_id} not found")
     
     # Check ownership
-    if task["user_id"] != current_user.id and current_user.role.value != "admin":
+    owner_id, version = owner_version
+    if owner_id != current_user.id and current_user.role.value != "admin":
         raise ForbiddenException("You don't have access to this task")
     
-    return Task(**task)
+    etag = task_etag(db.etag_salt, task_id, version, projection)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    task = await db.get_task(task_id)
+    if not task:
+        raise NotFoundException(f"Task {task_id} not found")
+    
+    etag = task_etag(db.etag_salt, task.id, task.version, projection)
+    return RecordJSONResponse(encode(task), headers={"ETag": etag})
 
 @router.put("/{task_id}", response_model=Task)
 async def update_task(
     task_id: int,
     task_data: TaskUpdate,
-    current_user: User = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
 ):
-    """Update a task"""
-    task = db.get_task(task_id)
+    """Update a task
+    
+    With If-Match the update only applies if the task still has that ETag.
+    """
+    task = await db.get_task(task_id)
     
     if not task:
         raise NotFoundException(f"Task {task_id} not found")
     
     # Check ownership
-    if task["user_id"] != current_user.id:
+    if task.user_id != current_user.id:
         raise ForbiddenException("You don't have access to this task")
     
+    expected_version = _check_if_match(if_match, db, task)
+    
     # Update task
-    updated_task = db.update_task(
+    updated_task = await db.update_task(
         task_id=task_id,
+        expected_version=expected_version,
         title=task_data.title,
         description=task_data.description,
         status=task_data.status
     )
     
-    return Task(**updated_task)
+    if not updated_task:
+        # Changed or deleted since it was read above
+        if expected_version is not None:
+            raise PreconditionFailedException(f"Task {task_id} has been modified")
+        raise NotFoundException(f"Task {task_id} not found")
+    
+    return RecordJSONResponse(
+        task_to_dict(updated_task),
+        headers={"ETag": task_etag(db.etag_salt, updated_task.id, updated_task.version)}
+    )
 
 @router.patch("/{task_id}", response_model=Task)
 async def partial_update_task(
     task_id: int,
     task_data: TaskUpdate,
-    current_user: User = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
 ):
     """Partially update a task"""
-    return await update_task(task_id, task_data, current_user)
+    return await update_task(task_id, task_data, if_match, current_user, db)
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncRepository = Depends(get_db)
 ):
-    """Delete a task"""
-    task = db.get_task(task_id)
+    """Delete a task
+    
+    With If-Match the task is only deleted if it still has that ETag.
+    """
+    task = await db.get_task(task_id)
     
     if not task:
         raise NotFoundException(f"Task {task_id} not found")
     
     # Check ownership
-    if task["user_id"] != current_user.id:
+    if task.user_id != current_user.id:
         raise ForbiddenException("You don't have access to this task")
     
-    db.delete_task(task_id)
+    expected_version = _check_if_match(if_match, db, task)
+    
+    if not await db.delete_task(task_id, expected_version=expected_version):
+        if expected_version is not None:
+            raise PreconditionFailedException(f"Task {task_id} has been modified")
+        raise NotFoundException(f"Task {task_id} not found")
     
     return None
 
-@router.get("/admin/all", response_model=List[Task])
-async def get_all_tasks(current_user: User = Depends(require_admin)):
-    """Get all tasks (admin only)"""
-    tasks = db.get_all_tasks()
-    return [Task(**task) for task in tasks]
+def _check_if_match(if_match: Optional[str], db: AsyncRepository, task: TaskRecord) -> Optional[int]:
+    """Enforce an If-Match header; returns the version a conditional write must still find"""
+    if if_match is None:
+        return None
+    if not etag_matches(if_match, task_etag(db.etag_salt, task.id, task.version), weak=False):
+        raise PreconditionFailedException(f"Task {task.id} has been modified")
+    return task.version
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise BadRequestException(str(e))
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+@router.get("/admin/all", response_model=List[Task], response_description=PROJECTED_TASKS)
+async def get_all_tasks(
+    status: Optional[TaskStatus] = Query(None, description="Filter by status"),
+    user_id: Optional[int] = Query(None, description="Filter by owner"),
+    created_after: Optional[datetime] = Query(None, description="Only tasks created after this time (UTC)"),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                               description="json (array) or ndjson (one task per line)"),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to return (default all)"),
+    current_user: User = Depends(require_admin),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Get all tasks (admin only)
+    
+    The store is read lazily in batches and the body is streamed, so
+    memory stays flat regardless of how many tasks match. ``fields``
+    limits each task to the named fields.
+    """
+    encode = task_encoder(_parse_fields(fields))
+    batches = _scan_batches(
+        db,
+        status=status,
+        user_id=user_id,
+        created_after=datetime_to_us(created_after) if created_after else None
+    )
+    if output_format == "ndjson":
+        return StreamingResponse(_ndjson_chunks(batches, encode), media_type="application/x-ndjson")
+    return StreamingResponse(_json_array_chunks(batches, encode), media_type="application/json")
+
+@router.get("/admin/stats", response_model=TaskStatsOverview)
+async def get_all_task_stats(
+    user_id: Optional[int] = Query(None, description="Only report this user"),
+    current_user: User = Depends(require_admin),
+    db: AsyncRepository = Depends(get_db)
+):
+    """Count tasks by status, globally and per user (admin only)"""
+    if user_id is not None:
+        per_user = {user_id: await db.count_tasks_by_status(user_id)}
+    else:
+        per_user = await db.count_tasks_by_user()
+    users = [_task_stats(counts, UserTaskStats, user_id=owner_id) for owner_id, counts in per_user.items()]
+    return _task_stats(await db.count_tasks_by_status(), TaskStatsOverview, users=users)
+
+def _task_stats(counts: Dict[TaskStatus, int], model: Type[TaskStats] = TaskStats, **fields: Any) -> TaskStats:
+    return model(total=sum(counts.values()), by_status=counts, **fields)
+
+async def _scan_batches(db: AsyncRepository, **filters) -> AsyncIterator[List[TaskRecord]]:
+    """Yield matching tasks, one storage batch at a time"""
+    after_id = 0
+    while True:
+        batch = await db.scan_tasks(after_id=after_id, limit=STREAM_BATCH_SIZE, **filters)
+        if not batch:
+            return
+        after_id = batch[-1].id
+        yield batch
+
+async def _json_array_chunks(batches: AsyncIterator[List[TaskRecord]], encode: TaskEncoder) -> AsyncIterator[bytes]:
+    """Encode batches as one JSON array"""
+    yield b"["
+    separator = b""
+    async for batch in batches:
+        yield separator + dump_tasks(batch, encode)[1:-1]
+        separator = b","
+    yield b"]"
+
+async def _ndjson_chunks(batches: AsyncIterator[List[TaskRecord]], encode: TaskEncoder) -> AsyncIterator[bytes]:
+    """Encode batches as newline-delimited JSON"""
+    async for batch in batches:
+        yield dump_tasks_ndjson(batch, encode)
+
+async def _event_frames(subscription: Subscription, missed: Optional[List[TaskEvent]]) -> AsyncIterator[bytes]:
+    """SSE frames for a subscription, with heartbeats while idle"""
+    try:
+        # Retry quickly: reconnecting with Last-Event-ID loses nothing
+        yield b"retry: 1000\n\n"
+        if missed is None:
+            yield b'event: resync\ndata: {"reason": "gap"}\n\n'
+        else:
+            for event in missed:
+                yield event.frame
+        while True:
+            event = await subscription.get(settings.EVENTS_HEARTBEAT_SECONDS)
+            if subscription.closed:
+                return
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield b'event: resync\ndata: {"reason": "overflow", "dropped": %d}\n\n' % dropped
+            yield event.frame if event is not None else b": keepalive\n\n"
+    finally:
+        task_events.unsubscribe(subscription)
@@ -0,0 +1,149 @@
+"""Inverted full-text index over task titles and descriptions"""
+import heapq
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+from app.indexes import SortedIndex
+from app.records import TaskRecord
+
+TOKEN_RE = re.compile(r"\w+")
+
+# A title word counts this many times more than a description word
+TITLE_WEIGHT = 3
+# Share of the score a term earns when it only extends a query word
+PREFIX_WEIGHT = 0.5
+# Query words beyond this are ignored
+MAX_QUERY_TERMS = 8
+
+def tokenize(text: str) -> List[str]:
+    """Split text into case-folded word tokens"""
+    return TOKEN_RE.findall(text.casefold())
+
+def query_terms(query: str) -> List[str]:
+    """Distinct tokens of a search query, in order"""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+def task_terms(task: TaskRecord) -> Dict[str, int]:
+    """Term weights of a task: title words count TITLE_WEIGHT, description words 1"""
+    weights: Dict[str, int] = {}
+    for term in tokenize(task.title):
+        weights[term] = weights.get(term, 0) + TITLE_WEIGHT
+    if task.description:
+        for term in tokenize(task.description):
+            weights[term] = weights.get(term, 0) + 1
+    return weights
+
+class SearchIndex:
+    """Inverted index of one user's tasks
+
+    Maps every term to the weight it has in each task containing it, and
+    keeps the terms in a SortedIndex so a query word also matches the terms
+    it is a prefix of. Every query word must match (AND); tasks are ranked
+    by the sum over query words of term weight times inverse document
+    frequency, exact matches counting fully and prefix matches by
+    PREFIX_WEIGHT, newest first on ties.
+
+    Tasks are removed by re-reading their text, so ``discard`` must see the
+    task as it was when it was added.
+    """
+
+    def __init__(self, tasks: Iterable[TaskRecord] = ()):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_count = 0
+        for task in tasks:
+            self._add_postings(task)
+        self.terms = SortedIndex(self.postings)
+
+    def __len__(self) -> int:
+        return self.doc_count
+
+    def add(self, task: TaskRecord) -> None:
+        """Index a task"""
+        for term in self._add_postings(task):
+            self.terms.add(term)
+
+    def discard(self, task: TaskRecord) -> None:
+        """Remove a task indexed with its current title and description"""
+        postings = self.postings
+        for term in task_terms(task):
+            posting = postings.get(term)
+            if posting is None or posting.pop(task.id, None) is None:
+                continue
+            if not posting:
+                del postings[term]
+                self.terms.discard(term)
+        self.doc_count -= 1
+
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> Tuple[List[int], int]:
+        """Return (IDs of the matching tasks on the page, best first; total matches)"""
+        words = query_terms(query)
+        if not words:
+            return [], 0
+        per_word = []
+        for word in words:
+            scores = self._word_scores(word)
+            if not scores:
+                return [], 0
+            per_word.append(scores)
+
+        # Only tasks matching the rarest word can match them all
+        per_word.sort(key=len)
+        rarest, others = per_word[0], per_word[1:]
+        combined = {}
+        for task_id, score in rarest.items():
+            for scores in others:
+                other = scores.get(task_id)
+                if other is None:
+                    break
+                score += other
+            else:
+                combined[task_id] = score
+
+        top = heapq.nlargest(skip + limit, combined.items(), key=lambda item: (item[1], item[0]))
+        return [task_id for task_id, _ in top[skip:]], len(combined)
+
+    def _add_postings(self, task: TaskRecord) -> List[str]:
+        """Add a task's postings, returning the terms that are new to the index"""
+        new_terms = []
+        postings = self.postings
+        for term, weight in task_terms(task).items():
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = {}
+                new_terms.append(term)
+            posting[task.id] = weight
+        self.doc_count += 1
+        return new_terms
+
+    def _expand(self, word: str) -> Iterator[str]:
+        """Yield the indexed terms starting with word"""
+        if word in self.postings:
+            yield word
+        key = word
+        while True:
+            terms = self.terms.page_after(key, 256)
+            for term in terms:
+                if not term.startswith(word):
+                    return
+                yield term
+            if len(terms) < 256:
+                return
+            key = terms[-1]
+
+    def _word_scores(self, word: str) -> Dict[int, float]:
+        """Best score of each task for one query word"""
+        scores: Dict[int, float] = {}
+        doc_count = self.doc_count
+        for term in self._expand(word):
+            posting = self.postings[term]
+            idf = math.log(1 + doc_count / len(posting))
+            if term != word:
+                idf *= PREFIX_WEIGHT
+            if not scores:
+                scores = {task_id: weight * idf for task_id, weight in posting.items()}
+                continue
+            for task_id, weight in posting.items():
+                score = weight * idf
+                if score > scores.get(task_id, 0.0):
+                    scores[task_id] = score
+        return scores
@@ -0,0 +1,89 @@
+"""Fast JSON encoding of stored records
+
+Stored records were validated when they were written, so responses built
+from them can skip pydantic entirely. These helpers produce exactly the
+JSON the ``Task`` and ``TaskListResponse`` models would, encoded with
+orjson. Return them from routes as ``RecordJSONResponse`` so FastAPI does
+not revalidate them against the ``response_model``.
+"""
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import orjson
+from fastapi.responses import JSONResponse
+from app.records import TaskRecord, us_to_datetime
+
+TaskEncoder = Callable[[TaskRecord], Dict[str, Any]]
+
+class RecordJSONResponse(JSONResponse):
+    """JSON response encoded with orjson, for content built by these helpers"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def task_to_dict(task: TaskRecord) -> Dict[str, Any]:
+    """Plain dict of a task in ``Task`` field order"""
+    return {
+        "title": task.title,
+        "description": task.description,
+        "status": task.status.value,
+        "id": task.id,
+        "user_id": task.user_id,
+        "created_at": us_to_datetime(task.created_ts),
+        "updated_at": us_to_datetime(task.updated_ts),
+    }
+
+# How to read each ``Task`` field off a record, in ``Task`` field order
+TASK_FIELD_GETTERS: Dict[str, Callable[[TaskRecord], Any]] = {
+    "title": attrgetter("title"),
+    "description": attrgetter("description"),
+    "status": lambda task: task.status.value,
+    "id": attrgetter("id"),
+    "user_id": attrgetter("user_id"),
+    "created_at": lambda task: us_to_datetime(task.created_ts),
+    "updated_at": lambda task: us_to_datetime(task.updated_ts),
+}
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a ``fields`` parameter into Task field names in Task order
+
+    Returns None when every field is wanted. Raises ValueError on empty or
+    unknown names.
+    """
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",")}
+    unknown = sorted(name for name in names if name not in TASK_FIELD_GETTERS)
+    if unknown:
+        allowed = ", ".join(TASK_FIELD_GETTERS)
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or '(empty)'}; allowed: {allowed}")
+    projection = tuple(name for name in TASK_FIELD_GETTERS if name in names)
+    return None if len(projection) == len(TASK_FIELD_GETTERS) else projection
+
+def task_encoder(fields: Optional[Tuple[str, ...]] = None) -> TaskEncoder:
+    """Build the per-task encoder for a projection from ``parse_fields``
+
+    Fields left out are never read or converted. Build it once per request.
+    """
+    if fields is None:
+        return task_to_dict
+    getters = tuple((name, TASK_FIELD_GETTERS[name]) for name in fields)
+    return lambda task: {name: get(task) for name, get in getters}
+
+def task_list_to_dict(tasks: Iterable[TaskRecord], total: Optional[int], skip: int, limit: int,
+                      next_cursor: Optional[str] = None, encode: TaskEncoder = task_to_dict) -> Dict[str, Any]:
+    """Plain dict of a task page in ``TaskListResponse`` field order"""
+    return {
+        "tasks": [encode(task) for task in tasks],
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
+
+def dump_tasks(tasks: List[TaskRecord], encode: TaskEncoder = task_to_dict) -> bytes:
+    """Encode tasks as a JSON array"""
+    return orjson.dumps([encode(task) for task in tasks])
+
+def dump_tasks_ndjson(tasks: List[TaskRecord], encode: TaskEncoder = task_to_dict) -> bytes:
+    """Encode tasks as newline-delimited JSON"""
+    return b"".join(orjson.dumps(encode(task)) + b"\n" for task in tasks)
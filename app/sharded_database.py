@@ -0,0 +1,242 @@
+"""Sharded, thread-safe in-memory database"""
+import heapq
+import threading
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.database import Database
+from app.models import UserRole, TaskStatus
+from app.records import TaskRecord, UserRecord
+from app.repository import Repository, TASK_CREATED, TASK_UPDATED, TASK_DELETED, TaskChange
+
+_task_id = attrgetter("id")
+
+def _copies(tasks: Iterable[TaskRecord]) -> List[TaskRecord]:
+    return [task.copy() for task in tasks]
+
+class _Shard(Database):
+    """One partition of a ShardedDatabase
+
+    Owns the task IDs congruent to ``index + 1`` modulo ``count``, so shards
+    allocate IDs independently and a task's shard follows from its ID.
+    """
+
+    def __init__(self, index: int, count: int):
+        super().__init__()
+        self.index = index
+        self.count = count
+        self.task_id_counter = index + 1
+        self.lock = threading.Lock()
+
+    def _next_task_id(self) -> int:
+        task_id = self.task_id_counter
+        self.task_id_counter += self.count
+        return task_id
+
+    def _task_ids_after(self, after_id: int) -> Iterable[int]:
+        start = after_id + 1
+        start += (self.index + 1 - start) % self.count
+        return range(start, self.task_id_counter, self.count)
+
+class ShardedDatabase(Repository):
+    """In-memory database partitioned by user for concurrent access
+
+    Tasks live in ``shards`` independent Database partitions chosen by
+    ``user_id``; every call takes only its partition's lock, so threads
+    working on users in different shards never wait for each other. Task
+    IDs are allocated per shard under that lock. Users are kept in one more
+    Database behind their own lock.
+
+    Records are copied before their shard's lock is released: the shard
+    updates its own in place, so callers never see a task change under
+    them.
+    """
+
+    # Lock waits are bounded by in-memory work, safe to call on the event loop
+    blocking = False
+
+    def __init__(self, shards: int = 16):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.shards = [_Shard(index, shards) for index in range(shards)]
+        self._users = Database()
+        self._users_lock = threading.Lock()
+        self.etag_salt = self._users.etag_salt
+
+    def shard_for_user(self, user_id: int) -> _Shard:
+        """Partition holding a user's tasks"""
+        return self.shards[user_id % len(self.shards)]
+
+    def shard_for_task(self, task_id: int) -> _Shard:
+        """Partition that allocated a task ID"""
+        return self.shards[(task_id - 1) % len(self.shards)]
+
+    @property
+    def tombstone_retention_us(self) -> int:
+        return self.shards[0].tombstone_retention_us
+
+    @tombstone_retention_us.setter
+    def tombstone_retention_us(self, value: int) -> None:
+        # Shards keep and purge the tombstones
+        for shard in self.shards:
+            shard.tombstone_retention_us = value
+
+    # User operations
+    def create_user(self, email: str, username: str, hashed_password: str, role: UserRole = UserRole.USER) -> UserRecord:
+        """Create a new user"""
+        with self._users_lock:
+            return self._users.create_user(email, username, hashed_password, role)
+
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
+        """Get user by username"""
+        with self._users_lock:
+            return self._users.get_user_by_username(username)
+
+    def get_user_by_id(self, user_id: int) -> Optional[UserRecord]:
+        """Get user by ID"""
+        with self._users_lock:
+            return self._users.get_user_by_id(user_id)
+
+    def username_exists(self, username: str) -> bool:
+        """Check if username exists"""
+        with self._users_lock:
+            return self._users.username_exists(username)
+
+    def email_exists(self, email: str) -> bool:
+        """Check if email exists"""
+        with self._users_lock:
+            return self._users.email_exists(email)
+
+    # Task operations
+    def create_task(self, user_id: int, title: str, description: Optional[str], status: TaskStatus) -> TaskRecord:
+        """Create a new task"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            task = shard.create_task(user_id, title, description, status).copy()
+        self._notify(TASK_CREATED, task)
+        return task
+
+    def create_tasks(self, user_id: int, tasks: List[Dict[str, Any]]) -> List[TaskRecord]:
+        """Create several tasks of one user in a single shard write"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            created = _copies(shard.create_tasks(user_id, tasks))
+        for task in created:
+            self._notify(TASK_CREATED, task)
+        return created
+
+    def get_task(self, task_id: int) -> Optional[TaskRecord]:
+        """Get task by ID"""
+        if task_id < 1:
+            return None
+        shard = self.shard_for_task(task_id)
+        with shard.lock:
+            task = shard.get_task(task_id)
+            return task.copy() if task else None
+
+    def get_user_tasks(self, user_id: int, skip: int = 0, limit: int = 100,
+                       status: Optional[TaskStatus] = None, sort_by: str = "created_at",
+                       after: Optional[Tuple[Any, int]] = None) -> List[TaskRecord]:
+        """Get tasks for a user with filtering and pagination"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            return _copies(shard.get_user_tasks(user_id, skip, limit, status, sort_by, after))
+
+    def count_user_tasks(self, user_id: int, status: Optional[TaskStatus] = None) -> int:
+        """Count user tasks"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            return shard.count_user_tasks(user_id, status)
+
+    def count_tasks_by_status(self, user_id: Optional[int] = None) -> Dict[TaskStatus, int]:
+        """Count tasks per status, for one user or all"""
+        if user_id is not None:
+            shard = self.shard_for_user(user_id)
+            with shard.lock:
+                return shard.count_tasks_by_status(user_id)
+        counts = dict.fromkeys(TaskStatus, 0)
+        for shard in self.shards:
+            with shard.lock:
+                for status, count in shard.status_counts.items():
+                    counts[status] += count
+        return counts
+    
+    def count_tasks_by_user(self) -> Dict[int, Dict[TaskStatus, int]]:
+        """Per-status task counts of every user with tasks"""
+        counts = {}
+        for shard in self.shards:
+            with shard.lock:
+                counts.update(shard.count_tasks_by_user())
+        return dict(sorted(counts.items()))
+    
+    def update_task(self, task_id: int, expected_version: Optional[int] = None, **kwargs) -> Optional[TaskRecord]:
+        """Update a task"""
+        if task_id < 1:
+            return None
+        shard = self.shard_for_task(task_id)
+        with shard.lock:
+            task = shard.update_task(task_id, expected_version, **kwargs)
+            task = task.copy() if task else None
+        if task is not None:
+            self._notify(TASK_UPDATED, task)
+        return task
+
+    def delete_task(self, task_id: int, expected_version: Optional[int] = None) -> bool:
+        """Delete a task"""
+        if task_id < 1:
+            return False
+        shard = self.shard_for_task(task_id)
+        with shard.lock:
+            task = shard.get_task(task_id)
+            deleted = shard.delete_task(task_id, expected_version)
+        if deleted:
+            self._notify(TASK_DELETED, task)
+        return deleted
+
+    def get_task_version(self, task_id: int) -> Optional[Tuple[int, int]]:
+        """Get (owner user ID, version) of a task"""
+        if task_id < 1:
+            return None
+        shard = self.shard_for_task(task_id)
+        with shard.lock:
+            return shard.get_task_version(task_id)
+
+    def get_collection_version(self, user_id: int) -> int:
+        """Get the version of a user's task collection"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            return shard.get_collection_version(user_id)
+
+    def get_changes(self, user_id: int, after: Tuple[int, int], limit: int = 100) -> Optional[List[TaskChange]]:
+        """Get a user's task changes after a position in their change order"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            changes = shard.get_changes(user_id, after, limit)
+            if changes is None:
+                return None
+            return [change.copy() if isinstance(change, TaskRecord) else change for change in changes]
+
+    def search_tasks(self, user_id: int, query: str, skip: int = 0, limit: int = 20) -> Tuple[List[TaskRecord], int]:
+        """Full-text search over a user's task titles and descriptions"""
+        shard = self.shard_for_user(user_id)
+        with shard.lock:
+            tasks, total = shard.search_tasks(user_id, query, skip, limit)
+            return _copies(tasks), total
+    
+    def get_all_tasks(self) -> List[TaskRecord]:
+        """Get all tasks (admin only)"""
+        per_shard = []
+        for shard in self.shards:
+            with shard.lock:
+                per_shard.append(_copies(shard.get_all_tasks()))
+        return list(heapq.merge(*per_shard, key=_task_id))
+
+    def scan_tasks(self, after_id: int = 0, limit: int = 1000, status: Optional[TaskStatus] = None,
+                   user_id: Optional[int] = None, created_after: Optional[int] = None) -> List[TaskRecord]:
+        """Get the next batch of tasks in ID order (admin only)"""
+        shards = self.shards if user_id is None else [self.shard_for_user(user_id)]
+        # The next batch is among the first `limit` matches of each shard
+        per_shard = []
+        for shard in shards:
+            with shard.lock:
+                per_shard.append(_copies(shard.scan_tasks(after_id, limit, status, user_id, created_after)))
+        return list(heapq.merge(*per_shard, key=_task_id))[:limit]
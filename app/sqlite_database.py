@@ -0,0 +1,521 @@
+"""SQLite storage backend"""
+import queue
+import secrets
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.models import UserRole, TaskStatus
+from app.records import TaskRecord, TaskTombstone, UserRecord, now_us
+from app.repository import (
+    Repository, UPDATABLE_TASK_FIELDS, TASK_CREATED, TASK_UPDATED, TASK_DELETED, TaskChange, change_key, parse_sort
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL UNIQUE,
+    username TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    role TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    status TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS task_collections (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_counts (
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, status)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS task_tombstones (
+    user_id INTEGER NOT NULL,
+    deleted_at INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, deleted_at, task_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_task_tombstones_deleted ON task_tombstones (deleted_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_user_status_created ON tasks (user_id, status, created_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_user_created ON tasks (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_user_updated ON tasks (user_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_user_title ON tasks (user_id, title);
+CREATE TRIGGER IF NOT EXISTS tasks_count_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO task_counts (user_id, status, count) VALUES (NEW.user_id, NEW.status, 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_count_delete AFTER DELETE ON tasks BEGIN
+    UPDATE task_counts SET count = count - 1 WHERE user_id = OLD.user_id AND status = OLD.status;
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_count_status AFTER UPDATE OF status ON tasks
+WHEN OLD.status != NEW.status BEGIN
+    UPDATE task_counts SET count = count - 1 WHERE user_id = OLD.user_id AND status = OLD.status;
+    INSERT INTO task_counts (user_id, status, count) VALUES (NEW.user_id, NEW.status, 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET count = count + 1;
+END;
+"""
+
+USER_COLUMNS = "id, email, username, hashed_password, role, created_at"
+TASK_COLUMNS = "id, user_id, title, description, status, created_at, updated_at, version"
+
+# Statements are constant strings with bound parameters, so every
+# connection's statement cache reuses the prepared versions.
+INSERT_USER = "INSERT INTO users (email, username, hashed_password, role, created_at) VALUES (?, ?, ?, ?, ?)"
+SELECT_USER_BY_ID = f"SELECT {USER_COLUMNS} FROM users WHERE id = ?"
+SELECT_USER_BY_USERNAME = f"SELECT {USER_COLUMNS} FROM users WHERE username = ?"
+USERNAME_EXISTS = "SELECT 1 FROM users WHERE username = ?"
+EMAIL_EXISTS = "SELECT 1 FROM users WHERE email = ?"
+INSERT_TASK = (
+    "INSERT INTO tasks (user_id, title, description, status, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SELECT_TASK = f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?"
+SELECT_ALL_TASKS = f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY id"
+# Counts come from the trigger-kept task_counts, never a scan of tasks
+COUNT_USER_TASKS = "SELECT COALESCE(SUM(count), 0) FROM task_counts WHERE user_id = ?"
+COUNT_USER_STATUS_TASKS = "SELECT COALESCE(SUM(count), 0) FROM task_counts WHERE user_id = ? AND status = ?"
+DELETE_TASK = f"DELETE FROM tasks WHERE id = ? RETURNING {TASK_COLUMNS}"
+DELETE_TASK_VERSION = f"DELETE FROM tasks WHERE id = ? AND version = ? RETURNING {TASK_COLUMNS}"
+SELECT_TASK_VERSION = "SELECT user_id, version FROM tasks WHERE id = ?"
+SELECT_COLLECTION_VERSION = "SELECT version FROM task_collections WHERE user_id = ?"
+COUNT_USER_TASKS_BY_STATUS = "SELECT status, count FROM task_counts WHERE user_id = ?"
+COUNT_TASKS_BY_STATUS = "SELECT status, SUM(count) FROM task_counts GROUP BY status"
+COUNT_TASKS_BY_USER = "SELECT user_id, status, count FROM task_counts WHERE count > 0 ORDER BY user_id"
+# ix_tasks_user_updated ends in the rowid (the task ID). A (updated_at, id) row
+# value would only seek on updated_at and then scan a bulk write's shared
+# timestamp, so the rest of that timestamp and the later ones are two seeks.
+SELECT_CHANGED_TASKS = (
+    f"SELECT * FROM (SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = ? AND updated_at = ? AND id > ? "
+    "ORDER BY id LIMIT ?) "
+    f"UNION ALL SELECT * FROM (SELECT {TASK_COLUMNS} FROM tasks WHERE user_id = ? AND updated_at > ? "
+    "ORDER BY updated_at, id LIMIT ?)"
+)
+SELECT_TOMBSTONES = (
+    "SELECT task_id, deleted_at FROM task_tombstones WHERE user_id = ? AND (deleted_at, task_id) > (?, ?) "
+    "ORDER BY deleted_at, task_id LIMIT ?"
+)
+INSERT_TOMBSTONE = "INSERT OR IGNORE INTO task_tombstones (user_id, deleted_at, task_id) VALUES (?, ?, ?)"
+PURGE_TOMBSTONES = "DELETE FROM task_tombstones WHERE deleted_at < ?"
+# Expired tombstones are never returned, so purging them can wait this long (microseconds)
+TOMBSTONE_PURGE_INTERVAL_US = 60 * 1_000_000
+BUMP_COLLECTION_VERSION = (
+    "INSERT INTO task_collections (user_id, version) VALUES (?, 1) "
+    "ON CONFLICT (user_id) DO UPDATE SET version = version + 1"
+)
+
+def _user_from_row(row: Tuple) -> UserRecord:
+    user_id, email, username, hashed_password, role, created_ts = row
+    return UserRecord(user_id, email, username, hashed_password, UserRole(role), created_ts)
+
+def _task_from_row(row: Tuple) -> TaskRecord:
+    task_id, user_id, title, description, status, created_ts, updated_ts, version = row
+    return TaskRecord(task_id, user_id, title, description, TaskStatus(status), created_ts, updated_ts, version)
+
+def _list_query(field: str, descending: bool, with_status: bool, keyset: bool) -> str:
+    """Build the SELECT for one get_user_tasks shape"""
+    direction = "DESC" if descending else "ASC"
+    where = "user_id = ?"
+    if with_status:
+        where += " AND status = ?"
+    if keyset:
+        where += f" AND ({field}, id) {'<' if descending else '>'} (?, ?)"
+        tail = "LIMIT ?"
+    else:
+        tail = "LIMIT ? OFFSET ?"
+    return f"SELECT {TASK_COLUMNS} FROM tasks WHERE {where} ORDER BY {field} {direction}, id {direction} {tail}"
+
+class SQLiteDatabase(Repository):
+    """SQLite-backed database
+
+    Uses WAL mode so readers never block the writer. Writes go through a
+    single connection guarded by a lock; reads borrow a connection from a
+    fixed-size pool.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._migrate()
+        self.etag_salt = self._load_etag_salt()
+        self._list_queries: Dict[Tuple[str, bool, bool, bool], str] = {}
+        self._next_tombstone_purge = 0
+        self._last_write_ts = 0
+
+        # An in-memory database is private to its connection, so reads share the writer
+        self._readers: Optional[queue.Queue] = None
+        if path != ":memory:" and pool_size > 0:
+            self._readers = queue.Queue()
+            for _ in range(pool_size):
+                self._readers.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self) -> None:
+        """Bring databases created by older versions up to the current schema"""
+        # task_counts is kept by triggers from its creation on; count what came before
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'task_counts'").fetchone() is None:
+                conn.execute("DELETE FROM task_counts")
+                conn.execute(
+                    "INSERT INTO task_counts (user_id, status, count) "
+                    "SELECT user_id, status, COUNT(*) FROM tasks GROUP BY user_id, status"
+                )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('task_counts', '1')")
+
+    def _load_etag_salt(self) -> str:
+        """Random per-database salt, so versions from another database never validate"""
+        with self._write() as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('etag_salt', ?)", (secrets.token_hex(4),))
+            return conn.execute("SELECT value FROM meta WHERE key = 'etag_salt'").fetchone()[0]
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a reader connection from the pool"""
+        if self._readers is None:
+            with self._write_lock:
+                yield self._writer
+            return
+
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction on the writer connection"""
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+
+    def _write_ts(self) -> int:
+        """Current time for a task write, strictly after every earlier write (write lock held)
+
+        Writes commit in lock order, so changes then commit in the
+        (time, task ID) order get_changes pages through.
+        """
+        now = max(now_us(), self._last_write_ts + 1)
+        self._last_write_ts = now
+        return now
+
+    # User operations
+    def create_user(self, email: str, username: str, hashed_password: str, role: UserRole = UserRole.USER) -> UserRecord:
+        """Create a new user"""
+        role = UserRole(role)
+        created_ts = now_us()
+        with self._write() as conn:
+            cursor = conn.execute(INSERT_USER, (email, username, hashed_password, role.value, created_ts))
+        return UserRecord(cursor.lastrowid, email, username, hashed_password, role, created_ts)
+
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
+        """Get user by username"""
+        with self._read() as conn:
+            row = conn.execute(SELECT_USER_BY_USERNAME, (username,)).fetchone()
+        return _user_from_row(row) if row else None
+
+    def get_user_by_id(self, user_id: int) -> Optional[UserRecord]:
+        """Get user by ID"""
+        with self._read() as conn:
+            row = conn.execute(SELECT_USER_BY_ID, (user_id,)).fetchone()
+        return _user_from_row(row) if row else None
+
+    def username_exists(self, username: str) -> bool:
+        """Check if username exists"""
+        with self._read() as conn:
+            return conn.execute(USERNAME_EXISTS, (username,)).fetchone() is not None
+
+    def email_exists(self, email: str) -> bool:
+        """Check if email exists"""
+        with self._read() as conn:
+            return conn.execute(EMAIL_EXISTS, (email,)).fetchone() is not None
+
+    # Task operations
+    def create_task(self, user_id: int, title: str, description: Optional[str], status: TaskStatus) -> TaskRecord:
+        """Create a new task"""
+        with self._write() as conn:
+            task = self._insert_task(conn, user_id, title, description, status, self._write_ts())
+        self._notify(TASK_CREATED, task)
+        return task
+
+    def _insert_task(self, conn: sqlite3.Connection, user_id: int, title: str,
+                     description: Optional[str], status: TaskStatus, now: int) -> TaskRecord:
+        status = TaskStatus(status)
+        cursor = conn.execute(INSERT_TASK, (user_id, title, description, status.value, now, now))
+        conn.execute(BUMP_COLLECTION_VERSION, (user_id,))
+        return TaskRecord(cursor.lastrowid, user_id, title, description, status, now, now)
+
+    def get_task(self, task_id: int) -> Optional[TaskRecord]:
+        """Get task by ID"""
+        with self._read() as conn:
+            row = conn.execute(SELECT_TASK, (task_id,)).fetchone()
+        return _task_from_row(row) if row else None
+
+    def get_user_tasks(self, user_id: int, skip: int = 0, limit: int = 100,
+                       status: Optional[TaskStatus] = None, sort_by: str = "created_at",
+                       after: Optional[Tuple[Any, int]] = None) -> List[TaskRecord]:
+        """Get tasks for a user with filtering and pagination"""
+        field, descending = parse_sort(sort_by)
+        shape = (field, descending, bool(status), after is not None)
+        sql = self._list_queries.get(shape)
+        if sql is None:
+            sql = self._list_queries.setdefault(shape, _list_query(*shape))
+
+        params: List[Any] = [user_id]
+        if status:
+            params.append(TaskStatus(status).value)
+        if after is not None:
+            params.extend((*after, limit))
+        else:
+            params.extend((limit, skip))
+
+        with self._read() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [_task_from_row(row) for row in rows]
+
+    def count_user_tasks(self, user_id: int, status: Optional[TaskStatus] = None) -> int:
+        """Count user tasks"""
+        with self._read() as conn:
+            if status:
+                row = conn.execute(COUNT_USER_STATUS_TASKS, (user_id, TaskStatus(status).value)).fetchone()
+            else:
+                row = conn.execute(COUNT_USER_TASKS, (user_id,)).fetchone()
+        return row[0]
+
+    def count_tasks_by_status(self, user_id: Optional[int] = None) -> Dict[TaskStatus, int]:
+        """Count tasks per status, for one user or all"""
+        counts = dict.fromkeys(TaskStatus, 0)
+        with self._read() as conn:
+            if user_id is None:
+                rows = conn.execute(COUNT_TASKS_BY_STATUS).fetchall()
+            else:
+                rows = conn.execute(COUNT_USER_TASKS_BY_STATUS, (user_id,)).fetchall()
+        for status, count in rows:
+            counts[TaskStatus(status)] = count
+        return counts
+
+    def count_tasks_by_user(self) -> Dict[int, Dict[TaskStatus, int]]:
+        """Per-status task counts of every user with tasks"""
+        counts: Dict[int, Dict[TaskStatus, int]] = {}
+        with self._read() as conn:
+            rows = conn.execute(COUNT_TASKS_BY_USER).fetchall()
+        for user_id, status, count in rows:
+            counts.setdefault(user_id, dict.fromkeys(TaskStatus, 0))[TaskStatus(status)] = count
+        return counts
+
+    def update_task(self, task_id: int, expected_version: Optional[int] = None, **kwargs) -> Optional[TaskRecord]:
+        """Update a task"""
+        with self._write() as conn:
+            task = self._update_task(conn, task_id, kwargs, self._write_ts(), expected_version)
+        if task is not None:
+            self._notify(TASK_UPDATED, task)
+        return task
+
+    def _update_task(self, conn: sqlite3.Connection, task_id: int, kwargs: Dict[str, Any],
+                     now: int, expected_version: Optional[int] = None) -> Optional[TaskRecord]:
+        changes = {
+            key: value for key, value in kwargs.items()
+            if key in UPDATABLE_TASK_FIELDS and value is not None
+        }
+        if "status" in changes:
+            changes["status"] = TaskStatus(changes["status"]).value
+        changes["updated_at"] = now
+
+        # Column names come from UPDATABLE_TASK_FIELDS, never from the caller
+        assignments = ", ".join(f"{key} = ?" for key in changes)
+        params = [*changes.values(), task_id]
+        where = "id = ?"
+        if expected_version is not None:
+            where += " AND version = ?"
+            params.append(expected_version)
+        sql = f"UPDATE tasks SET {assignments}, version = version + 1 WHERE {where} RETURNING {TASK_COLUMNS}"
+        rows = conn.execute(sql, params).fetchall()
+        if not rows:
+            return None
+        task = _task_from_row(rows[0])
+        conn.execute(BUMP_COLLECTION_VERSION, (task.user_id,))
+        return task
+
+    def delete_task(self, task_id: int, expected_version: Optional[int] = None) -> bool:
+        """Delete a task"""
+        with self._write() as conn:
+            now = self._write_ts()
+            task = self._delete_task(conn, task_id, now, expected_version)
+            self._purge_tombstones(conn, now)
+        if task is None:
+            return False
+        self._notify(TASK_DELETED, task)
+        return True
+
+    def _delete_task(self, conn: sqlite3.Connection, task_id: int, now: int,
+                     expected_version: Optional[int] = None) -> Optional[TaskRecord]:
+        """Delete a task, leaving a tombstone, and return it as it was"""
+        if expected_version is None:
+            rows = conn.execute(DELETE_TASK, (task_id,)).fetchall()
+        else:
+            rows = conn.execute(DELETE_TASK_VERSION, (task_id, expected_version)).fetchall()
+        if not rows:
+            return None
+        task = _task_from_row(rows[0])
+        conn.execute(INSERT_TOMBSTONE, (task.user_id, now, task.id))
+        conn.execute(BUMP_COLLECTION_VERSION, (task.user_id,))
+        return task
+
+    def _purge_tombstones(self, conn: sqlite3.Connection, now: int) -> None:
+        """Forget tombstones older than the retention window, at most once per interval"""
+        if now < self._next_tombstone_purge:
+            return
+        conn.execute(PURGE_TOMBSTONES, (now - self.tombstone_retention_us,))
+        self._next_tombstone_purge = now + TOMBSTONE_PURGE_INTERVAL_US
+
+    def get_changes(self, user_id: int, after: Tuple[int, int], limit: int = 100) -> Optional[List[TaskChange]]:
+        """Get a user's task changes after a position in their change order"""
+        if after[0] < now_us() - self.tombstone_retention_us:
+            return None
+        after_ts, after_id = after
+        with self._read() as conn:
+            # One snapshot for both, so a task deleted in between is seen exactly once
+            conn.execute("BEGIN")
+            try:
+                tasks = conn.execute(
+                    SELECT_CHANGED_TASKS, (user_id, after_ts, after_id, limit, user_id, after_ts, limit)
+                ).fetchall()
+                tombstones = conn.execute(SELECT_TOMBSTONES, (user_id, after_ts, after_id, limit)).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        changes: List[TaskChange] = [_task_from_row(row) for row in tasks]
+        changes.extend(TaskTombstone(task_id, user_id, deleted_ts) for task_id, deleted_ts in tombstones)
+        changes.sort(key=change_key)
+        return changes[:limit]
+
+    def get_task_version(self, task_id: int) -> Optional[Tuple[int, int]]:
+        """Get (owner user ID, version) of a task"""
+        with self._read() as conn:
+            row = conn.execute(SELECT_TASK_VERSION, (task_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def get_collection_version(self, user_id: int) -> int:
+        """Get the version of a user's task collection"""
+        with self._read() as conn:
+            row = conn.execute(SELECT_COLLECTION_VERSION, (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    # Bulk task operations, each applied in a single transaction
+    def get_tasks(self, task_ids: List[int]) -> List[Optional[TaskRecord]]:
+        """Get several tasks by ID"""
+        found: Dict[int, TaskRecord] = {}
+        unique_ids = list(dict.fromkeys(task_ids))
+        with self._read() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_ids), 500):
+                chunk = unique_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id IN ({placeholders})", chunk)
+                for row in rows:
+                    found[row[0]] = _task_from_row(row)
+        return [found.get(task_id) for task_id in task_ids]
+
+    def create_tasks(self, user_id: int, tasks: List[Dict[str, Any]]) -> List[TaskRecord]:
+        """Create several tasks from dicts with title, description and status"""
+        with self._write() as conn:
+            now = self._write_ts()
+            created = [
+                self._insert_task(conn, user_id, task["title"], task.get("description"),
+                                  task.get("status", TaskStatus.TODO), now)
+                for task in tasks
+            ]
+        for task in created:
+            self._notify(TASK_CREATED, task)
+        return created
+
+    def update_tasks(self, updates: List[Tuple[int, Dict[str, Any]]]) -> List[Optional[TaskRecord]]:
+        """Apply several (task_id, changes) updates"""
+        with self._write() as conn:
+            now = self._write_ts()
+            updated = [self._update_task(conn, task_id, changes, now) for task_id, changes in updates]
+        for task in updated:
+            if task is not None:
+                self._notify(TASK_UPDATED, task)
+        return updated
+
+    def delete_tasks(self, task_ids: List[int]) -> List[bool]:
+        """Delete several tasks"""
+        with self._write() as conn:
+            now = self._write_ts()
+            deleted = [self._delete_task(conn, task_id, now) for task_id in task_ids]
+            self._purge_tombstones(conn, now)
+        for task in deleted:
+            if task is not None:
+                self._notify(TASK_DELETED, task)
+        return [task is not None for task in deleted]
+
+    def get_all_tasks(self) -> List[TaskRecord]:
+        """Get all tasks (admin only)"""
+        with self._read() as conn:
+            rows = conn.execute(SELECT_ALL_TASKS).fetchall()
+        return [_task_from_row(row) for row in rows]
+
+    def scan_tasks(self, after_id: int = 0, limit: int = 1000, status: Optional[TaskStatus] = None,
+                   user_id: Optional[int] = None, created_after: Optional[int] = None) -> List[TaskRecord]:
+        """Get the next batch of tasks in ID order (admin only)"""
+        where = "id > ?"
+        params: List[Any] = [after_id]
+        if user_id is not None:
+            where += " AND user_id = ?"
+            params.append(user_id)
+        if status:
+            where += " AND status = ?"
+            params.append(TaskStatus(status).value)
+        if created_after is not None:
+            where += " AND created_at > ?"
+            params.append(created_after)
+        params.append(limit)
+
+        with self._read() as conn:
+            rows = conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks WHERE {where} ORDER BY id LIMIT ?", params).fetchall()
+        return [_task_from_row(row) for row in rows]
+
+    def ping(self) -> bool:
+        """Check that the database answers queries"""
+        with self._read() as conn:
+            return conn.execute("SELECT 1").fetchone() is not None
+
+    def close(self) -> None:
+        """Close every connection"""
+        with self._write_lock:
+            self._writer.close()
+        if self._readers is not None:
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
@@ -0,0 +1,90 @@
+"""Benchmark delta sync cost against collection size and change count
+
+Fills a user's collection, records a sync position, applies a number of
+updates and deletes, then times paging through get_changes from that
+position, next to re-reading the whole collection (the only way to sync
+before the change feed). Runs against the in-memory and SQLite backends.
+
+Usage: python benchmarks/bench_changes.py [tasks]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from app.database import Database
+from app.models import TaskStatus
+from app.repository import change_key
+from app.sqlite_database import SQLiteDatabase
+
+TASKS = 100_000
+CHANGE_COUNTS = (10, 100, 1_000)
+PAGE = 500
+RUNS = 5
+
+def sync(db, after):
+    """Page through every change after a position, returning (changes, new position)"""
+    count = 0
+    while True:
+        page = db.get_changes(1, after, PAGE)
+        if not page:
+            return count, after
+        count += len(page)
+        after = change_key(page[-1])
+
+def full_read(db):
+    """Read the user's whole collection, one keyset page at a time"""
+    count, after = 0, None
+    while batch := db.get_user_tasks(1, limit=PAGE, sort_by="-created_at", after=after):
+        count += len(batch)
+        after = (batch[-1].created_ts, batch[-1].id)
+    return count
+
+def timed(fn, *args):
+    """Median milliseconds over RUNS calls, and the last result"""
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - start)
+    return median(samples) * 1000, result
+
+def run_backend(name, db, tasks):
+    rng = random.Random(7)
+    db.create_tasks(1, [{"title": f"Task {i}", "status": TaskStatus.TODO} for i in range(tasks)])
+    live = list(range(1, tasks + 1))
+    # Also builds the in-memory updated_at index before timing
+    _, position = sync(db, (db.get_task(1).created_ts, 0))
+
+    ms, total = timed(full_read, db)
+    print(f"{name:>7} | {'full read':>9} | {total:>8} | {ms:>8.2f}ms")
+    for changes in CHANGE_COUNTS:
+        for _ in range(changes):
+            task_id = live[rng.randrange(len(live))]
+            if rng.random() < 0.2:
+                db.delete_task(task_id)
+                live.remove(task_id)
+            else:
+                db.update_task(task_id, status=TaskStatus.DONE)
+        ms, (seen, position) = timed(sync, db, position)
+        print(f"{name:>7} | {changes:>9} | {seen:>8} | {ms:>8.2f}ms")
+
+def run_benchmark(tasks):
+    """Time delta syncs and full reads on each backend"""
+    print(f"{'backend':>7} | {'changes':>9} | {'returned':>8} | {'time':>10}")
+    print("-" * 44)
+    run_backend("memory", Database(), tasks)
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteDatabase(os.path.join(directory, "tasks.db"))
+        try:
+            run_backend("sqlite", db, tasks)
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else TASKS)
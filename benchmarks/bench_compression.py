@@ -0,0 +1,84 @@
+"""Benchmark response compression on typical task payloads
+
+Encodes list pages and an admin dump, then times gzip and brotli at a few
+levels. For each, reports the compressed size, the time to compress, and
+the resulting time to deliver the body over a slow and a fast link
+(compression time plus transfer time), which is the bandwidth/latency
+trade-off the CompressionMiddleware settings choose between.
+
+Usage: python benchmarks/bench_compression.py [iterations]
+"""
+import gzip
+import os
+import sys
+import time
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from app.compression import _Encoder
+from app.database import Database
+from app.models import TaskStatus
+from app.serialization import dump_tasks_ndjson, task_list_to_dict
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ITERATIONS = 50
+# Link speeds in bytes per second
+LINKS = (("10 Mbit/s", 10_000_000 / 8), ("1 Gbit/s", 1_000_000_000 / 8))
+ENCODERS = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+if brotli is not None:
+    ENCODERS += [("br", 1), ("br", 4), ("br", 11)]
+
+def make_payloads():
+    """Encode the responses the API typically sends"""
+    db = Database()
+    words = ["Write", "docs", "Fix", "login", "bug", "Ship", "release", "Review", "PR", "for", "API"]
+    for i in range(10_000):
+        title = " ".join(words[(i + k) % len(words)] for k in range(3 + i % 4))
+        description = f"Follow up on item {i} with the team" if i % 2 else None
+        db.create_task(1 + i % 50, title, description, list(TaskStatus)[i % 3])
+    page = db.get_user_tasks(1, limit=20)
+    full_page = db.get_user_tasks(1, limit=100)
+    return [
+        ("GET /tasks (20)", orjson.dumps(task_list_to_dict(page, len(page), 0, 20))),
+        ("GET /tasks (100)", orjson.dumps(task_list_to_dict(full_page, 200, 0, 100))),
+        ("admin dump (10k)", dump_tasks_ndjson(db.get_all_tasks())),
+    ]
+
+def compress(encoding, level, body):
+    """One-shot compression through the middleware's encoder"""
+    return _Encoder(encoding, gzip_level=level, brotli_quality=level).finish(body)
+
+def run_benchmark(iterations):
+    """Print size and delivery time for every payload and encoder"""
+    header = f"{'payload':>17} | {'encoding':>8} | {'bytes':>9} | {'ratio':>6} | {'compress':>9}"
+    header += "".join(f" | {name:>10}" for name, _ in LINKS)
+    print(header)
+    print("-" * len(header))
+    for name, body in make_payloads():
+        rows = [("identity", body, 0.0)]
+        for encoding, level in ENCODERS:
+            runs = iterations if len(body) < 100_000 or level < 9 else max(3, iterations // 10)
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                data = compress(encoding, level, body)
+                samples.append(time.perf_counter() - start)
+            rows.append((f"{encoding}-{level}", data, median(samples)))
+        # Sanity check the gzip path decodes
+        assert gzip.decompress(rows[2][1]) == body
+        for label, data, seconds in rows:
+            line = f"{name:>17} | {label:>8} | {len(data):>9} | {len(body) / len(data):>5.1f}x | {seconds * 1000:>7.2f}ms"
+            for _, speed in LINKS:
+                line += f" | {(seconds + len(data) / speed) * 1000:>8.2f}ms"
+            print(line)
+        print()
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS)
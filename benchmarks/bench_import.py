@@ -0,0 +1,119 @@
+"""Benchmark bulk task import against creating tasks one at a time
+
+Times loading tasks into a user's collection whose sort and search indexes
+are already built: in the store, a create_task call per task against
+create_tasks in import-sized chunks and the import's NDJSON parsing on top;
+through the API (in-process, via TestClient), one POST /tasks per task
+against a single streamed POST /tasks/import.
+
+Usage: python benchmarks/bench_import.py [tasks]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+os.environ.setdefault("ADMIN_PASSWORD", "Admin123")
+
+import orjson
+from fastapi.testclient import TestClient
+from app import database
+from app.config import settings
+from app.database import Database, create_default_admin
+from app.importer import NDJSON, TaskImportParser
+from app.models import TaskStatus
+from main import app
+
+TASKS = 100_000
+# Tasks already in the collection before the import starts
+EXISTING = 10_000
+# POST /tasks calls timed; their rate is what a client looping over them gets
+HTTP_SINGLE = 2_000
+STATUSES = list(TaskStatus)
+
+# Keep per-request logging out of the measurements
+logging.disable(logging.WARNING)
+
+def rows(count):
+    return [{"title": f"Imported task {i}", "description": None, "status": STATUSES[i % 3]} for i in range(count)]
+
+def prepared_db():
+    """Database with an existing collection and its indexes materialised"""
+    db = Database()
+    create_default_admin(db)
+    db.create_tasks(1, rows(EXISTING))
+    for sort_by in ("created_at", "-title", "status"):
+        db.get_user_tasks(1, sort_by=sort_by)
+        db.get_user_tasks(1, status=TaskStatus.TODO, sort_by=sort_by)
+    db.search_tasks(1, "task")
+    return db
+
+def one_by_one(db, tasks):
+    for task in tasks:
+        db.create_task(1, task["title"], task["description"], task["status"])
+
+def chunked(db, tasks):
+    for start in range(0, len(tasks), settings.IMPORT_CHUNK_SIZE):
+        db.create_tasks(1, tasks[start:start + settings.IMPORT_CHUNK_SIZE])
+
+def ndjson_import(db, body):
+    """Parse a body in 64 KiB reads and create the rows in chunks, like the route"""
+    parser = TaskImportParser(NDJSON, 1)
+    pending = []
+    for start in range(0, len(body), 65536):
+        pending.extend(parser.feed(body[start:start + 65536]))
+        if len(pending) >= settings.IMPORT_CHUNK_SIZE:
+            db.create_tasks(1, [row.fields for row in pending])
+            pending = []
+    pending.extend(parser.finish())
+    db.create_tasks(1, [row.fields for row in pending])
+
+def http_one_by_one(client, headers, tasks):
+    for task in tasks[:HTTP_SINGLE]:
+        client.post("/api/v1/tasks", json={"title": task["title"], "status": task["status"].value}, headers=headers)
+    return min(len(tasks), HTTP_SINGLE)
+
+def http_import(client, headers, tasks):
+    def body():
+        for start in range(0, len(tasks), 500):
+            yield b"".join(orjson.dumps(task) + b"\n" for task in tasks[start:start + 500])
+    response = client.post("/api/v1/tasks/import", content=body(),
+                           headers={**headers, "Content-Type": "application/x-ndjson"})
+    return response.json()["imported"]
+
+def run_http(tasks):
+    """Load tasks for the admin through the API, each way"""
+    client = TestClient(app)
+    for name, load in (("POST /tasks per task", http_one_by_one), ("POST /tasks/import", http_import)):
+        database.db = prepared_db()
+        response = client.post("/api/v1/auth/login", json={"username": "admin", "password": "Admin123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        start = time.perf_counter()
+        loaded = load(client, headers, tasks)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>22} | {elapsed:>8.2f}s | {loaded / elapsed:>9.0f}")
+
+def run_benchmark(count):
+    """Time each way of loading ``count`` tasks"""
+    tasks = rows(count)
+    body = b"".join(orjson.dumps(task) + b"\n" for task in tasks)
+    cases = (
+        ("create_task per task", one_by_one, tasks),
+        (f"create_tasks x{settings.IMPORT_CHUNK_SIZE}", chunked, tasks),
+        ("NDJSON import", ndjson_import, body),
+    )
+    print(f"{'path':>22} | {'time':>9} | {'tasks/s':>9}")
+    print("-" * 46)
+    for name, load, data in cases:
+        db = prepared_db()
+        start = time.perf_counter()
+        load(db, data)
+        elapsed = time.perf_counter() - start
+        assert db.count_user_tasks(1) == EXISTING + count
+        print(f"{name:>22} | {elapsed:>8.2f}s | {count / elapsed:>9.0f}")
+    run_http(tasks)
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else TASKS)
@@ -0,0 +1,81 @@
+"""Benchmark the journaled in-memory database
+
+Measures create_task throughput under each fsync policy (against the plain
+in-memory store), then recovery time for a store of N tasks restored from
+a snapshot plus journal tail and from the journal alone.
+
+Usage: python benchmarks/bench_journal.py [tasks]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from app.database import Database
+from app.journaled_database import JournaledDatabase
+from app.models import TaskStatus
+
+TASKS = 200_000
+# fsync per write is slow; keep that run short
+ALWAYS_WRITES = 2_000
+# Journal entries left after the last snapshot in the recovery run
+TAIL = 10_000
+
+def write_tasks(db, count):
+    """Create count tasks across 100 users and return ops/s"""
+    start = time.perf_counter()
+    for i in range(count):
+        db.create_task(i % 100 + 1, f"Task {i}", "x" * 50, TaskStatus.TODO)
+    return count / (time.perf_counter() - start)
+
+def measure_throughput(tmp, count):
+    """Print write throughput per fsync policy"""
+    print(f"{'store':>16} | {'writes':>8} | {'ops/s':>10} | {'fsyncs':>8}")
+    print("-" * 52)
+    print(f"{'memory':>16} | {count:>8} | {write_tasks(Database(), count):>10.0f} | {0:>8}")
+    for policy, writes in (("off", count), ("batch", count), ("always", ALWAYS_WRITES)):
+        db = JournaledDatabase(os.path.join(tmp, f"throughput-{policy}"), fsync=policy,
+                               snapshot_every=10 ** 9)
+        ops = write_tasks(db, writes)
+        db.close()
+        print(f"{'journal/' + policy:>16} | {writes:>8} | {ops:>10.0f} | {db.journal.syncs:>8}")
+
+def measure_recovery(tmp, count):
+    """Print recovery time from snapshot + tail and from the journal alone"""
+    snapshot_dir = os.path.join(tmp, "recovery-snapshot")
+    db = JournaledDatabase(snapshot_dir, fsync="off", snapshot_every=10 ** 9)
+    write_tasks(db, count - TAIL)
+    start = time.perf_counter()
+    db.snapshot()
+    snapshot_seconds = time.perf_counter() - start
+    write_tasks(db, TAIL)
+    db.close()
+
+    journal_dir = os.path.join(tmp, "recovery-journal")
+    db = JournaledDatabase(journal_dir, fsync="off", snapshot_every=10 ** 9)
+    write_tasks(db, count)
+    db.close()
+
+    print(f"\nsnapshot of {count - TAIL} tasks written in {snapshot_seconds:.2f}s")
+    for name, directory in (("snapshot + tail", snapshot_dir), ("journal only", journal_dir)):
+        start = time.perf_counter()
+        db = JournaledDatabase(directory, fsync="off")
+        elapsed = time.perf_counter() - start
+        assert len(db.tasks) == count
+        db.close()
+        print(f"recovery ({name}): {elapsed:.2f}s for {count} tasks ({count / elapsed:.0f} tasks/s)")
+
+def run_benchmark(count):
+    """Run the throughput and recovery measurements"""
+    with tempfile.TemporaryDirectory() as tmp:
+        measure_throughput(tmp, count)
+        measure_recovery(tmp, count)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TASKS
+    if count < TAIL:
+        sys.exit(f"tasks must be at least {TAIL}, the journal tail of the recovery run")
+    run_benchmark(count)
@@ -0,0 +1,66 @@
+"""Benchmark list latency as a user's task count grows
+
+Compares Database.get_user_tasks (ordered indexes) with the previous
+copy-sort-slice implementation for a first page of 10 tasks.
+
+Usage: python benchmarks/bench_list_tasks.py [max_tasks]
+"""
+import os
+import sys
+import time
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from app.database import Database
+from app.models import TaskStatus
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+ITERATIONS = 200
+LIMIT = 10
+STATUSES = list(TaskStatus)
+
+def legacy_get_user_tasks(db, user_id, skip=0, limit=100, sort_by="created_at"):
+    """The pre-index implementation: copy, full sort, slice"""
+    user_tasks = [t for t in db.tasks.values() if t.user_id == user_id]
+    user_tasks.sort(key=lambda x: x.sort_value(sort_by), reverse=True)
+    return user_tasks[skip:skip + limit]
+
+def p99(samples):
+    """99th percentile in milliseconds"""
+    return quantiles(samples, n=100)[98] * 1000
+
+def measure(fn, iterations):
+    """Time repeated calls of fn"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def run_benchmark(max_tasks):
+    """Run the benchmark for every size up to max_tasks"""
+    db = Database()
+    print(f"{'tasks':>10} | {'indexed p99':>12} | {'write p99':>10} | {'legacy p99':>11}")
+    print("-" * 54)
+
+    for size in [s for s in SIZES if s <= max_tasks]:
+        while db.count_user_tasks(1) < size:
+            n = db.count_user_tasks(1)
+            db.create_task(1, f"Task {n}", None, STATUSES[n % len(STATUSES)])
+
+        db.get_user_tasks(1, limit=LIMIT, sort_by="title")  # build the index once
+        indexed = measure(lambda: db.get_user_tasks(1, limit=LIMIT, sort_by="title"), ITERATIONS)
+
+        # Writes keep the materialised indexes current
+        writes = measure(lambda: db.update_task(1 + size // 2, title="Renamed"), ITERATIONS)
+
+        legacy_iterations = max(3, ITERATIONS * 1_000 // size)
+        legacy = measure(lambda: legacy_get_user_tasks(db, 1, limit=LIMIT, sort_by="title"), legacy_iterations)
+
+        print(f"{size:>10} | {p99(indexed):>10.3f}ms | {p99(writes):>8.3f}ms | {p99(legacy):>9.3f}ms")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1])
@@ -0,0 +1,67 @@
+"""Benchmark memory used by stored tasks
+
+Measures, with tracemalloc, the memory held by N tasks stored as the
+previous 7-key dicts (with datetime timestamps) and as TaskRecord objects.
+
+Usage: python benchmarks/bench_memory.py [tasks]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import TaskStatus
+from app.records import TaskRecord, now_us
+
+TASKS = 1_000_000
+STATUSES = list(TaskStatus)
+
+def build_dicts(count):
+    """Tasks in the previous dict layout"""
+    tasks = {}
+    for i in range(count):
+        now = datetime.utcnow()
+        tasks[i] = {
+            "id": i,
+            "user_id": i % 1000,
+            "title": f"Task {i}",
+            "description": None,
+            "status": STATUSES[i % 3],
+            "created_at": now,
+            "updated_at": now
+        }
+    return tasks
+
+def build_records(count):
+    """Tasks as slotted records"""
+    tasks = {}
+    for i in range(count):
+        now = now_us()
+        tasks[i] = TaskRecord(i, i % 1000, f"Task {i}", None, STATUSES[i % 3], now, now)
+    return tasks
+
+def measure(build, count):
+    """Bytes still allocated after building the store"""
+    gc.collect()
+    tracemalloc.start()
+    store = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current
+
+def run_benchmark(count):
+    """Compare both layouts"""
+    dict_bytes = measure(build_dicts, count)
+    record_bytes = measure(build_records, count)
+
+    print(f"Tasks stored:  {count:,}")
+    print(f"dict layout:   {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / count:.0f} B/task)")
+    print(f"TaskRecord:    {record_bytes / 2**20:8.1f} MiB ({record_bytes / count:.0f} B/task)")
+    print(f"Reduction:     {1 - record_bytes / dict_bytes:8.1%}")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else TASKS)
@@ -0,0 +1,178 @@
+"""Benchmark the request ID, logging and rate limit middleware stacks
+
+Serves /health and GET /api/v1/tasks through the full application with
+the custom middleware built two ways: the previous BaseHTTPMiddleware
+classes (kept below for comparison) and the pure ASGI ones in
+app/middleware.py. Requests are driven straight through the ASGI
+interface, so the numbers are the server's own cost without a network or
+test client in the way. Rate limiting uses an in-process counter instead
+of Redis to leave out the network round trip.
+
+Usage: python benchmarks/bench_middleware.py [requests]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+os.environ.setdefault("ADMIN_PASSWORD", "Admin123")
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from app import database
+from app.auth import create_access_token
+from app.compression import CompressionMiddleware
+from app.database import Database, create_default_admin
+from app.middleware import LoggingMiddleware, RateLimitMiddleware, RequestIDMiddleware
+from app.models import TaskStatus
+from app.routes import health
+import main
+
+REQUESTS = 5_000
+TASKS = 20
+
+# Keep per-request logging out of the measurements (its cost is the same in both stacks)
+logging.disable(logging.WARNING)
+
+class CountingRedis:
+    """In-process stand-in for the Redis counter"""
+
+    def __init__(self):
+        self.counters = {}
+
+    def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    def expire(self, key, seconds):
+        return True
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.counters[keys[0]] = self.counters.get(keys[0], 0) + args[0]
+            return self.counters[keys[0]]
+        return run
+
+# The middleware as it was before the pure ASGI rewrite
+class LegacyRequestIDMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        request_id = getattr(request.state, "request_id", "unknown")
+        main.logger.info(f"Request {request_id}: {request.method} {request.url.path}")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        main.logger.info(f"Response {request_id}: {response.status_code} - {process_time:.3f}s")
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, redis_client, limit_per_minute: int = 60):
+        super().__init__(app)
+        self.redis_client = redis_client
+        self.limit_per_minute = limit_per_minute
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path.startswith("/health"):
+            return await call_next(request)
+        client_id = request.client.host
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            client_id = f"user:{auth_header}"
+        key = f"rate_limit:{client_id}:{int(time.time() // 60)}"
+        current = self.redis_client.incr(key)
+        if current == 1:
+            self.redis_client.expire(key, 60)
+        request.state.rate_limit_count = current
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(self.limit_per_minute)
+        response.headers["X-RateLimit-Remaining"] = str(max(0, self.limit_per_minute - current))
+        response.headers["X-RateLimit-Reset"] = str(int(time.time()) + (60 - (int(time.time()) % 60)))
+        return response
+
+STACKS = {
+    "BaseHTTPMiddleware": (LegacyRequestIDMiddleware, LegacyLoggingMiddleware, LegacyRateLimitMiddleware),
+    "pure ASGI": (RequestIDMiddleware, LoggingMiddleware, RateLimitMiddleware),
+}
+
+def build_app(request_id, logging_middleware, rate_limit):
+    """The application as main.py assembles it, with the given custom middleware"""
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(rate_limit, redis_client=CountingRedis(), limit_per_minute=10 ** 9)
+    app.add_middleware(logging_middleware)
+    app.add_middleware(request_id)
+    app.mount("/api/v1", main.api_v1)
+    app.include_router(health.router)
+    return app
+
+async def call(app, path, headers):
+    """Serve one GET request, returning the response status"""
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 1234),
+        "http_version": "1.1", "headers": headers,
+    }
+    messages = []
+    requested = []
+    done = asyncio.Event()
+
+    async def receive():
+        if requested:
+            # The client stays connected until the response is complete
+            await done.wait()
+            return {"type": "http.disconnect"}
+        requested.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+async def requests_per_second(app, path, headers, count):
+    assert await call(app, path, headers) == 200
+    start = time.perf_counter()
+    for _ in range(count):
+        await call(app, path, headers)
+    return count / (time.perf_counter() - start)
+
+def run_benchmark(count):
+    """Compare both stacks on a trivial and a real route"""
+    db = Database()
+    create_default_admin(db)
+    db.create_tasks(1, [{"title": f"Task {i}", "status": TaskStatus.TODO} for i in range(TASKS)])
+    database.db = db
+    token = create_access_token({"sub": "1"})
+    routes = (
+        ("/health", [], "/health"),
+        ("/api/v1/tasks", [(b"authorization", f"Bearer {token}".encode())], "GET /tasks"),
+    )
+
+    print(f"{'stack':>18} | {'route':>10} | {'req/s':>8} | {'per request':>11}")
+    print("-" * 58)
+    for name, middleware in STACKS.items():
+        app = build_app(*middleware)
+        for path, headers, label in routes:
+            rate = asyncio.run(requests_per_second(app, path, headers, count))
+            print(f"{name:>18} | {label:>10} | {rate:>8.0f} | {1e6 / rate:>9.0f}us")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS)
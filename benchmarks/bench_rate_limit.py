@@ -0,0 +1,76 @@
+"""Benchmark Redis operations per request with and without token leases
+
+Sends requests from a set of clients, spread round-robin over several
+workers that each have their own RateLimitMiddleware and LeaseCache but
+share one Redis (fakeredis, running the real Lua scripts). A simulated
+clock moves 1 ms per request, from the start of a minute. For each
+algorithm and lease size it reports Redis script runs per request and how
+many requests each client got admitted; the lease 0 row is the exact
+figure, and the difference is the accuracy leasing trades away.
+
+Usage: python benchmarks/bench_rate_limit.py [requests per client]
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+import fakeredis
+from app.middleware import RateLimitMiddleware
+from app.rate_limit import LeaseCache, create_policy
+
+REQUESTS = 1_000
+CLIENTS = 20
+WORKERS = 4
+LIMIT = 600
+LEASE_SIZES = (0, 10, 50)
+START = 60 * 30_000_000
+
+class CountingRedis(fakeredis.FakeAsyncRedis):
+    """fakeredis that counts script runs"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.script_calls = 0
+
+    async def evalsha(self, *args, **kwargs):
+        self.script_calls += 1
+        return await super().evalsha(*args, **kwargs)
+
+async def run_case(algorithm, lease_size, requests):
+    """Return Redis runs per request and the requests admitted per client"""
+    redis_client = CountingRedis(decode_responses=True)
+    policy = create_policy(algorithm, LIMIT)
+    workers = [
+        RateLimitMiddleware(
+            None, redis_client, policy=policy,
+            leases=LeaseCache(lease_size) if lease_size else None
+        )
+        for _ in range(WORKERS)
+    ]
+    admitted = 0
+    clock = SimpleNamespace(now=START)
+    with mock.patch("app.middleware.time", SimpleNamespace(time=lambda: clock.now)):
+        for i in range(requests):
+            for client in range(CLIENTS):
+                clock.now += 0.001
+                result = await workers[(i + client) % WORKERS]._hit(f"client-{client}", 1)
+                admitted += result.allowed
+    return redis_client.script_calls / (requests * CLIENTS), admitted / CLIENTS
+
+def run_benchmark(requests):
+    """Compare lease sizes for each algorithm"""
+    print(f"{CLIENTS} clients x {requests} requests over {WORKERS} workers, limit {LIMIT}")
+    print(f"{'algorithm':>12} | {'lease':>5} | {'redis/req':>9} | {'admitted/client':>15}")
+    print("-" * 52)
+    for algorithm in ("fixed", "sliding", "token_bucket"):
+        for lease_size in LEASE_SIZES:
+            per_request, admitted = asyncio.run(run_case(algorithm, lease_size, requests))
+            print(f"{algorithm:>12} | {lease_size:>5} | {per_request:>9.3f} | {admitted:>15.1f}")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS)
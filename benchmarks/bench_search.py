@@ -0,0 +1,98 @@
+"""Benchmark full-text search latency at 1M indexed tasks
+
+Fills an in-memory store with synthetic tasks whose words follow a Zipf
+distribution, indexes every user, then times typical queries: a common
+word, a rare word, two words, and short and long prefixes. Also times
+incremental index maintenance on updates, and one query through the
+Repository default (reindexing the user per call) as the no-index
+baseline.
+
+Usage: python benchmarks/bench_search.py [tasks] [users]
+"""
+import os
+import random
+import sys
+import time
+from itertools import accumulate
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from app.database import Database
+from app.models import TaskStatus
+from app.repository import Repository
+
+TASKS = 1_000_000
+USERS = 100
+VOCABULARY = 20_000
+QUERIES_PER_KIND = 200
+
+def make_words(rng):
+    """Pronounceable synthetic vocabulary"""
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    words = set()
+    while len(words) < VOCABULARY:
+        length = rng.randint(2, 5)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words)
+
+def summarize(samples):
+    """Return (p50 ms, p99 ms)"""
+    cuts = quantiles(samples, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+def run_benchmark(tasks, users):
+    """Index tasks, then time each query kind"""
+    rng = random.Random(42)
+    words = make_words(rng)
+    # Zipf-like weights: a few words are very common, most are rare
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(words))))
+    db = Database()
+    start = time.perf_counter()
+    for i in range(tasks):
+        title = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 6)))
+        description = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(5, 20))) if i % 3 else None
+        db.create_task(1 + i % users, title, description, TaskStatus.TODO)
+    print(f"Stored {tasks} tasks for {users} users in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    for user_id in range(1, users + 1):
+        db.search_tasks(user_id, words[0])
+    print(f"Indexed every user in {time.perf_counter() - start:.1f}s")
+
+    kinds = {
+        "common word": lambda: words[rng.randrange(10)],
+        "rare word": lambda: words[rng.randrange(1_000, len(words))],
+        "two words": lambda: f"{words[rng.randrange(100)]} {words[rng.randrange(100, 2_000)]}",
+        "2-char prefix": lambda: words[rng.randrange(len(words))][:2],
+        "4-char prefix": lambda: words[rng.randrange(len(words))][:4],
+    }
+    print(f"{'query':>14} | {'p50':>8} | {'p99':>8} | {'avg hits':>9}")
+    print("-" * 49)
+    for name, make_query in kinds.items():
+        samples, hits = [], 0
+        for _ in range(QUERIES_PER_KIND):
+            user_id, query = rng.randint(1, users), make_query()
+            start = time.perf_counter()
+            _, total = db.search_tasks(user_id, query, 0, 20)
+            samples.append(time.perf_counter() - start)
+            hits += total
+        p50, p99 = summarize(samples)
+        print(f"{name:>14} | {p50:>6.3f}ms | {p99:>6.3f}ms | {hits / QUERIES_PER_KIND:>9.0f}")
+
+    task_ids = rng.sample(range(1, tasks + 1), 2_000)
+    start = time.perf_counter()
+    for task_id in task_ids:
+        db.update_task(task_id, title=" ".join(rng.choices(words, cum_weights=cum_weights, k=4)))
+    print(f"\nUpdate with reindex: {(time.perf_counter() - start) / len(task_ids) * 1e6:.1f}us per task")
+
+    start = time.perf_counter()
+    Repository.search_tasks(db, 1, words[5000])
+    print(f"Unindexed search of one user ({tasks // users} tasks): {(time.perf_counter() - start) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else TASKS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else USERS
+    )
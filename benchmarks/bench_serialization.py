@@ -0,0 +1,92 @@
+"""Benchmark encoding a list_tasks page of 100 tasks
+
+Compares the previous response path (validate every record into a Task,
+wrap in TaskListResponse, let FastAPI revalidate and serialise it through
+the response_model, then json.dumps) with the trusted-record path (plain
+dicts encoded by orjson). Also times the whole GET /api/v1/tasks request.
+
+Usage: python benchmarks/bench_serialization.py [iterations]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from app import database
+from app.database import Database
+from app.models import Task, TaskListResponse, TaskStatus
+from app.routes.tasks import router
+from app.serialization import RecordJSONResponse, task_list_to_dict
+from main import app
+
+ITERATIONS = 2_000
+LIMIT = 100
+
+# Keep per-request logging out of the measurements
+logging.disable(logging.WARNING)
+
+def summarize(samples):
+    """Return (p50 ms, p99 ms)"""
+    cuts = quantiles(samples, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+def measure(fn, iterations):
+    """Time repeated calls of fn"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def run_benchmark(iterations):
+    """Time both encoders on the same page, then the full request"""
+    db = Database()
+    for i in range(LIMIT):
+        db.create_task(1, f"Task {i}", "x" * 100, list(TaskStatus)[i % 3])
+    tasks = db.get_user_tasks(1, limit=LIMIT)
+    list_route = next(r for r in router.routes if r.path == "/tasks" and "GET" in r.methods)
+    loop = asyncio.new_event_loop()
+
+    def legacy():
+        response = TaskListResponse(
+            tasks=[Task.model_validate(task) for task in tasks], total=LIMIT, skip=0, limit=LIMIT
+        )
+        content = loop.run_until_complete(serialize_response(
+            field=list_route.response_field, response_content=response, is_coroutine=True
+        ))
+        return JSONResponse(content).body
+
+    def fast():
+        return RecordJSONResponse(task_list_to_dict(tasks, LIMIT, 0, LIMIT)).body
+
+    print(f"{'path':>22} | {'p50':>8} | {'p99':>8}")
+    print("-" * 44)
+    for name, fn in (("legacy encode", legacy), ("orjson encode", fast)):
+        p50, p99 = summarize(measure(fn, iterations))
+        print(f"{name:>22} | {p50:>6.3f}ms | {p99:>6.3f}ms")
+
+    database.db = db
+    client = TestClient(app)
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"email": "bench@example.com", "username": "bench", "password": "Bench12345"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # The bench user is user 2; give it the same page
+    for i in range(LIMIT):
+        db.create_task(2, f"Task {i}", "x" * 100, list(TaskStatus)[i % 3])
+    samples = measure(lambda: client.get(f"/api/v1/tasks?limit={LIMIT}", headers=headers), iterations // 4)
+    p50, p99 = summarize(samples)
+    print(f"{'GET /tasks (full)':>22} | {p50:>6.3f}ms | {p99:>6.3f}ms")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS)
@@ -0,0 +1,84 @@
+"""Benchmark the sharded store's multi-threaded throughput
+
+Runs a mixed workload (70% list reads, 20% creates, 10% updates) from
+several threads, each working on its own users, against ShardedDatabase
+with a growing shard count. One shard is equivalent to a single global
+lock. On a GIL build threads still take turns executing Python code, so
+more shards measure at 0.90-0.97x one shard, within run-to-run noise;
+only free-threaded builds can run the shards in parallel.
+
+Usage: python benchmarks/bench_sharded.py [threads] [operations per thread]
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from app.models import TaskStatus
+from app.sharded_database import ShardedDatabase
+
+THREADS = 8
+OPERATIONS = 20_000
+USERS_PER_THREAD = 16
+SEED_TASKS_PER_USER = 200
+SHARD_COUNTS = (1, 2, 4, 8, 16, 32)
+
+def seed(db, threads):
+    """Give every user some tasks to list"""
+    task_ids = {}
+    for user_id in range(1, threads * USERS_PER_THREAD + 1):
+        task_ids[user_id] = [
+            db.create_task(user_id, f"Task {i}", None, TaskStatus.TODO).id
+            for i in range(SEED_TASKS_PER_USER)
+        ]
+        db.get_user_tasks(user_id, sort_by="title")
+    return task_ids
+
+def worker(db, thread_index, operations, task_ids, barrier):
+    """Run the mixed workload over this thread's users"""
+    rng = random.Random(thread_index)
+    users = range(thread_index * USERS_PER_THREAD + 1, (thread_index + 1) * USERS_PER_THREAD + 1)
+    barrier.wait()
+    for i in range(operations):
+        user_id = rng.choice(users)
+        op = rng.random()
+        if op < 0.7:
+            db.get_user_tasks(user_id, limit=20, sort_by="title")
+        elif op < 0.9:
+            db.create_task(user_id, f"New {i}", None, TaskStatus.TODO)
+        else:
+            db.update_task(rng.choice(task_ids[user_id]), status=TaskStatus.DONE)
+
+def run_benchmark(threads, operations):
+    """Measure total ops/s for each shard count"""
+    print(f"{threads} threads x {operations} operations")
+    print(f"{'shards':>6} | {'ops/s':>10} | {'vs 1 shard':>10}")
+    print("-" * 33)
+    baseline = None
+    for shards in SHARD_COUNTS:
+        db = ShardedDatabase(shards=shards)
+        task_ids = seed(db, threads)
+        barrier = threading.Barrier(threads + 1)
+        pool = [
+            threading.Thread(target=worker, args=(db, index, operations, task_ids, barrier))
+            for index in range(threads)
+        ]
+        for thread in pool:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in pool:
+            thread.join()
+        ops = threads * operations / (time.perf_counter() - start)
+        baseline = baseline or ops
+        print(f"{shards:>6} | {ops:>10.0f} | {ops / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else THREADS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else OPERATIONS
+    )
@@ -0,0 +1,86 @@
+"""Benchmark the storage backends under the task CRUD routes
+
+Runs create, list, get, update and delete through the API (in-process,
+via TestClient) once against the in-memory store and once against SQLite.
+
+Usage: python benchmarks/bench_storage.py [operations]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from statistics import quantiles
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from fastapi.testclient import TestClient
+from app import database
+from app.database import Database
+from app.sqlite_database import SQLiteDatabase
+from main import app
+
+OPERATIONS = 500
+
+# Keep per-request logging out of the measurements
+logging.disable(logging.WARNING)
+
+def summarize(samples):
+    """Return (ops/s, p50 ms, p99 ms)"""
+    cuts = quantiles(samples, n=100)
+    return len(samples) / sum(samples), cuts[49] * 1000, cuts[98] * 1000
+
+def timed(samples, fn):
+    """Call fn, record its duration and return its result"""
+    start = time.perf_counter()
+    result = fn()
+    samples.append(time.perf_counter() - start)
+    return result
+
+def run_crud(client, operations):
+    """Exercise every CRUD route and collect latencies per route"""
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"email": "bench@example.com", "username": "bench", "password": "Bench12345"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    results = {name: [] for name in ("create", "list", "get", "update", "delete")}
+
+    task_ids = []
+    for i in range(operations):
+        response = timed(results["create"], lambda: client.post(
+            "/api/v1/tasks", json={"title": f"Task {i}", "description": "x" * 100}, headers=headers
+        ))
+        task_ids.append(response.json()["id"])
+    for _ in range(operations):
+        timed(results["list"], lambda: client.get("/api/v1/tasks?limit=20&sort_by=title", headers=headers))
+    for task_id in task_ids:
+        timed(results["get"], lambda: client.get(f"/api/v1/tasks/{task_id}", headers=headers))
+    for task_id in task_ids:
+        timed(results["update"], lambda: client.patch(
+            f"/api/v1/tasks/{task_id}", json={"status": "done"}, headers=headers
+        ))
+    for task_id in task_ids:
+        timed(results["delete"], lambda: client.delete(f"/api/v1/tasks/{task_id}", headers=headers))
+    return results
+
+def run_benchmark(operations):
+    """Run the CRUD workload against each backend"""
+    client = TestClient(app)
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": Database(),
+            "sqlite": SQLiteDatabase(os.path.join(tmp, "bench.db")),
+        }
+        print(f"{'backend':>8} | {'route':>7} | {'ops/s':>8} | {'p50':>8} | {'p99':>8}")
+        print("-" * 52)
+        for name, backend in backends.items():
+            database.db = backend
+            for route, samples in run_crud(client, operations).items():
+                ops, p50, p99 = summarize(samples)
+                print(f"{name:>8} | {route:>7} | {ops:>8.0f} | {p50:>6.2f}ms | {p99:>6.2f}ms")
+            backend.close()
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else OPERATIONS)
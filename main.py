@@ -1,12 +1,17 @@
 """Main FastAPI application"""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import redis
+import redis.asyncio
 import logging
 
+from app import database
+from app.compression import CompressionMiddleware
 from app.config import settings
 from app.middleware import RequestIDMiddleware, LoggingMiddleware, RateLimitMiddleware
+from app.rate_limit import create_policy, rate_limit_fallback, rate_limit_leases
 from app.exceptions import APIException
 from app.routes import auth, tasks, health
 
@@ -17,11 +22,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Flush and release the storage backend and the Redis pool on shutdown"""
+    yield
+    database.db.close()
+    await redis_client.aclose()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    description="A production-ready Task Management API with authentication, rate limiting, and async capabilities"
+    description="A production-ready Task Management API with authentication, rate limiting, and async capabilities",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -33,25 +46,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Redis client for rate limiting
+# Compress large responses for clients that accept it
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
+# Redis client for rate limiting: a pooled asyncio client, so requests
+# never block the event loop on Redis. The client connects lazily, so
+# rate limiting starts in-process when Redis is down and moves to Redis
+# once it is reachable. The startup check stays synchronous.
+redis_client = redis.asyncio.Redis.from_pool(redis.asyncio.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_TIMEOUT_SECONDS,
+    socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+    socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS
+))
 try:
-    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-    redis_client.ping()
+    with redis.from_url(settings.REDIS_URL, socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS) as probe:
+        probe.ping()
     logger.info("Connected to Redis")
 except Exception as e:
-    logger.warning(f"Could not connect to Redis: {e}. Rate limiting will be disabled.")
-    redis_client = None
+    logger.warning(f"Could not connect to Redis: {e}. Rate limiting will use in-process counters until it is up.")
 
-# Add custom middleware
-app.add_middleware(RequestIDMiddleware)
-app.add_middleware(LoggingMiddleware)
+# Add custom middleware; the last added runs first, so every response
+# (429s included) gets a request ID that the log lines share
+app.add_middleware(
+    RateLimitMiddleware,
+    redis_client=redis_client,
+    timeout=settings.REDIS_TIMEOUT_SECONDS,
+    policy=create_policy(
+        settings.RATE_LIMIT_ALGORITHM,
+        settings.RATE_LIMIT_PER_MINUTE,
+        burst=settings.RATE_LIMIT_BURST
+    ),
+    leases=rate_limit_leases,
+    fallback=rate_limit_fallback
+)
 
-if redis_client:
-    app.add_middleware(
-        RateLimitMiddleware,
-        redis_client=redis_client,
-        limit_per_minute=settings.RATE_LIMIT_PER_MINUTE
-    )
+app.add_middleware(LoggingMiddleware)
+app.add_middleware(RequestIDMiddleware)
 
 # Global exception handler
 @app.exception_handler(APIException)
@@ -99,6 +137,8 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 # Include routers with versioning
 api_v1 = FastAPI()
+api_v1.add_exception_handler(APIException, api_exception_handler)
+api_v1.add_exception_handler(Exception, general_exception_handler)
 api_v1.include_router(auth.router)
 api_v1.include_router(tasks.router)
 
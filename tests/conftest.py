@@ -1,13 +1,23 @@
 """Test configuration and fixtures"""
+import os
+
+# Tests run against the in-memory store unless told otherwise
+os.environ.setdefault("DATABASE_URL", "memory://")
+# and are not held back by the app's rate limit (tests set up their own)
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "1000000")
+# The admin fixtures log in with this password
+os.environ.setdefault("ADMIN_PASSWORD", "Admin123")
+
 import pytest
 from fastapi.testclient import TestClient
-from app.database import Database
+from app.database import Database, create_default_admin
 from main import app
 
 @pytest.fixture
 def test_db():
     """Create a fresh database for each test"""
     db = Database()
+    create_default_admin(db)
     return db
 
 @pytest.fixture
@@ -0,0 +1,98 @@
+"""Test the async storage adapter"""
+import asyncio
+import time
+import pytest
+from fastapi import status
+from app import database
+from app.async_database import AsyncRepository
+from app.database import Database, create_default_admin
+from app.exceptions import ServiceUnavailableException
+from app.models import TaskStatus
+from app.sqlite_database import SQLiteDatabase
+
+class SlowDatabase(Database):
+    """In-memory store that pretends to block on I/O"""
+    blocking = True
+
+    def get_task(self, task_id):
+        time.sleep(0.3)
+        return super().get_task(task_id)
+
+def test_non_blocking_backend_runs_inline():
+    """Test that the in-memory store is called without a thread pool"""
+    adb = AsyncRepository(Database())
+
+    async def scenario():
+        task = await adb.create_task(1, "Inline", None, TaskStatus.TODO)
+        return task, await adb.count_user_tasks(1)
+
+    task, count = asyncio.run(scenario())
+    assert task.title == "Inline"
+    assert count == 1
+    assert adb._executor is None
+
+def test_slow_call_does_not_block_loop():
+    """Test that other coroutines progress while a storage call blocks"""
+    adb = AsyncRepository(SlowDatabase(), max_workers=2)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        await adb.get_task(1)
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+    adb.close()
+
+def test_timeout_raises_service_unavailable():
+    """Test that a call exceeding the timeout fails with 503"""
+    adb = AsyncRepository(SlowDatabase(), timeout=0.05)
+
+    with pytest.raises(ServiceUnavailableException) as exc_info:
+        asyncio.run(adb.get_task(1))
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.error_code == "STORAGE_TIMEOUT"
+    adb.close()
+
+def test_pending_limit_sheds_load():
+    """Test that calls beyond max_pending are rejected immediately"""
+    adb = AsyncRepository(SlowDatabase(), max_workers=1, max_pending=2)
+
+    async def scenario():
+        return await asyncio.gather(*(adb.get_task(1) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    rejected = [r for r in results if isinstance(r, ServiceUnavailableException)]
+    assert len(rejected) == 1
+    assert rejected[0].error_code == "STORAGE_OVERLOADED"
+    adb.close()
+
+def test_routes_on_blocking_backend(client):
+    """Test the task routes end to end against SQLite"""
+    sqlite_db = SQLiteDatabase(":memory:")
+    create_default_admin(sqlite_db)
+    database.db = sqlite_db
+
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"email": "sql@example.com", "username": "sqluser", "password": "Sql123456"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client.post("/api/v1/tasks", json={"title": "Stored in SQLite"}, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    task_id = response.json()["id"]
+
+    response = client.get("/api/v1/tasks", headers=headers)
+    assert response.json()["total"] == 1
+    assert response.json()["tasks"][0]["id"] == task_id
+    assert sqlite_db.get_task(task_id).title == "Stored in SQLite"
+    sqlite_db.close()
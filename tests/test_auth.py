@@ -96,3 +96,18 @@ def test_password_validation(client):
         }
     )
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_default_admin_uses_configured_password(monkeypatch):
+    """Test that the admin is seeded from ADMIN_PASSWORD, and skipped without one"""
+    from app.auth import verify_password
+    from app.config import settings
+    from app.database import Database, create_default_admin
+    
+    db = Database()
+    create_default_admin(db, password="S3cret-admin")
+    assert verify_password("S3cret-admin", db.get_user_by_username("admin").hashed_password)
+    
+    monkeypatch.setattr(settings, "ADMIN_PASSWORD", None)
+    db = Database()
+    create_default_admin(db)
+    assert not db.username_exists("admin")
@@ -0,0 +1,86 @@
+"""Test the list response cache"""
+from app.cache import ENTRY_OVERHEAD, ResponseCache
+from app.database import Database
+from app.models import TaskStatus
+
+def test_hit_requires_matching_etag():
+    """Test that an entry only hits under the ETag it was stored with"""
+    cache = ResponseCache(10_000)
+    cache.put(1, ("q",), '"v1"', b"page")
+    assert cache.get(1, ("q",), '"v1"') == b"page"
+    assert cache.get(1, ("q",), '"v2"') is None
+    assert cache.get(1, ("other",), '"v1"') is None
+    assert cache.get(2, ("q",), '"v1"') is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+    assert stats["hit_rate"] == 0.25
+
+def test_lru_eviction_within_budget():
+    """Test that the least recently used pages go first once over budget"""
+    body = b"x" * 100
+    cache = ResponseCache(3 * (len(body) + ENTRY_OVERHEAD))
+    for page in range(3):
+        cache.put(1, page, "e", body)
+    cache.get(1, 0, "e")
+    cache.put(2, 0, "e", body)
+    
+    assert cache.get(1, 1, "e") is None
+    assert cache.get(1, 0, "e") == body
+    assert cache.get(2, 0, "e") == body
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= stats["max_bytes"]
+    
+    # Pages larger than the whole budget are not cached
+    cache.put(3, 0, "e", b"x" * stats["max_bytes"])
+    assert cache.get(3, 0, "e") is None
+    assert cache.stats()["entries"] == 3
+
+def test_replacing_a_page_keeps_accounting():
+    """Test that storing a page again does not double count it"""
+    cache = ResponseCache(10_000)
+    cache.put(1, "q", "a", b"old")
+    cache.put(1, "q", "b", b"newer")
+    assert cache.stats()["bytes"] == len(b"newer") + ENTRY_OVERHEAD
+    assert cache.get(1, "q", "b") == b"newer"
+
+def test_writes_invalidate_only_their_user():
+    """Test that repository writes drop exactly the writer's pages"""
+    db = Database()
+    cache = ResponseCache(10_000)
+    db.add_listener(cache.on_task_write)
+    task = db.create_task(1, "Task", None, TaskStatus.TODO)
+    
+    for write in (
+        lambda: db.update_task(task.id, status=TaskStatus.DONE),
+        lambda: db.delete_task(task.id),
+        lambda: db.create_task(1, "Another", None, TaskStatus.TODO),
+    ):
+        cache.put(1, "a", "e", b"one")
+        cache.put(1, "b", "e", b"two")
+        cache.put(2, "a", "e", b"three")
+        write()
+        assert cache.get(1, "a", "e") is None
+        assert cache.get(1, "b", "e") is None
+        assert cache.get(2, "a", "e") == b"three"
+    
+    assert cache.stats()["invalidations"] == 6
+    assert cache.stats()["bytes"] == len(b"three") + ENTRY_OVERHEAD
+    
+    # Failed writes are not reported
+    cache.put(1, "a", "e", b"one")
+    assert db.update_task(999, title="Missing") is None
+    assert db.delete_task(999) is False
+    assert cache.get(1, "a", "e") == b"one"
+    
+    db.remove_listener(cache.on_task_write)
+    db.create_task(1, "Unheard", None, TaskStatus.TODO)
+    assert cache.get(1, "a", "e") == b"one"
+
+def test_disabled_with_zero_budget():
+    """Test that a zero budget disables the cache"""
+    cache = ResponseCache(0)
+    assert not cache.enabled
+    cache.put(1, "q", "e", b"page")
+    assert cache.get(1, "q", "e") is None
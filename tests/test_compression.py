@@ -0,0 +1,195 @@
+"""Test response compression"""
+import asyncio
+import gzip
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from app.compression import CompressionMiddleware, choose_encoding, is_compressible
+
+def make_app(minimum_size=100):
+    """Small app with one response of each kind"""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    
+    @app.get("/large")
+    async def large():
+        return {"tasks": [{"title": f"Task {i}", "status": "todo"} for i in range(50)]}
+    
+    @app.get("/tagged")
+    async def tagged():
+        return Response(b"[" + b"1," * 100 + b"1]", media_type="application/json", headers={"ETag": '"t1.v2"'})
+    
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+    
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\0" * 1000, media_type="application/octet-stream")
+    
+    @app.get("/precompressed")
+    async def precompressed():
+        return Response(gzip.compress(b"x" * 1000), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+    
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(5):
+                yield f"line {i}\n".encode() * 20
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+    
+    @app.get("/events")
+    async def events():
+        return PlainTextResponse("data: x\n\n" * 100, media_type="text/event-stream")
+    
+    return app
+
+def test_choose_encoding():
+    """Test Accept-Encoding negotiation"""
+    assert choose_encoding("") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("br;q=0, *") == "gzip"
+    assert choose_encoding("*;q=0") is None
+    assert choose_encoding("gzip;q=bogus") is None
+
+def test_is_compressible():
+    """Test which media types are compressed"""
+    assert is_compressible("application/json")
+    assert is_compressible("application/x-ndjson")
+    assert is_compressible("text/csv; charset=utf-8")
+    assert is_compressible("application/problem+json")
+    assert not is_compressible("image/png")
+    assert not is_compressible("text/event-stream")
+    assert not is_compressible("")
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compresses_large_responses(encoding):
+    """Test that large compressible bodies are encoded and still decode"""
+    pytest.importorskip("brotli")
+    client = TestClient(make_app())
+    response = client.get("/large", headers={"Accept-Encoding": encoding})
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(response.content)
+    assert len(response.json()["tasks"]) == 50
+
+def test_skips_small_and_incompressible_responses():
+    """Test the size threshold, media types and existing encodings"""
+    client = TestClient(make_app())
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get("/small", headers=headers)
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.json() == {"ok": True}
+    
+    for path in ("/binary", "/events"):
+        response = client.get(path, headers=headers)
+        assert "Content-Encoding" not in response.headers
+        assert "Vary" not in response.headers
+    
+    response = client.get("/precompressed", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text == "x" * 1000
+    
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+
+def test_compressed_bodies_get_encoded_etags():
+    """Test that a strong ETag changes with the encoding, and 304s echo the cached form"""
+    from app.etags import encoded_etag, etag_matches
+    assert encoded_etag('"t1.v2"', "gzip") == '"t1.v2-gzip"'
+    assert encoded_etag('W/"t1.v2"', "gzip") == 'W/"t1.v2"'
+    assert etag_matches('"t1.v2-br"', '"t1.v2"', weak=False)
+    assert not etag_matches('"t1.v2-zstd"', '"t1.v2"')
+    
+    client = TestClient(make_app())
+    assert client.get("/tagged", headers={"Accept-Encoding": "gzip"}).headers["ETag"] == '"t1.v2-gzip"'
+    assert client.get("/tagged", headers={"Accept-Encoding": "identity"}).headers["ETag"] == '"t1.v2"'
+    assert client.get("/small", headers={"Accept-Encoding": "gzip"}).headers.get("ETag") is None
+
+def test_conditional_requests_accept_encoded_etags(client, user_token):
+    """Test that routes accept the compressed ETag in If-None-Match and If-Match"""
+    headers = {"Authorization": f"Bearer {user_token}", "Accept-Encoding": "gzip"}
+    for i in range(20):
+        client.post("/api/v1/tasks", json={"title": f"Task {i}", "description": "x" * 50}, headers=headers)
+    
+    response = client.get("/api/v1/tasks", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+    response = client.get("/api/v1/tasks", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    
+    # A single task is below the threshold; send the tag it would have compressed
+    task_id = client.get("/api/v1/tasks", headers=headers).json()["tasks"][0]["id"]
+    etag = client.get(f"/api/v1/tasks/{task_id}", headers=headers).headers["ETag"]
+    response = client.put(
+        f"/api/v1/tasks/{task_id}", json={"title": "Renamed"},
+        headers={**headers, "If-Match": f'{etag[:-1]}-gzip"'}
+    )
+    assert response.status_code == 200
+
+def test_streams_without_buffering():
+    """Test that each streamed chunk goes out compressed as soon as it arrives"""
+    app = make_app(minimum_size=10_000)
+    messages = []
+    
+    async def run():
+        complete = asyncio.Event()
+        requested = []
+        
+        async def receive():
+            if requested:
+                # The client only goes away once the response is complete
+                await complete.wait()
+                return {"type": "http.disconnect"}
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                complete.set()
+        
+        await app(scope, receive, send)
+    
+    scope = {
+        "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+        "query_string": b"", "headers": [(b"accept-encoding", b"gzip")], "scheme": "http",
+        "server": ("test", 80), "client": ("test", 1234), "http_version": "1.1",
+    }
+    asyncio.run(run())
+    
+    start = messages[0]
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    bodies = [m for m in messages[1:] if m["body"]]
+    assert len(bodies) >= 5
+    
+    # Every chunk is decodable on its own arrival
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    for i, message in enumerate(bodies[:5]):
+        assert decoder.decompress(message["body"]) == f"line {i}\n".encode() * 20
+    assert gzip.decompress(b"".join(m["body"] for m in messages[1:])) == b"".join(
+        f"line {i}\n".encode() * 20 for i in range(5)
+    )
+
+def test_compresses_admin_dump(client, admin_token):
+    """Test that the streamed admin dump is compressed end to end"""
+    from app import database
+    from app.models import TaskStatus
+    for i in range(200):
+        database.db.create_task(1, f"Task {i}", "details", TaskStatus.TODO)
+    response = client.get(
+        "/api/v1/tasks/admin/all",
+        headers={"Authorization": f"Bearer {admin_token}", "Accept-Encoding": "gzip"}
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 200
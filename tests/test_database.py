@@ -0,0 +1,313 @@
+"""Test the in-memory database"""
+import random
+import pytest
+from app.database import Database
+from app.indexes import SortedIndex
+from app.models import TaskStatus
+from app.records import TaskRecord, TaskTombstone
+from app.repository import change_key
+
+@pytest.fixture
+def store():
+    """Database with two users and a few tasks"""
+    db = Database()
+    db.create_task(1, "Write docs", None, TaskStatus.TODO)
+    db.create_task(1, "Fix bug", "Crash on login", TaskStatus.IN_PROGRESS)
+    db.create_task(1, "Ship release", None, TaskStatus.DONE)
+    db.create_task(2, "Other user", None, TaskStatus.TODO)
+    return db
+
+def test_user_index_scopes_tasks(store):
+    """Test that listing only returns the user's own tasks"""
+    tasks = store.get_user_tasks(1)
+    assert len(tasks) == 3
+    assert all(t.user_id == 1 for t in tasks)
+    assert store.count_user_tasks(1) == 3
+    assert store.count_user_tasks(2) == 1
+    assert store.count_user_tasks(3) == 0
+    assert store.get_user_tasks(3) == []
+
+def test_status_index_filters(store):
+    """Test filtering and counting through the (user, status) index"""
+    done = store.get_user_tasks(1, status=TaskStatus.DONE)
+    assert [t.title for t in done] == ["Ship release"]
+    assert store.count_user_tasks(1, status=TaskStatus.TODO) == 1
+    assert store.count_user_tasks(1, status="in_progress") == 1
+
+def test_update_moves_status_bucket(store):
+    """Test that a status change re-indexes the task"""
+    task = store.get_user_tasks(1, status=TaskStatus.TODO)[0]
+    store.update_task(task.id, status=TaskStatus.DONE)
+
+    assert store.count_user_tasks(1, status=TaskStatus.TODO) == 0
+    assert store.count_user_tasks(1, status=TaskStatus.DONE) == 2
+    assert store.count_user_tasks(1) == 3
+
+def test_delete_removes_from_indexes(store):
+    """Test that deleting a task drops it from every index"""
+    task = store.get_user_tasks(2)[0]
+    assert store.delete_task(task.id) is True
+
+    assert store.count_user_tasks(2) == 0
+    assert store.count_user_tasks(2, status=TaskStatus.TODO) == 0
+    assert 2 not in store.user_tasks_index
+    assert store.delete_task(task.id) is False
+
+def test_indexes_match_full_scan(store):
+    """Test that index counts agree with a scan of all tasks"""
+    for task in list(store.tasks.values())[:2]:
+        store.update_task(task.id, status=TaskStatus.DONE)
+    store.delete_task(3)
+
+    for user_id in (1, 2):
+        for status in (None, *TaskStatus):
+            expected = [
+                t for t in store.tasks.values()
+                if t.user_id == user_id and (status is None or t.status == status)
+            ]
+            assert store.count_user_tasks(user_id, status=status) == len(expected)
+
+def test_sort_orders(store):
+    """Test every supported sort field in both directions"""
+    for field in ("created_at", "updated_at", "title", "status"):
+        for sort_by, reverse in ((field, True), (f"-{field}", False)):
+            expected = sorted(
+                store.user_tasks_index[1].values(),
+                key=lambda t: (t.sort_value(field), t.id),
+                reverse=reverse
+            )
+            assert store.get_user_tasks(1, sort_by=sort_by) == expected
+
+def test_sort_index_follows_updates(store):
+    """Test that ordered indexes stay correct across writes"""
+    assert [t.title for t in store.get_user_tasks(1, sort_by="-title")] == [
+        "Fix bug", "Ship release", "Write docs"
+    ]
+    store.update_task(1, title="Add docs", status=TaskStatus.DONE)
+    store.create_task(1, "Zebra", None, TaskStatus.DONE)
+    store.delete_task(2)
+
+    assert [t.title for t in store.get_user_tasks(1, sort_by="-title")] == [
+        "Add docs", "Ship release", "Zebra"
+    ]
+    assert [t.title for t in store.get_user_tasks(1, status=TaskStatus.DONE, sort_by="title")] == [
+        "Zebra", "Ship release", "Add docs"
+    ]
+    # Most recently updated first
+    assert store.get_user_tasks(1, limit=1, sort_by="updated_at")[0].title == "Zebra"
+
+def test_sort_pagination(store):
+    """Test skip/limit against the ordered index"""
+    for i in range(20):
+        store.create_task(3, f"Task {i:02d}", None, TaskStatus.TODO)
+
+    page = store.get_user_tasks(3, skip=5, limit=5, sort_by="-title")
+    assert [t.title for t in page] == [f"Task {i:02d}" for i in range(5, 10)]
+    assert store.get_user_tasks(3, skip=20, limit=5) == []
+
+def test_invalid_sort_field(store):
+    """Test that unknown sort fields are rejected"""
+    with pytest.raises(ValueError):
+        store.get_user_tasks(1, sort_by="hashed_password")
+    with pytest.raises(ValueError):
+        store.get_user_tasks(1, sort_by="-description")
+
+def test_sorted_index_chunks():
+    """Test SortedIndex across chunk splits and removals"""
+    index = SortedIndex()
+    keys = [(i * 7919) % 5000 for i in range(5000)]
+    for key in keys:
+        index.add(key)
+    for key in range(0, 5000, 3):
+        index.discard(key)
+    index.discard(99999)
+
+    expected = [k for k in range(5000) if k % 3]
+    assert len(index) == len(expected)
+    assert list(index) == expected
+    assert 1 in index and 3 not in index
+    assert index.page(1000, 50) == expected[1000:1050]
+    assert index.page(1000, 50, reverse=True) == expected[::-1][1000:1050]
+    assert index.page(len(expected) - 2, 10) == expected[-2:]
+
+def test_sorted_index_bulk_update():
+    """Test that merging a batch of keys matches adding them one by one"""
+    rng = random.Random(5)
+    for existing, added in ((5000, 10), (100, 5000), (0, 300)):
+        keys = rng.sample(range(100000), existing + added)
+        index = SortedIndex(keys[:existing])
+        index.update(keys[existing:])
+        expected = sorted(keys)
+        assert list(index) == expected
+        assert len(index) == len(expected)
+        assert index.page(existing // 2, 20) == expected[existing // 2:existing // 2 + 20]
+        index.add(-1)
+        assert index.page(0, 2) == [-1, expected[0]]
+
+def test_bulk_create_keeps_indexes_consistent():
+    """Test that create_tasks leaves indexes, counts and search as create_task would"""
+    rows = [{"title": f"Task {i % 7}", "status": list(TaskStatus)[i % 3]} for i in range(50)]
+    single, bulk = Database(), Database()
+    for db in (single, bulk):
+        db.create_task(1, "Existing task", None, TaskStatus.DONE)
+        # Materialise sort and search indexes so the bulk path has to update them
+        db.get_user_tasks(1, sort_by="title")
+        db.get_user_tasks(1, status=TaskStatus.TODO, sort_by="-created_at")
+        db.search_tasks(1, "task")
+    for row in rows:
+        single.create_task(1, row["title"], None, row["status"])
+    created = bulk.create_tasks(1, rows)
+    
+    assert [task.id for task in created] == list(range(2, 52))
+    for db in (single, bulk):
+        db.delete_task(10)
+    for sort_by in ("title", "-created_at", "status"):
+        field = sort_by.lstrip("-")
+        for status in (None, *TaskStatus):
+            expected = sorted(
+                (Database._sort_key(t, field) for t in bulk.tasks.values() if status in (None, t.status)),
+                reverse=not sort_by.startswith("-")
+            )
+            page = bulk.get_user_tasks(1, status=status, sort_by=sort_by, limit=100)
+            assert [t.id for t in page] == [key[1] for key in expected]
+            assert bulk.count_user_tasks(1, status=status) == single.count_user_tasks(1, status=status)
+    assert bulk.count_tasks_by_status() == single.count_tasks_by_status()
+    assert bulk.search_tasks(1, "task 3")[1] == single.search_tasks(1, "task 3")[1] == 7
+
+def test_keyset_pagination(store):
+    """Test paging with an (value, id) key in both directions"""
+    for i in range(10):
+        store.create_task(3, f"Task {i}", None, TaskStatus.TODO)
+
+    for sort_by in ("title", "-title", "created_at", "-created_at"):
+        expected = store.get_user_tasks(3, limit=100, sort_by=sort_by)
+        field = sort_by.lstrip("-")
+        pages, after = [], None
+        while True:
+            page = store.get_user_tasks(3, limit=4, sort_by=sort_by, after=after)
+            if not page:
+                break
+            pages.extend(page)
+            after = (page[-1].sort_value(field), page[-1].id)
+        assert pages == expected
+
+def test_scan_tasks(store):
+    """Test batched scans with filters"""
+    store.delete_task(2)
+    store.update_task(1, status=TaskStatus.DONE)
+
+    assert [t.id for t in store.scan_tasks(limit=2)] == [1, 3]
+    assert [t.id for t in store.scan_tasks(after_id=3, limit=2)] == [4]
+    assert store.scan_tasks(after_id=4) == []
+    assert [t.id for t in store.scan_tasks(status=TaskStatus.DONE)] == [1, 3]
+    assert [t.id for t in store.scan_tasks(user_id=1, status=TaskStatus.DONE, after_id=1)] == [3]
+    assert [t.id for t in store.scan_tasks(user_id=2)] == [4]
+
+    created = store.get_task(3).created_ts
+    assert [t.id for t in store.scan_tasks(created_after=created)] == [4]
+
+def test_versions(store):
+    """Test task and collection versions and version-checked writes"""
+    assert store.get_collection_version(3) == 0
+    task = store.create_task(3, "Versioned", None, TaskStatus.TODO)
+    assert task.version == 1
+    assert store.get_task_version(task.id) == (3, 1)
+    assert store.get_collection_version(3) == 1
+    
+    assert store.update_task(task.id, expected_version=2, title="Stale") is None
+    assert store.update_task(task.id, expected_version=1, title="Fresh").version == 2
+    assert store.get_collection_version(3) == 2
+    assert store.get_collection_version(4) == 0
+    
+    assert store.delete_task(task.id, expected_version=1) is False
+    assert store.delete_task(task.id, expected_version=2) is True
+    assert store.get_task_version(task.id) is None
+    assert store.get_collection_version(3) == 3
+
+def test_status_counts_match_full_scan():
+    """Test that incrementally kept counts match counting every task"""
+    rng = random.Random(3)
+    db = Database()
+    task_ids = []
+    for i in range(2000):
+        op = rng.random()
+        if op < 0.5 or not task_ids:
+            task_ids.append(db.create_task(rng.randint(1, 20), f"Task {i}", None, rng.choice(list(TaskStatus))).id)
+        elif op < 0.8:
+            db.update_task(rng.choice(task_ids), status=rng.choice(list(TaskStatus)))
+        else:
+            db.delete_task(task_ids.pop(rng.randrange(len(task_ids))))
+    
+    expected: dict = {}
+    for task in db.get_all_tasks():
+        per_user = expected.setdefault(task.user_id, dict.fromkeys(TaskStatus, 0))
+        per_user[task.status] += 1
+    assert db.count_tasks_by_user() == dict(sorted(expected.items()))
+    for user_id in range(1, 22):
+        assert db.count_tasks_by_status(user_id) == expected.get(user_id, dict.fromkeys(TaskStatus, 0))
+    overall = {status: sum(counts[status] for counts in expected.values()) for status in TaskStatus}
+    assert db.count_tasks_by_status() == overall
+
+def sync(db, user_id, after, limit=2):
+    """Page through a user's changes, returning them and the final position"""
+    changes = []
+    while True:
+        page = db.get_changes(user_id, after, limit)
+        assert page is not None
+        if not page:
+            return changes, after
+        changes.extend(page)
+        after = change_key(page[-1])
+
+def test_changes_report_updates_and_deletions(store):
+    """Test that a delta sync returns each changed task once, deletions included, oldest first"""
+    start = (store.get_task(1).created_ts, 0)
+    _, position = sync(store, 1, start)
+    store.update_task(3, title="Ship it")
+    store.delete_task(1)
+    created = store.create_task(1, "New", None, TaskStatus.TODO)
+    store.update_task(2, status=TaskStatus.DONE)
+    store.delete_task(2)
+    store.update_task(4, title="Other user")
+    
+    changes, position = sync(store, 1, position)
+    assert [(type(c), c.id) for c in changes] == [
+        (TaskRecord, 3), (TaskTombstone, 1), (TaskRecord, created.id), (TaskTombstone, 2)
+    ]
+    assert changes[0].title == "Ship it"
+    assert [change_key(c) for c in changes] == sorted(change_key(c) for c in changes)
+    assert sync(store, 1, position) == ([], position)
+    
+    # Replaying every change from the start rebuilds the current tasks
+    replica = {}
+    for change in sync(store, 1, start)[0]:
+        if isinstance(change, TaskTombstone):
+            replica.pop(change.id, None)
+        else:
+            replica[change.id] = change.title
+    assert replica == {t.id: t.title for t in store.get_user_tasks(1)}
+
+def test_write_times_strictly_increase():
+    """Test that writes in the same microsecond still move the change position forward"""
+    db = Database()
+    tasks = [db.create_task(1, f"Task {i}", None, TaskStatus.TODO) for i in range(100)]
+    db.update_task(tasks[0].id, title="Last")
+    times = [t.created_ts for t in tasks] + [tasks[0].updated_ts]
+    assert times == sorted(set(times))
+
+def test_tombstones_expire(monkeypatch):
+    """Test that tombstones are purged after the retention window and older positions are refused"""
+    clock = [1_000_000_000]
+    monkeypatch.setattr("app.database.now_us", lambda: clock[0])
+    db = Database()
+    db.tombstone_retention_us = 1_000
+    old = db.create_task(1, "Old", None, TaskStatus.TODO)
+    db.delete_task(old.id)
+    
+    clock[0] += 5_000
+    kept = db.create_task(1, "Kept", None, TaskStatus.TODO)
+    db.delete_task(kept.id)
+    assert [t.id for t in db.tombstone_log] == [kept.id]
+    assert list(db.tombstones[1]) == [(clock[0] + 1, kept.id)]
+    assert db.get_changes(1, (old.created_ts, 0)) is None
+    assert [(type(c), c.id) for c in db.get_changes(1, (clock[0] - 1_000, 0))] == [(TaskTombstone, kept.id)]
@@ -0,0 +1,186 @@
+"""Test the task event broker and SSE feed"""
+import asyncio
+import threading
+import orjson
+import pytest
+from app import database
+from app.database import Database
+from app.events import DROP, DISCONNECT, EventBroker, task_events
+from app.models import TaskStatus
+from main import app
+
+def frame_fields(frame):
+    """Parse one SSE frame into a dict of its fields"""
+    fields = {}
+    for line in frame.decode().strip().split("\n"):
+        name, _, value = line.partition(": ")
+        fields[name] = value
+    return fields
+
+def make_db(broker):
+    db = Database()
+    db.add_listener(broker.on_task_write)
+    return db
+
+def test_publishes_to_task_owner_in_order():
+    """Test that subscribers receive their own events, in order, with the task as data"""
+    async def run():
+        broker = EventBroker()
+        db = make_db(broker)
+        mine, missed = broker.subscribe(1)
+        other, _ = broker.subscribe(2)
+        assert missed == []
+        
+        task = db.create_task(1, "Write docs", None, TaskStatus.TODO)
+        db.update_task(task.id, status=TaskStatus.DONE)
+        db.delete_task(task.id)
+        
+        events = [frame_fields((await mine.get(1)).frame) for _ in range(3)]
+        assert [event["event"] for event in events] == ["created", "updated", "deleted"]
+        assert [orjson.loads(event["data"])["status"] for event in events] == ["todo", "done", "done"]
+        assert events[0]["id"] == f"{broker.epoch}-1"
+        assert orjson.loads(events[0]["data"])["id"] == task.id
+        assert await other.get(0.01) is None
+        
+        broker.unsubscribe(mine)
+        broker.unsubscribe(other)
+        assert broker.stats()["subscribers"] == 0
+        assert broker.stats()["published"] == 3
+    
+    asyncio.run(run())
+
+def test_publishes_from_other_threads():
+    """Test that writes on worker threads reach the subscriber's loop"""
+    async def run():
+        broker = EventBroker()
+        db = make_db(broker)
+        subscription, _ = broker.subscribe(1)
+        
+        def write():
+            for i in range(50):
+                db.create_task(1, f"Task {i}", None, TaskStatus.TODO)
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        seqs = [(await subscription.get(1)).seq for _ in range(200)]
+        assert seqs == list(range(1, 201))
+    
+    asyncio.run(run())
+
+def test_resumes_from_last_event_id():
+    """Test that a reconnecting client gets only the user's events it missed"""
+    async def run():
+        broker = EventBroker(replay_size=10)
+        db = make_db(broker)
+        for i in range(3):
+            db.create_task(1 + i % 2, f"Task {i}", None, TaskStatus.TODO)
+        
+        _, missed = broker.subscribe(1, f"{broker.epoch}-1")
+        assert [event.seq for event in missed] == [3]
+        _, missed = broker.subscribe(1, f"{broker.epoch}-3")
+        assert missed == []
+        _, missed = broker.subscribe(1, f"{broker.epoch}-0")
+        assert [event.seq for event in missed] == [1, 3]
+    
+    asyncio.run(run())
+
+@pytest.mark.parametrize("last_event_id", ["otherepoch-3", "garbage", "{epoch}-99", "{epoch}-1"])
+def test_resync_when_events_are_not_replayable(last_event_id):
+    """Test that IDs from another process, the future or beyond the buffer need a resync"""
+    async def run():
+        broker = EventBroker(replay_size=3)
+        db = make_db(broker)
+        for i in range(5):
+            db.create_task(1, f"Task {i}", None, TaskStatus.TODO)
+        
+        _, missed = broker.subscribe(1, last_event_id.format(epoch=broker.epoch))
+        assert missed is None
+        # The oldest buffered event is 3, so resuming after 2 is complete
+        _, missed = broker.subscribe(1, f"{broker.epoch}-2")
+        assert [event.seq for event in missed] == [3, 4, 5]
+    
+    asyncio.run(run())
+
+def test_slow_consumer_disconnect():
+    """Test that a subscriber with a full queue is closed"""
+    async def run():
+        broker = EventBroker(queue_size=2, slow_consumer=DISCONNECT)
+        db = make_db(broker)
+        subscription, _ = broker.subscribe(1)
+        for i in range(3):
+            db.create_task(1, f"Task {i}", None, TaskStatus.TODO)
+        await asyncio.sleep(0)
+        
+        assert subscription.closed
+        assert await subscription.get(1) is None
+        assert broker.stats()["disconnected"] == 1
+    
+    asyncio.run(run())
+
+def test_slow_consumer_drop():
+    """Test that a subscriber with a full queue loses the overflow and is told how much"""
+    async def run():
+        broker = EventBroker(queue_size=2, slow_consumer=DROP)
+        db = make_db(broker)
+        subscription, _ = broker.subscribe(1)
+        for i in range(5):
+            db.create_task(1, f"Task {i}", None, TaskStatus.TODO)
+        await asyncio.sleep(0)
+        
+        assert not subscription.closed
+        assert [(await subscription.get(1)).seq for _ in range(2)] == [1, 2]
+        assert subscription.take_dropped() == 3
+        assert subscription.take_dropped() == 0
+        assert broker.stats()["dropped"] == 3
+    
+    asyncio.run(run())
+
+def test_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        EventBroker(slow_consumer="block")
+
+def test_events_endpoint_streams_changes(client, user_token):
+    """Test that GET /tasks/events streams the user's task changes"""
+    messages = []
+    
+    async def run():
+        done = asyncio.Event()
+        requested = []
+        
+        async def receive():
+            if requested:
+                await done.wait()
+                return {"type": "http.disconnect"}
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        
+        async def send(message):
+            messages.append(message)
+            body = message.get("body", b"")
+            if body.startswith(b"retry:"):
+                # Subscribed: now write from a worker thread, like the API does
+                await asyncio.to_thread(database.db.create_task, 2, "Streamed", None, TaskStatus.TODO)
+            elif b"event: created" in body:
+                done.set()
+        
+        await asyncio.wait_for(app(scope, receive, send), 5)
+    
+    scope = {
+        "type": "http", "method": "GET", "path": "/api/v1/tasks/events", "raw_path": b"/api/v1/tasks/events",
+        "root_path": "", "query_string": b"", "scheme": "http", "server": ("test", 80),
+        "client": ("test", 1234), "http_version": "1.1",
+        "headers": [(b"authorization", f"Bearer {user_token}".encode()), (b"accept-encoding", b"gzip")],
+    }
+    asyncio.run(run())
+    
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert headers[b"cache-control"] == b"no-cache"
+    assert b"content-encoding" not in headers
+    created = frame_fields(next(m["body"] for m in messages[1:] if b"event: created" in m.get("body", b"")))
+    assert orjson.loads(created["data"])["title"] == "Streamed"
+    # Disconnecting unsubscribes
+    assert task_events.stats()["subscribers"] == 0
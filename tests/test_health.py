@@ -27,6 +27,36 @@ def test_detailed_health_check(client):
     assert "dependencies" in data
     assert "database" in data["dependencies"]
 
+def test_detailed_health_pings_blocking_store_off_the_event_loop(client, monkeypatch):
+    """Test that a blocking backend's ping runs on a storage thread"""
+    import threading
+    from app import database
+    from app.sqlite_database import SQLiteDatabase
+    
+    store = SQLiteDatabase(":memory:")
+    threads = []
+    real_ping = store.ping
+    monkeypatch.setattr(store, "ping", lambda: (threads.append(threading.current_thread()), real_ping())[1])
+    monkeypatch.setattr(database, "db", store)
+    
+    response = client.get("/health/detailed")
+    assert response.json()["dependencies"]["database"] == {"status": "healthy"}
+    assert [thread.name.startswith("storage") for thread in threads] == [True]
+    store.close()
+
+def test_detailed_health_reports_rate_limit_leases(client, monkeypatch):
+    """Test that the detailed health check reports this worker's lease cache"""
+    from app import rate_limit
+    
+    assert client.get("/health/detailed").json()["rate_limit"]["leases"] is None
+    
+    leases = rate_limit.LeaseCache(10)
+    leases.hits, leases.misses = 9, 1
+    monkeypatch.setattr(rate_limit, "rate_limit_leases", leases)
+    data = client.get("/health/detailed").json()["rate_limit"]
+    assert data["mode"] in ("redis", "local")
+    assert data["leases"] == {"keys": 0, "hits": 9, "misses": 1, "evictions": 0}
+
 def test_async_external_endpoint(client):
     """Test async external API call"""
     response = client.get("/async/external")
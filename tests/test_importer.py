@@ -0,0 +1,101 @@
+"""Test incremental parsing of bulk task imports"""
+import pytest
+from app.importer import CSV, NDJSON, ImportRegistry, RecordSplitter, TaskImportParser
+from app.models import TaskStatus
+
+def split(data, csv_quotes=False, max_record_bytes=1024, step=None):
+    """Feed data in pieces of ``step`` bytes and collect every record"""
+    splitter = RecordSplitter(csv_quotes, max_record_bytes)
+    step = step or len(data) or 1
+    records = []
+    for start in range(0, len(data), step):
+        records.extend(splitter.feed(data[start:start + step]))
+    return records + list(splitter.finish())
+
+def parse(import_format, data, step=7, default_user_id=1):
+    parser = TaskImportParser(import_format, default_user_id)
+    rows = []
+    for start in range(0, len(data), step):
+        rows.extend(parser.feed(data[start:start + step]))
+    return rows + parser.finish()
+
+@pytest.mark.parametrize("step", [1, 3, 1000])
+def test_splits_records_across_chunks(step):
+    """Test that records come out whole wherever the chunks split them"""
+    data = b'title\r\n"two\nlines",x\r\nplain\n"unterminated'
+    assert split(data, csv_quotes=True, step=step) == [
+        (1, b"title"), (2, b'"two\nlines",x'), (4, b"plain"), (5, b'"unterminated'),
+    ]
+    # Without CSV quoting every line is a record
+    assert [line for line, _ in split(data, step=step)] == [1, 2, 3, 4, 5]
+
+@pytest.mark.parametrize("step", [1, 5, 1000])
+def test_oversized_records_are_skipped(step):
+    """Test that a record over the limit is reported without being buffered"""
+    data = b'short\n"long ' + b"x" * 40 + b'\nstill quoted"\nafter\n' + b"y" * 40
+    assert split(data, csv_quotes=True, max_record_bytes=20, step=step) == [
+        (1, b"short"), (2, None), (4, b"after"), (5, None),
+    ]
+
+def test_parses_ndjson():
+    """Test NDJSON rows, defaults and per-line errors"""
+    data = (
+        b'{"title": "First", "status": "done", "id": 7, "created_at": "2024-01-01"}\n'
+        b'\n'
+        b'{"title": "Other owner", "description": "d", "user_id": 3}\n'
+        b'not json\n'
+        b'["title"]\n'
+        b'{"title": ""}\n'
+        b'{"title": "Bad owner", "user_id": "x"}\n'
+        b'{"title": "Last"}'
+    )
+    rows = parse(NDJSON, data, default_user_id=5)
+    assert [(row.line, row.user_id, row.fields) for row in rows if row.error is None] == [
+        (1, 5, {"title": "First", "description": None, "status": TaskStatus.DONE}),
+        (3, 3, {"title": "Other owner", "description": "d", "status": TaskStatus.TODO}),
+        (8, 5, {"title": "Last", "description": None, "status": TaskStatus.TODO}),
+    ]
+    errors = {row.line: row.error for row in rows if row.error is not None}
+    assert sorted(errors) == [4, 5, 6, 7]
+    assert errors[4].startswith("Invalid JSON")
+    assert errors[5] == "Expected a JSON object"
+    assert errors[6].startswith("title:")
+    assert errors[7] == "user_id: must be a positive integer"
+
+def test_parses_csv():
+    """Test CSV headers, quoting, empty fields and per-row errors"""
+    data = (
+        b'\xef\xbb\xbfTitle,Status,Notes,Description\r\n'
+        b'Plain,,ignored,\r\n'
+        b'"Quoted, with comma",in_progress,,"Two\r\nlines"\r\n'
+        b'Too,few\r\n'
+        b'Bad status,later,,\r\n'
+    )
+    rows = parse(CSV, data)
+    assert [(row.line, row.fields) for row in rows if row.error is None] == [
+        (2, {"title": "Plain", "description": None, "status": TaskStatus.TODO}),
+        (3, {"title": "Quoted, with comma", "description": "Two\nlines", "status": TaskStatus.IN_PROGRESS}),
+    ]
+    errors = {row.line: row.error for row in rows if row.error is not None}
+    assert errors[5] == "Expected 4 CSV fields, got 2"
+    assert errors[6].startswith("status:")
+
+def test_csv_header_needs_title():
+    with pytest.raises(ValueError):
+        parse(CSV, b"name,status\nx,todo\n")
+
+def test_registry_caps_history_and_errors():
+    """Test that only recent imports and the first errors of each are kept"""
+    registry = ImportRegistry(history=2, max_errors=1)
+    jobs = [registry.start(NDJSON, 1) for _ in range(3)]
+    assert registry.jobs() == [jobs[2], jobs[1]]
+
+    job = jobs[2]
+    job.record_error(1, "bad")
+    job.record_error(2, "worse")
+    job.record_imported(5)
+    job.finish()
+    status = job.to_dict()
+    assert (status["records"], status["imported"], status["failed"]) == (7, 5, 2)
+    assert status["errors"] == [{"line": 1, "error": "bad"}]
+    assert status["errors_truncated"] and status["state"] == "completed"
@@ -0,0 +1,249 @@
+"""Test the journaled in-memory database"""
+import os
+import pytest
+from app.database import create_database
+from app.journaled_database import JournaledDatabase, JOURNAL_FILE, SNAPSHOT_VERSION
+from app.models import TaskStatus, UserRole
+
+def populate(db):
+    """Apply a mix of journaled writes"""
+    db.create_user("a@example.com", "alice", "hash")
+    db.create_user("r@example.com", "root", "hash", UserRole.ADMIN)
+    for i in range(5):
+        db.create_task(1, f"Task {i}", None if i % 2 else "desc", TaskStatus.TODO)
+    db.update_task(2, title="Renamed", status=TaskStatus.DONE)
+    db.update_task(3, description="changed")
+    db.delete_task(4)
+    db.create_task(2, "Admin task", None, TaskStatus.IN_PROGRESS)
+    db.create_tasks(1, [
+        {"title": "Bulk", "description": None, "status": TaskStatus.DONE},
+        {"title": "Bulk too", "description": "desc", "status": TaskStatus.TODO},
+    ])
+
+def state(db):
+    """Everything a restart must preserve, indexes included"""
+    return (
+        dict(db.users),
+        dict(db.tasks),
+        db.user_id_counter,
+        db.task_id_counter,
+        [t.id for t in db.get_user_tasks(1, sort_by="title")],
+        [t.id for t in db.get_user_tasks(1, status=TaskStatus.DONE)],
+        db.get_user_by_username("root"),
+        db.count_tasks_by_user(),
+        db.count_tasks_by_status(),
+        list(db.tombstone_log),
+        db.get_changes(1, (db.get_task(1).created_ts, 0)),
+    )
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "off"])
+def test_recovers_from_journal(tmp_path, fsync):
+    """Test that replaying the journal rebuilds the store"""
+    db = JournaledDatabase(str(tmp_path), fsync=fsync)
+    populate(db)
+    expected = state(db)
+    db.close()
+
+    reopened = JournaledDatabase(str(tmp_path), fsync=fsync)
+    assert state(reopened) == expected
+    task = reopened.create_task(1, "After restart", None, TaskStatus.TODO)
+    assert task.id == expected[3]
+    reopened.close()
+
+def test_recovers_from_snapshot_and_tail(tmp_path):
+    """Test loading a snapshot and replaying only the newer entries"""
+    db = JournaledDatabase(str(tmp_path), snapshot_every=4)
+    populate(db)
+    db.delete_task(7)
+    expected = state(db)
+    db.close()
+
+    assert os.path.exists(tmp_path / "snapshot.jsonl")
+    # Only entries since the last snapshot remain in the journal
+    with open(tmp_path / JOURNAL_FILE) as f:
+        assert len(f.readlines()) < 4
+
+    reopened = JournaledDatabase(str(tmp_path), snapshot_every=4)
+    assert state(reopened) == expected
+    reopened.close()
+
+def test_stale_journal_after_snapshot_is_skipped(tmp_path):
+    """Test that entries a snapshot already covers are not applied twice"""
+    db = JournaledDatabase(str(tmp_path))
+    populate(db)
+    with open(tmp_path / JOURNAL_FILE) as f:
+        stale = f.read()
+    db.snapshot()
+    db.create_task(1, "Newer", None, TaskStatus.TODO)
+    expected = state(db)
+    db.close()
+
+    # Simulate a crash between writing the snapshot and truncating the journal
+    with open(tmp_path / JOURNAL_FILE) as f:
+        tail = f.read()
+    with open(tmp_path / JOURNAL_FILE, "w") as f:
+        f.write(stale + tail)
+
+    reopened = JournaledDatabase(str(tmp_path))
+    assert state(reopened) == expected
+    reopened.close()
+
+def test_torn_final_entry_is_dropped(tmp_path):
+    """Test that a partially written last entry is discarded on recovery"""
+    db = JournaledDatabase(str(tmp_path), fsync="always")
+    populate(db)
+    expected = state(db)
+    db.close()
+
+    with open(tmp_path / JOURNAL_FILE, "a") as f:
+        f.write('[99,"ct",9,1,"Tor')
+
+    reopened = JournaledDatabase(str(tmp_path), fsync="always")
+    assert state(reopened) == expected
+    reopened.create_task(1, "Clean append", None, TaskStatus.TODO)
+    reopened.close()
+
+    again = JournaledDatabase(str(tmp_path))
+    assert again.get_task(expected[3]).title == "Clean append"
+    again.close()
+
+def test_rejects_other_formats(tmp_path):
+    """Test that snapshots of another version and malformed entries fail loudly"""
+    # A task entry without its version, and a deletion without its time
+    for entry in ('[1,"ct",1,1,"Old",null,"todo",1,1]', '[1,"dt",1]'):
+        with open(tmp_path / JOURNAL_FILE, "w") as f:
+            f.write(entry + "\n")
+        with pytest.raises(ValueError, match="Unsupported journal entry"):
+            JournaledDatabase(str(tmp_path))
+    os.remove(tmp_path / JOURNAL_FILE)
+    
+    header = '{"version": %d, "seq": 0, "user_id_counter": 0, "task_id_counter": 1}\n'
+    with open(tmp_path / "snapshot.jsonl", "w") as f:
+        f.write(header % 2)
+    with pytest.raises(ValueError, match="Unsupported snapshot version 2"):
+        JournaledDatabase(str(tmp_path))
+    
+    with open(tmp_path / "snapshot.jsonl", "w") as f:
+        f.write(header % SNAPSHOT_VERSION + '["tasks",[[1,1,"Old",null,"todo",1,1]]]\n')
+    with pytest.raises(ValueError, match="Unsupported task record"):
+        JournaledDatabase(str(tmp_path))
+
+def test_fsync_policy(tmp_path):
+    """Test that 'always' fsyncs per write and bad policies are rejected"""
+    db = JournaledDatabase(str(tmp_path), fsync="always")
+    db.create_task(1, "One", None, TaskStatus.TODO)
+    db.create_task(1, "Two", None, TaskStatus.TODO)
+    assert db.journal.syncs == db.journal.appended == 2
+    db.close()
+
+    with pytest.raises(ValueError):
+        JournaledDatabase(str(tmp_path / "other"), fsync="sometimes")
+
+def test_group_commit_fsync_does_not_block_appends(tmp_path, monkeypatch):
+    """Test that writes go on while the flusher waits on a slow fsync"""
+    import threading
+    from app import journal as journal_module
+    
+    in_fsync, release = threading.Event(), threading.Event()
+    real_fsync = os.fsync
+    
+    def slow_fsync(fd):
+        in_fsync.set()
+        assert release.wait(5)
+        real_fsync(fd)
+    
+    monkeypatch.setattr(journal_module.os, "fsync", slow_fsync)
+    db = JournaledDatabase(str(tmp_path), fsync="batch", fsync_interval_ms=1)
+    first = db.create_task(1, "Synced", None, TaskStatus.TODO)
+    assert in_fsync.wait(5)
+    
+    # The flusher is inside fsync; an append must not wait for it
+    done = threading.Event()
+    threading.Thread(target=lambda: (db.create_task(1, "During", None, TaskStatus.TODO), done.set())).start()
+    assert done.wait(1)
+    assert db.journal.synced_seq < db.journal.seq
+    
+    release.set()
+    monkeypatch.setattr(journal_module.os, "fsync", real_fsync)
+    db.close()
+    assert db.journal.synced_seq == db.journal.seq
+    reopened = JournaledDatabase(str(tmp_path))
+    assert [t.title for t in reopened.get_all_tasks()] == ["Synced", "During"]
+    assert reopened.get_task(first.id) == first
+    reopened.close()
+
+def test_create_database_selects_journal(tmp_path):
+    """Test that journal:// URLs select the journaled backend"""
+    db = create_database(f"journal:///{tmp_path / 'data'}")
+    assert isinstance(db, JournaledDatabase)
+    assert not db.blocking
+    db.close()
+
+def test_snapshot_written_in_background(tmp_path, monkeypatch):
+    """Test that the write crossing snapshot_every only cuts the store, and writes go on meanwhile"""
+    import threading
+    from app import journaled_database
+
+    release = threading.Event()
+    write_atomically = journaled_database.write_atomically
+
+    def slow_write(path, lines):
+        release.wait(5)
+        write_atomically(path, lines)
+
+    monkeypatch.setattr(journaled_database, "write_atomically", slow_write)
+    db = JournaledDatabase(str(tmp_path), snapshot_every=3)
+    for i in range(3):
+        db.create_task(1, f"Task {i}", None, TaskStatus.TODO)
+    # The cut is taken; the snapshot is still being written
+    assert os.path.exists(tmp_path / journaled_database.DETACHED_JOURNAL_FILE)
+    assert not os.path.exists(tmp_path / "snapshot.jsonl")
+    db.update_task(1, title="Changed after the cut")
+    release.set()
+    expected = state(db)
+    db.close()
+
+    assert not os.path.exists(tmp_path / journaled_database.DETACHED_JOURNAL_FILE)
+    reopened = JournaledDatabase(str(tmp_path))
+    assert state(reopened) == expected
+    assert reopened.get_task(1).title == "Changed after the cut"
+    reopened.close()
+
+def test_recovers_from_unfinished_snapshot(tmp_path):
+    """Test that entries detached for a snapshot that never got written are replayed"""
+    from app.journaled_database import DETACHED_JOURNAL_FILE
+
+    db = JournaledDatabase(str(tmp_path))
+    populate(db)
+    db.journal.detach(str(tmp_path / DETACHED_JOURNAL_FILE))
+    db.create_task(1, "After the cut", None, TaskStatus.TODO)
+    expected = state(db)
+    db.close()
+
+    reopened = JournaledDatabase(str(tmp_path), snapshot_every=1)
+    assert state(reopened) == expected
+    # The next snapshot covers the detached entries and removes them
+    reopened.create_task(1, "Snapshotted", None, TaskStatus.TODO)
+    reopened.close()
+    assert not os.path.exists(tmp_path / DETACHED_JOURNAL_FILE)
+    again = JournaledDatabase(str(tmp_path))
+    assert len(again.tasks) == len(expected[1]) + 1
+    again.close()
+
+def test_fsync_always_runs_off_the_event_loop(tmp_path):
+    """Test that per-write fsyncs make the store blocking, served by one thread"""
+    import asyncio
+    from app.async_database import AsyncRepository
+
+    db = JournaledDatabase(str(tmp_path), fsync="always")
+    assert db.blocking and not db.thread_safe
+    adb = AsyncRepository(db, max_workers=8)
+
+    async def scenario():
+        await asyncio.gather(*(adb.create_task(1, f"Task {i}", None, TaskStatus.TODO) for i in range(20)))
+
+    asyncio.run(scenario())
+    assert adb._executor._max_workers == 1
+    assert len(db.tasks) == 20
+    adb.close()
+    db.close()
@@ -1,4 +1,6 @@
 """Test middleware and error handling"""
+import asyncio
+import time
 import pytest
 from fastapi import status
 
@@ -13,6 +15,13 @@ def test_process_time_header(client):
     response = client.get("/")
     assert "X-Process-Time" in response.headers
 
+def test_request_id_reaches_handlers(client, user_token):
+    """Test that error bodies of mounted routes carry the response's request ID"""
+    response = client.get("/api/v1/tasks/99999", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["error"]["request_id"] == response.headers["X-Request-ID"]
+    assert response.headers["X-Request-ID"] != client.get("/health").headers["X-Request-ID"]
+
 def test_cors_headers(client):
     """Test CORS headers are present"""
     response = client.options("/")
@@ -41,3 +50,111 @@ def test_validation_error(client, user_token):
     )
     
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+class FakeRedis:
+    """Just enough of the asyncio Redis client for the rate limiter"""
+    
+    def __init__(self, delay=0.0):
+        self.counters = {}
+        self.expiries = {}
+        self.calls = 0
+        self.delay = delay
+    
+    def register_script(self, script):
+        async def run(keys, args):
+            # One call per round trip, like the real script
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            key, (amount, ttl) = keys[0], args
+            self.counters[key] = self.counters.get(key, 0) + amount
+            if self.counters[key] == amount:
+                self.expiries[key] = ttl
+            return self.counters[key]
+        return run
+
+def rate_limited_app(redis_client, **options):
+    from fastapi import FastAPI, Request
+    from app.middleware import LoggingMiddleware, RateLimitMiddleware, RequestIDMiddleware, charge_rate_limit
+    from main import api_exception_handler
+    from app.exceptions import APIException
+    
+    app = FastAPI()
+    app.add_exception_handler(APIException, api_exception_handler)
+    # Same order as main.py: the request ID and logging wrap the rate limiter
+    app.add_middleware(RateLimitMiddleware, redis_client=redis_client, limit_per_minute=10, **options)
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(RequestIDMiddleware)
+    
+    @app.post("/batch/{size}")
+    async def batch(size: int, request: Request):
+        await charge_rate_limit(request, size)
+        return {"ok": True}
+    
+    return app
+
+def test_rate_limit_counts_batch_size():
+    """Test that a batch request is charged one unit per item"""
+    from fastapi.testclient import TestClient
+    
+    app = rate_limited_app(FakeRedis())
+    
+    client = TestClient(app)
+    response = client.post("/batch/4")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-RateLimit-Remaining"] == "6"
+    
+    response = client.post("/batch/6")
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+    
+    response = client.post("/batch/2")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+    assert "Retry-After" in response.headers
+
+def test_rate_limited_response_carries_request_id():
+    """Test that a 429 gets the request ID and timing headers of any other response"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.middleware import LoggingMiddleware, RateLimitMiddleware, RequestIDMiddleware
+    
+    # Outermost first, as main.py adds them
+    order = [m.cls for m in app.user_middleware]
+    assert order.index(RequestIDMiddleware) < order.index(LoggingMiddleware) < order.index(RateLimitMiddleware)
+    
+    client = TestClient(rate_limited_app(FakeRedis()))
+    client.post("/batch/10")
+    response = client.post("/batch/1")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert len(response.headers["X-Request-ID"]) > 0
+    assert "X-Process-Time" in response.headers
+    assert "Retry-After" in response.headers
+
+def test_rate_limit_one_round_trip_per_count():
+    """Test that counting and the window's expiry take a single Redis call"""
+    from fastapi.testclient import TestClient
+    
+    redis_client = FakeRedis()
+    client = TestClient(rate_limited_app(redis_client))
+    client.post("/batch/1")
+    client.post("/batch/1")
+    
+    assert redis_client.calls == 2
+    assert list(redis_client.counters.values()) == [2]
+    assert list(redis_client.expiries.values()) == [60]
+
+def test_rate_limit_slow_redis_falls_back_to_local_counts():
+    """Test that a Redis slower than the timeout neither holds requests up nor lifts the limit"""
+    from fastapi.testclient import TestClient
+    
+    redis_client = FakeRedis(delay=1.0)
+    client = TestClient(rate_limited_app(redis_client, timeout=0.01))
+    start = time.monotonic()
+    response = client.post("/batch/1")
+    assert response.status_code == status.HTTP_200_OK
+    assert time.monotonic() - start < 0.5
+    assert response.headers["X-RateLimit-Remaining"] == "9"
+    
+    # Redis is not asked again until the retry delay passes
+    assert client.post("/batch/9").headers["X-RateLimit-Remaining"] == "0"
+    assert client.post("/batch/1").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert redis_client.calls == 1
@@ -0,0 +1,343 @@
+"""Test the rate limit algorithms against Redis's Lua scripting (via fakeredis)"""
+import asyncio
+import pytest
+import fakeredis
+from fastapi import status
+from app.rate_limit import (
+    FixedWindowPolicy, RateLimitPolicy, SlidingWindowPolicy, TokenBucketPolicy, create_policy
+)
+
+class Limiter:
+    """Runs a policy's script the way RateLimitMiddleware does, at chosen times"""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        self.script = self.redis.register_script(policy.script)
+
+    def hit(self, now, amount=1, client_id="client"):
+        async def run():
+            keys = self.policy.keys(client_id, now)
+            reply = await self.script(keys=keys, args=self.policy.args(amount, now))
+            return self.policy.result(reply, amount, now)
+        return asyncio.run(run())
+
+def test_fixed_window_resets_at_boundary():
+    """Test that the fixed window allows a full limit again in the next window"""
+    limiter = Limiter(FixedWindowPolicy(3))
+    results = [limiter.hit(60 + i) for i in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert results[3].retry_after == 57
+    assert results[3].headers()["X-RateLimit-Reset"] == "120"
+    assert limiter.hit(120).allowed
+
+def test_sliding_window_stops_boundary_burst():
+    """Test that a full window just before a boundary still counts just after it"""
+    limiter = Limiter(SlidingWindowPolicy(10))
+    assert all(limiter.hit(119).allowed for _ in range(10))
+
+    # 1 s into the next window, 59/60 of the previous 10 still count
+    result = limiter.hit(121)
+    assert not result.allowed
+    assert result.remaining == 0
+    # One hit fits once the previous window weighs 9 or less: at 126
+    assert result.retry_after == pytest.approx(5.0)
+    assert not limiter.hit(125.9).allowed
+    assert limiter.hit(126.1).allowed
+
+def test_sliding_window_denied_hits_are_not_counted():
+    """Test that retrying while limited does not push the limit further out"""
+    limiter = Limiter(SlidingWindowPolicy(2))
+    limiter.hit(0)
+    limiter.hit(1)
+    for second in range(2, 10):
+        assert not limiter.hit(second).allowed
+    # The 2 hits weigh 1 halfway through the next window, leaving room for one
+    assert not limiter.hit(89).allowed
+    assert limiter.hit(91).allowed
+
+def test_sliding_window_retry_after_into_next_window():
+    """Test Retry-After when this window alone is over the limit"""
+    limiter = Limiter(SlidingWindowPolicy(4))
+    for _ in range(4):
+        limiter.hit(10)
+    result = limiter.hit(30)
+    # Next window starts at 60; 4 * (1 - e / 60) + 1 <= 4 from e = 15
+    assert result.retry_after == pytest.approx(45.0)
+    assert result.headers()["Retry-After"] == "45"
+    assert result.headers()["X-RateLimit-Reset"] == "120"
+
+def test_token_bucket_burst_then_refill():
+    """Test that a bucket spends its burst at once, then refills steadily"""
+    limiter = Limiter(TokenBucketPolicy(burst=5, refill_per_second=0.5))
+    assert all(limiter.hit(100).allowed for _ in range(5))
+
+    result = limiter.hit(100)
+    assert not result.allowed
+    assert result.retry_after == pytest.approx(2.0)
+    assert result.headers()["X-RateLimit-Reset"] == "110"
+
+    assert not limiter.hit(101).allowed
+    result = limiter.hit(102)
+    assert result.allowed
+    assert result.remaining == 0
+    # Refill never goes past the burst
+    assert limiter.hit(1000).remaining == 4
+
+def test_token_bucket_batch_cost():
+    """Test that a hit costing several tokens is taken whole or not at all"""
+    limiter = Limiter(TokenBucketPolicy(burst=10, refill_per_second=1))
+    assert limiter.hit(0, amount=8).allowed
+    result = limiter.hit(0, amount=5)
+    assert not result.allowed
+    assert result.remaining == 2
+    assert result.retry_after == pytest.approx(3.0)
+    assert limiter.hit(3, amount=5).allowed
+
+def test_token_bucket_ignores_clock_going_back():
+    """Test that an app server with a slower clock cannot drain refilled tokens twice"""
+    limiter = Limiter(TokenBucketPolicy(burst=2, refill_per_second=1))
+    limiter.hit(50, amount=2)
+    assert not limiter.hit(49).allowed
+    assert limiter.hit(51).allowed
+
+def test_clients_are_limited_separately():
+    """Test that one client's usage does not limit another"""
+    for policy in (FixedWindowPolicy(1), SlidingWindowPolicy(1), TokenBucketPolicy(1, 1)):
+        limiter = Limiter(policy)
+        assert limiter.hit(10, client_id="a").allowed
+        assert not limiter.hit(10, client_id="a").allowed
+        assert limiter.hit(10, client_id="b").allowed
+
+def test_create_policy():
+    """Test that algorithms are picked by name"""
+    assert isinstance(create_policy("fixed", 60), FixedWindowPolicy)
+    assert isinstance(create_policy("sliding", 60), SlidingWindowPolicy)
+    bucket = create_policy("token_bucket", 120, burst=20)
+    assert (bucket.burst, bucket.refill_per_second) == (20, 2)
+    assert create_policy("token_bucket", 120).burst == 120
+    with pytest.raises(ValueError):
+        create_policy("leaky", 60)
+
+def test_incomplete_policy_cannot_be_created():
+    """Test that a policy missing one of the hooks fails when created, not on its first request"""
+    class NoLocal(RateLimitPolicy):
+        keys = FixedWindowPolicy.keys
+        args = FixedWindowPolicy.args
+        result = FixedWindowPolicy.result
+    
+    with pytest.raises(TypeError):
+        NoLocal()
+    with pytest.raises(TypeError):
+        RateLimitPolicy()
+
+def test_middleware_headers_follow_policy():
+    """Test that responses carry the token bucket's limit and remaining tokens"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.middleware import RateLimitMiddleware
+
+    app = FastAPI()
+    app.add_middleware(
+        RateLimitMiddleware,
+        redis_client=fakeredis.FakeAsyncRedis(decode_responses=True),
+        policy=TokenBucketPolicy(burst=2, refill_per_second=0.001)
+    )
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    client = TestClient(app)
+    response = client.get("/ping")
+    assert response.headers["X-RateLimit-Limit"] == "2"
+    assert response.headers["X-RateLimit-Remaining"] == "1"
+    client.get("/ping")
+
+    response = client.get("/ping")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "1000"
+    assert response.json()["error"]["retry_after"] == 1000
+
+def leased_middleware(redis_client, policy, size, workers=1):
+    """RateLimitMiddleware instances sharing one Redis, as separate workers would"""
+    from app.middleware import RateLimitMiddleware
+    from app.rate_limit import LeaseCache
+    return [
+        RateLimitMiddleware(None, redis_client, policy=policy, leases=LeaseCache(size, seconds=60, max_keys=2))
+        for _ in range(workers)
+    ]
+
+class CountingRedis(fakeredis.FakeAsyncRedis):
+    """fakeredis that counts script runs"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.script_calls = 0
+
+    async def evalsha(self, *args, **kwargs):
+        self.script_calls += 1
+        return await super().evalsha(*args, **kwargs)
+
+def test_leases_cut_redis_calls():
+    """Test that leases grow to 10 hits, so runs serve up to eleven hits each"""
+    redis_client = CountingRedis(decode_responses=True)
+    [limiter] = leased_middleware(redis_client, TokenBucketPolicy(burst=1000, refill_per_second=1), 10)
+
+    async def run():
+        return [await limiter._hit("client", 1) for _ in range(100)]
+
+    results = asyncio.run(run())
+    assert all(result.allowed for result in results)
+    # Leases of 1, 2, 4 and 8 serve 19 hits, then 8 runs of up to 11 the
+    # other 81, plus the first run's retry after loading the script
+    assert redis_client.script_calls == 4 + 8 + 1
+    assert [result.remaining for result in results[:3]] == [999, 998, 997]
+
+def test_leases_never_exceed_global_limit():
+    """Test that workers leasing from one Redis admit no more than the limit"""
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    workers = leased_middleware(redis_client, SlidingWindowPolicy(100), 8, workers=4)
+
+    async def run():
+        return [await workers[i % 4]._hit("client", 1) for i in range(200)]
+
+    allowed = sum(result.allowed for result in asyncio.run(run()))
+    # At most 4 workers x 8 stranded hits short of the limit
+    assert 100 - 4 * 8 <= allowed <= 100
+
+def test_leases_shrink_near_limit():
+    """Test that a worker stops leasing ahead once little allowance is left"""
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    [limiter] = leased_middleware(redis_client, FixedWindowPolicy(25), 10)
+
+    async def run():
+        return [await limiter._hit("client", 1) for _ in range(30)]
+
+    results = asyncio.run(run())
+    assert sum(result.allowed for result in results) == 25
+    assert [result.remaining for result in results[20:25]] == [4, 3, 2, 1, 0]
+
+def test_expired_lease_shrinks_to_use():
+    """Test that a lease outliving its client's traffic is followed by a smaller one"""
+    from app.rate_limit import LeaseCache, RateLimitResult
+
+    leases = LeaseCache(50, seconds=1)
+    allowed = RateLimitResult(True, 1000, 500, 60)
+    leases.store("client", 1, 1 + 40, allowed, now=0)
+    for _ in range(3):
+        leases.spend("client", 1, now=0.5)
+    assert leases.ask("client", 1, now=0.9) == 1 + 50
+    assert leases.ask("client", 1, now=1.5) == 1 + 3
+
+def test_lease_cache_caches_denials_and_evicts():
+    """Test that a denial is answered locally and only recent clients keep leases"""
+    redis_client = CountingRedis(decode_responses=True)
+    [limiter] = leased_middleware(redis_client, TokenBucketPolicy(burst=1, refill_per_second=0.01), 5)
+
+    async def run():
+        await limiter._hit("a", 1)
+        denied = await limiter._hit("a", 1)
+        calls = redis_client.script_calls
+        again = await limiter._hit("a", 1)
+        assert redis_client.script_calls == calls
+        await limiter._hit("b", 1)
+        await limiter._hit("c", 1)
+        return denied, again
+
+    denied, again = asyncio.run(run())
+    assert not denied.allowed and not again.allowed
+    assert again.retry_after <= denied.retry_after
+    assert limiter.leases.stats()["keys"] == 2
+    assert limiter.leases.stats()["evictions"] == 1
+
+class FailingRedis(fakeredis.FakeAsyncRedis):
+    """fakeredis whose scripts fail while ``down`` is set"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.down = True
+
+    async def evalsha(self, *args, **kwargs):
+        if self.down:
+            raise ConnectionError("Redis is down")
+        return await super().evalsha(*args, **kwargs)
+
+def test_fallback_matches_redis_decisions():
+    """Test that the in-process scripts decide exactly as the Lua ones"""
+    from app.rate_limit import RateLimitFallback
+
+    for policy in (FixedWindowPolicy(5), SlidingWindowPolicy(5), TokenBucketPolicy(5, 0.5)):
+        limiter = Limiter(policy)
+        fallback = RateLimitFallback()
+        for now in (59.0, 59.5, 60.2, 60.2, 61, 61, 62.5, 63, 63, 64, 90, 119, 130):
+            for amount in (1, 2):
+                keys, args = policy.keys("client", now), policy.args(amount, now)
+                local = policy.result(fallback.run(policy, keys, args, now), amount, now)
+                remote = limiter.hit(now, amount)
+                assert (local.allowed, local.remaining) == (remote.allowed, remote.remaining)
+                assert (local.reset_at, local.retry_after) == pytest.approx((remote.reset_at, remote.retry_after))
+
+def test_fallback_expires_and_bounds_keys():
+    """Test that local counters expire like Redis keys and stay within max_keys"""
+    from app.rate_limit import RateLimitFallback
+
+    fallback = RateLimitFallback(max_keys=32, shards=4)
+    assert fallback.incrby("a", 1, now=0) == 1
+    fallback.expire("a", 60, now=0)
+    assert fallback.get("a", now=59.9) == 1
+    assert fallback.get("a", now=60) is None
+
+    for i in range(100):
+        fallback.incrby(f"client-{i}", 1, now=100)
+        fallback.expire(f"client-{i}", 60, now=100)
+    assert fallback.stats()["local_keys"] <= 32
+    assert fallback.stats()["local_evictions"] >= 68
+
+    # A shard drops its expired keys on the next write after a second
+    fallback = RateLimitFallback(shards=1)
+    for i in range(10):
+        fallback.incrby(f"client-{i}", 1, now=0)
+        fallback.expire(f"client-{i}", 60, now=0)
+    fallback.incrby("late", 1, now=60)
+    assert fallback.stats()["local_keys"] == 1
+
+def test_middleware_switches_to_local_and_back():
+    """Test that decisions move in-process while Redis fails and back once it answers"""
+    from app.middleware import RateLimitMiddleware
+    from app.rate_limit import RateLimitFallback
+
+    redis_client = FailingRedis(decode_responses=True)
+    fallback = RateLimitFallback(retry_seconds=0.05)
+    limiter = RateLimitMiddleware(None, redis_client, policy=FixedWindowPolicy(3), fallback=fallback)
+
+    async def run():
+        results = [await limiter._hit("client", 1) for _ in range(4)]
+        stats = fallback.stats()
+        redis_client.down = False
+        # Still local until the retry delay has passed
+        await limiter._hit("other", 1)
+        assert fallback.mode == "local"
+        await asyncio.sleep(0.06)
+        results.append(await limiter._hit("client", 1))
+        return results, stats
+
+    results, stats = asyncio.run(run())
+    assert [r.allowed for r in results[:4]] == [True, True, True, False]
+    assert (stats["mode"], stats["redis_errors"], stats["local_decisions"]) == ("local", 1, 4)
+    # Back on Redis, which has not seen the local counts
+    assert results[4].allowed and results[4].remaining == 2
+    assert fallback.stats()["mode"] == "redis"
+    assert fallback.stats()["switches"] == 2
+
+def test_middleware_without_redis_counts_locally():
+    """Test that rate limiting still applies when no Redis is configured"""
+    from app.middleware import RateLimitMiddleware
+
+    limiter = RateLimitMiddleware(None, None, policy=SlidingWindowPolicy(2))
+
+    async def run():
+        return [await limiter._hit("client", 1) for _ in range(3)]
+
+    assert [r.allowed for r in asyncio.run(run())] == [True, True, False]
+    assert limiter.fallback.mode == "local"
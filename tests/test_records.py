@@ -0,0 +1,34 @@
+"""Test the compact storage records"""
+from datetime import datetime
+from app.models import Task, TaskStatus
+from app.records import TaskRecord, datetime_to_us, us_to_datetime
+
+def test_timestamps_round_trip_exactly():
+    """Test that epoch microseconds convert to and from datetimes losslessly"""
+    value = datetime(2026, 10, 17, 14, 45, 24, 615123)
+    assert us_to_datetime(datetime_to_us(value)) == value
+
+def test_task_record_is_slotted():
+    """Test that task records carry no per-instance dict"""
+    task = TaskRecord(1, 2, "Title", None, TaskStatus.TODO, 0, 0)
+    assert not hasattr(task, "__dict__")
+    assert task.created_at == datetime(1970, 1, 1)
+
+def test_task_model_reads_record():
+    """Test that the API model validates straight from a record"""
+    ts = datetime_to_us(datetime(2026, 1, 2, 3, 4, 5))
+    task = TaskRecord(7, 3, "Title", "Desc", TaskStatus.DONE, ts, ts + 1)
+    model = Task.model_validate(task)
+
+    assert model.id == 7
+    assert model.status == TaskStatus.DONE
+    assert model.created_at == datetime(2026, 1, 2, 3, 4, 5)
+    assert model.updated_at == datetime(2026, 1, 2, 3, 4, 5, 1)
+
+def test_sort_values():
+    """Test the values used by ordered indexes and cursors"""
+    task = TaskRecord(1, 2, "Title", None, TaskStatus.IN_PROGRESS, 10, 20)
+    assert task.sort_value("created_at") == 10
+    assert task.sort_value("updated_at") == 20
+    assert task.sort_value("status") == "in_progress"
+    assert task.sort_value("title") == "Title"
@@ -0,0 +1,99 @@
+"""Test full-text search"""
+import random
+from app.database import Database
+from app.models import TaskStatus
+from app.records import TaskRecord
+from app.search import SearchIndex, query_terms, tokenize
+from app.sharded_database import ShardedDatabase
+from app.sqlite_database import SQLiteDatabase
+
+def record(task_id, title, description=None):
+    """Task of user 1 with fixed timestamps"""
+    return TaskRecord(task_id, 1, title, description, TaskStatus.TODO, 0, 0)
+
+def test_tokenize():
+    """Test case folding, punctuation and query word limits"""
+    assert tokenize("Fix LOGIN-bug, Straße!") == ["fix", "login", "bug", "strasse"]
+    assert query_terms("docs Docs readme") == ["docs", "readme"]
+    assert query_terms("?!") == []
+
+def test_matching_and_ranking():
+    """Test AND semantics, prefix matches and ranking order"""
+    index = SearchIndex([
+        record(1, "Write docs", "for the release"),
+        record(2, "Release notes", "mention the docs"),
+        record(3, "Documentation review"),
+        record(4, "Unrelated chore"),
+    ])
+    # Title matches outrank description matches
+    assert index.search("docs") == ([1, 2], 2)
+    # Prefixes match too
+    assert index.search("doc") == ([3, 1, 2], 3)
+    # Every word has to match; equal scores put the newest task first
+    assert index.search("docs release") == ([2, 1], 2)
+    assert index.search("docs chore") == ([], 0)
+    assert index.search("missing") == ([], 0)
+
+def test_exact_word_beats_prefix():
+    """Test that a whole-word match outranks a longer word with the prefix"""
+    index = SearchIndex([record(1, "Deploy"), record(2, "Deployment")])
+    assert index.search("deploy")[0] == [1, 2]
+
+def test_pagination():
+    """Test skip and limit over ranked results, newest first on ties"""
+    index = SearchIndex(record(i, f"Task {i}") for i in range(1, 26))
+    first, total = index.search("task", 0, 10)
+    second, _ = index.search("task", 10, 10)
+    last, _ = index.search("task", 20, 10)
+    assert total == 25
+    assert first + second + last == list(range(25, 0, -1))
+
+def test_discard():
+    """Test that removed tasks and their unique terms leave the index"""
+    index = SearchIndex([record(1, "Alpha beta"), record(2, "Beta gamma")])
+    index.discard(record(1, "Alpha beta"))
+    assert len(index) == 1
+    assert "alpha" not in index.postings and "alpha" not in index.terms
+    assert index.search("beta") == ([2], 1)
+    assert index.search("al") == ([], 0)
+
+def test_database_index_follows_writes():
+    """Test that incremental maintenance matches an index built from scratch"""
+    rng = random.Random(7)
+    words = ["alpha", "alpine", "beta", "betamax", "gamma", "delta", "docs", "doc"]
+    db = Database()
+    task_ids = []
+    for i in range(200):
+        if i == 50:
+            # Materialise the index halfway so later writes are incremental
+            db.search_tasks(1, "alpha")
+        op = rng.random()
+        if op < 0.5 or not task_ids:
+            title = " ".join(rng.choice(words) for _ in range(3))
+            task_ids.append(db.create_task(1 + i % 2, title, rng.choice([None, "beta docs"]), TaskStatus.TODO).id)
+        elif op < 0.8:
+            db.update_task(rng.choice(task_ids), title=rng.choice(words), status=TaskStatus.DONE)
+        else:
+            db.delete_task(task_ids.pop(rng.randrange(len(task_ids))))
+    
+    for user_id in (1, 2):
+        fresh = SearchIndex(db._user_task_bucket(user_id).values())
+        for query in ("alpha", "al", "bet docs", "doc", "gamma delta", "zzz"):
+            expected = fresh.search(query, 0, 1000)
+            found, total = db.search_tasks(user_id, query, 0, 1000)
+            assert ([t.id for t in found], total) == expected
+
+def test_backends_agree(tmp_path):
+    """Test that every backend returns the same results"""
+    stores = [Database(), ShardedDatabase(shards=4), SQLiteDatabase(str(tmp_path / "tasks.db"))]
+    for db in stores:
+        first = db.create_task(1, "Write docs", "for the release", TaskStatus.TODO)
+        db.create_task(2, "Write docs", None, TaskStatus.TODO)
+        db.create_task(1, "Release notes", "mention docs", TaskStatus.DONE)
+        db.update_task(first.id, description="for the launch")
+    results = [
+        [(t.title, t.user_id) for t in db.search_tasks(1, "rele")[0]] + [db.search_tasks(1, "docs")[1]]
+        for db in stores
+    ]
+    assert results[0] == results[1] == results[2] == [("Release notes", 1), 2]
+    stores[2].close()
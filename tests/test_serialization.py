@@ -0,0 +1,71 @@
+"""Test the fast response encoders"""
+import json
+import orjson
+import pytest
+from app.models import Task, TaskListResponse, TaskStatus
+from app.records import TaskRecord
+from app.serialization import (
+    RecordJSONResponse, dump_tasks, dump_tasks_ndjson, parse_fields, task_encoder, task_list_to_dict, task_to_dict
+)
+
+def sample_tasks():
+    """Tasks covering optional fields and whole-second timestamps"""
+    return [
+        TaskRecord(1, 7, "Plain", None, TaskStatus.TODO, 1_700_000_000_000_000, 1_700_000_000_000_000),
+        TaskRecord(2, 7, "Ünïcode \"quoted\"", "desc\nline", TaskStatus.DONE, 1_700_000_000_123_456, 1_700_000_001_000_001),
+    ]
+
+def test_task_matches_model_json():
+    """Test that records encode byte for byte like the Task model"""
+    for task in sample_tasks():
+        assert orjson.dumps(task_to_dict(task)) == Task.model_validate(task).model_dump_json().encode()
+
+def test_task_list_matches_model_json():
+    """Test that pages encode like TaskListResponse"""
+    tasks = sample_tasks()
+    expected = TaskListResponse(
+        tasks=[Task.model_validate(t) for t in tasks], total=2, skip=0, limit=10, next_cursor="abc"
+    ).model_dump_json().encode()
+    assert orjson.dumps(task_list_to_dict(tasks, 2, 0, 10, "abc")) == expected
+
+def test_record_response_encodes_with_orjson():
+    """Test that the response class sends the orjson bytes as application/json"""
+    page = task_list_to_dict(sample_tasks(), 2, 0, 10)
+    response = RecordJSONResponse(page, headers={"ETag": '"abc"'})
+    assert response.body == orjson.dumps(page)
+    assert response.media_type == "application/json"
+    assert response.headers["ETag"] == '"abc"'
+
+def test_dump_tasks():
+    """Test the array and NDJSON encoders"""
+    tasks = sample_tasks()
+    assert [item["id"] for item in json.loads(dump_tasks(tasks))] == [1, 2]
+    lines = dump_tasks_ndjson(tasks).splitlines()
+    assert [json.loads(line)["title"] for line in lines] == [t.title for t in tasks]
+
+def test_parse_fields():
+    """Test that projections are validated and put in Task field order"""
+    assert parse_fields(None) is None
+    assert parse_fields("status, id,title,id") == ("title", "status", "id")
+    assert parse_fields(",".join(Task.model_fields)) is None
+    for invalid in ("id,secret", "", "id,"):
+        with pytest.raises(ValueError):
+            parse_fields(invalid)
+
+def test_projected_tasks_match_model_json():
+    """Test that projections encode like the Task model restricted to the fields"""
+    for fields in (("id",), ("title", "status", "id"), ("description", "created_at", "updated_at")):
+        encode = task_encoder(fields)
+        for task in sample_tasks():
+            expected = Task.model_validate(task).model_dump_json(include=set(fields)).encode()
+            assert orjson.dumps(encode(task)) == expected
+    assert task_encoder(None) is task_to_dict
+    lines = dump_tasks_ndjson(sample_tasks(), task_encoder(("id",))).splitlines()
+    assert [json.loads(line) for line in lines] == [{"id": 1}, {"id": 2}]
+
+def test_projected_routes_document_fields():
+    """Test that routes taking fields say in their schema that it trims the model"""
+    from main import api_v1
+    paths = api_v1.openapi()["paths"]
+    for path in ("/tasks", "/tasks/search", "/tasks/{task_id}", "/tasks/admin/all"):
+        assert "`fields`" in paths[path]["get"]["responses"]["200"]["description"]
@@ -0,0 +1,180 @@
+"""Test the sharded, thread-safe database"""
+import random
+import sys
+import threading
+import pytest
+from app.database import Database, create_database, create_default_admin
+from app.indexes import SortedIndex
+from app.models import TaskStatus
+from app.sharded_database import ShardedDatabase
+
+@pytest.fixture
+def fast_switching():
+    """Switch threads as often as possible to expose races"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def strip_times(tasks):
+    """Drop timestamps, which differ between stores"""
+    return [(t.id, t.user_id, t.title, t.description, t.status) for t in tasks]
+
+def assert_consistent(db):
+    """Check every shard's secondary indexes against its task table"""
+    seen = set()
+    for shard in db.shards:
+        assert not seen & shard.tasks.keys()
+        seen |= shard.tasks.keys()
+        for task in shard.tasks.values():
+            assert db.shard_for_user(task.user_id) is shard
+            assert db.shard_for_task(task.id) is shard
+            assert shard.user_tasks_index[task.user_id][task.id] is task
+            assert shard.user_status_index[(task.user_id, task.status)][task.id] is task
+        assert sum(len(bucket) for bucket in shard.user_tasks_index.values()) == len(shard.tasks)
+        assert sum(len(bucket) for bucket in shard.user_status_index.values()) == len(shard.tasks)
+        for (user_id, status, field), index in shard.sort_indexes.items():
+            bucket = shard._user_task_bucket(user_id, status)
+            assert list(index) == list(SortedIndex(shard._sort_key(t, field) for t in bucket.values()))
+
+def test_matches_single_store():
+    """Test that sharding does not change query results"""
+    sharded, plain = ShardedDatabase(shards=4), Database()
+    for db in (sharded, plain):
+        create_default_admin(db)
+        for i in range(20):
+            db.create_task(i % 5 + 1, f"Task {i % 7}", None, TaskStatus.TODO)
+
+    # IDs are allocated per shard, so compare by title and owner
+    for user_id in range(1, 6):
+        for sort_by in ("title", "-title", "status"):
+            assert [(t.user_id, t.title) for t in sharded.get_user_tasks(user_id, sort_by=sort_by)] == \
+                [(t.user_id, t.title) for t in plain.get_user_tasks(user_id, sort_by=sort_by)]
+        assert sharded.count_user_tasks(user_id) == plain.count_user_tasks(user_id) == 4
+    assert sharded.get_user_by_username("admin").id == 1
+
+    all_tasks = sharded.get_all_tasks()
+    assert [t.id for t in all_tasks] == sorted(t.id for t in all_tasks)
+    scanned, after_id = [], 0
+    while batch := sharded.scan_tasks(after_id=after_id, limit=3):
+        scanned.extend(batch)
+        after_id = batch[-1].id
+    assert strip_times(scanned) == strip_times(all_tasks)
+
+def test_task_ids_route_to_shards():
+    """Test ID allocation and lookups across shards"""
+    db = ShardedDatabase(shards=3)
+    tasks = [db.create_task(user_id, "T", None, TaskStatus.TODO) for user_id in (1, 2, 3, 1)]
+    assert len({t.id for t in tasks}) == 4
+    for task in tasks:
+        assert db.get_task(task.id) == task
+    assert db.get_task(0) is None
+    assert db.update_task(999, title="missing") is None
+    assert db.delete_task(tasks[0].id) is True
+    assert db.delete_task(tasks[0].id) is False
+    assert [t.id for t in db.scan_tasks(user_id=1)] == [tasks[3].id]
+
+def test_returned_records_are_not_live():
+    """Test that records read from a shard do not change when the task is updated"""
+    db = ShardedDatabase(shards=2)
+    created = db.create_task(1, "Before", None, TaskStatus.TODO)
+    read = [db.get_task(created.id), db.get_user_tasks(1)[0], db.scan_tasks()[0], db.search_tasks(1, "before")[0][0]]
+    updated = db.update_task(created.id, title="After")
+    assert [task.title for task in [created] + read] == ["Before"] * 5
+    db.update_task(created.id, status=TaskStatus.DONE)
+    assert (updated.title, updated.status, updated.version) == ("After", TaskStatus.TODO, 2)
+    assert db.get_task(created.id).version == 3
+
+def test_concurrent_writers_keep_indexes_consistent(fast_switching):
+    """Hammer the store from many threads, then verify every index"""
+    db = ShardedDatabase(shards=4)
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        mine = []
+        try:
+            for i in range(300):
+                user_id = rng.randint(1, 12)
+                op = rng.random()
+                if op < 0.5 or not mine:
+                    mine.append(db.create_task(user_id, f"T{rng.randint(0, 50)}", None, TaskStatus.TODO).id)
+                elif op < 0.75:
+                    db.update_task(rng.choice(mine), title=f"U{i}", status=rng.choice(list(TaskStatus)))
+                elif op < 0.85:
+                    db.delete_task(mine.pop(rng.randrange(len(mine))))
+                else:
+                    db.get_user_tasks(user_id, limit=5, sort_by=rng.choice(("title", "-updated_at", "status")))
+                    db.get_user_tasks(user_id, status=TaskStatus.DONE, sort_by="created_at")
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert_consistent(db)
+
+def test_listeners_see_shard_writes():
+    """Test that writes on any shard reach the listeners"""
+    db = ShardedDatabase(shards=4)
+    events = []
+    db.add_listener(lambda event, task: events.append((event, task.id, task.user_id)))
+    first = db.create_task(1, "One", None, TaskStatus.TODO)
+    second = db.create_task(2, "Two", None, TaskStatus.TODO)
+    db.update_task(second.id, title="Two again")
+    db.delete_task(first.id, expected_version=5)
+    db.delete_task(first.id)
+    assert events == [
+        ("created", first.id, 1), ("created", second.id, 2),
+        ("updated", second.id, 2), ("deleted", first.id, 1),
+    ]
+
+def test_bulk_create_on_user_shard():
+    """Test that create_tasks writes to the user's shard and notifies per task"""
+    db = ShardedDatabase(shards=4)
+    events = []
+    db.add_listener(lambda event, task: events.append((event, task.id)))
+    db.get_user_tasks(3, sort_by="title")
+    created = db.create_tasks(3, [{"title": f"Bulk {i}", "status": TaskStatus.DONE} for i in range(5)])
+
+    assert all(db.shard_for_task(task.id) is db.shard_for_user(3) for task in created)
+    assert events == [("created", task.id) for task in created]
+    assert [t.title for t in db.get_user_tasks(3, sort_by="-title")] == [f"Bulk {i}" for i in range(5)]
+    assert_consistent(db)
+
+def test_status_counts_merge_shards():
+    """Test that sharded counts match a single store"""
+    single, sharded = Database(), ShardedDatabase(shards=4)
+    for db in (single, sharded):
+        created = [db.create_task(user_id, "Task", None, TaskStatus.TODO) for user_id in range(1, 9)]
+        db.update_task(created[2].id, status=TaskStatus.DONE)
+        db.delete_task(created[5].id)
+    assert sharded.count_tasks_by_status() == single.count_tasks_by_status()
+    assert sharded.count_tasks_by_status(3) == single.count_tasks_by_status(3)
+    assert sharded.count_tasks_by_user() == single.count_tasks_by_user()
+
+def test_create_database_selects_sharded():
+    """Test that memory://?shards=N builds a sharded store"""
+    db = create_database("memory://?shards=8")
+    assert isinstance(db, ShardedDatabase)
+    assert len(db.shards) == 8
+    assert isinstance(create_database("memory://"), Database)
+    with pytest.raises(ValueError):
+        ShardedDatabase(shards=0)
+
+def test_changes_follow_user_shard():
+    """Test that a user's changes and tombstones come from their shard"""
+    db = ShardedDatabase(shards=4)
+    db.tombstone_retention_us = 5_000_000
+    assert all(shard.tombstone_retention_us == 5_000_000 for shard in db.shards)
+    first = db.create_task(3, "First", None, TaskStatus.TODO)
+    second = db.create_task(3, "Second", None, TaskStatus.TODO)
+    db.create_task(4, "Other shard", None, TaskStatus.TODO)
+    db.delete_task(first.id)
+
+    changes = db.get_changes(3, (first.created_ts, 0))
+    assert [(type(c).__name__, c.id) for c in changes] == [("TaskRecord", second.id), ("TaskTombstone", first.id)]
@@ -0,0 +1,262 @@
+"""Test the SQLite storage backend"""
+import pytest
+from app.database import Database, create_database, create_default_admin
+from app.models import TaskStatus, UserRole
+from app.records import TaskTombstone
+from app.repository import change_key
+from app.sqlite_database import SQLiteDatabase
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """File-backed SQLite database with a reader pool"""
+    db = SQLiteDatabase(str(tmp_path / "tasks.db"), pool_size=2)
+    yield db
+    db.close()
+
+def populate(db):
+    """Apply the same writes to any backend"""
+    db.create_task(1, "Write docs", None, TaskStatus.TODO)
+    db.create_task(1, "Fix bug", "Crash on login", TaskStatus.IN_PROGRESS)
+    db.create_task(1, "Ship release", None, TaskStatus.DONE)
+    db.create_task(2, "Other user", None, TaskStatus.TODO)
+    db.update_task(1, title="Add docs", status=TaskStatus.DONE)
+    db.delete_task(2)
+
+def strip_times(tasks):
+    """Drop timestamps, which differ between backends"""
+    return [(t.id, t.user_id, t.title, t.description, t.status) for t in tasks]
+
+def test_create_database_selects_backend(tmp_path):
+    """Test that DATABASE_URL picks the backend"""
+    assert isinstance(create_database("memory://"), Database)
+
+    db = create_database(f"sqlite:///{tmp_path / 'app.db'}")
+    assert isinstance(db, SQLiteDatabase)
+    assert db.ping()
+    db.close()
+
+    with pytest.raises(ValueError):
+        create_database("postgres://localhost/tasks")
+
+def test_wal_mode(sqlite_db):
+    """Test that file databases run in WAL mode"""
+    mode = sqlite_db._writer.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+def test_users(sqlite_db):
+    """Test user creation and lookups"""
+    create_default_admin(sqlite_db)
+    create_default_admin(sqlite_db)
+    user = sqlite_db.create_user("a@example.com", "alice", "hash")
+
+    assert sqlite_db.get_user_by_id(user.id) == user
+    assert sqlite_db.get_user_by_username("alice") == user
+    assert sqlite_db.get_user_by_username("admin").role == UserRole.ADMIN
+    assert sqlite_db.username_exists("alice")
+    assert sqlite_db.email_exists("a@example.com")
+    assert not sqlite_db.username_exists("bob")
+    assert sqlite_db.get_user_by_id(999) is None
+
+def test_matches_in_memory_backend(sqlite_db):
+    """Test that both backends answer queries identically"""
+    memory_db = Database()
+    populate(memory_db)
+    populate(sqlite_db)
+
+    for sort_by in ("created_at", "-updated_at", "title", "-title", "status", "-status"):
+        for status in (None, TaskStatus.DONE):
+            for skip, limit in ((0, 10), (1, 1)):
+                kwargs = dict(skip=skip, limit=limit, status=status, sort_by=sort_by)
+                assert strip_times(sqlite_db.get_user_tasks(1, **kwargs)) == \
+                    strip_times(memory_db.get_user_tasks(1, **kwargs))
+
+    for status in (None, *TaskStatus):
+        assert sqlite_db.count_user_tasks(1, status=status) == memory_db.count_user_tasks(1, status=status)
+    assert strip_times(sqlite_db.get_all_tasks()) == strip_times(memory_db.get_all_tasks())
+
+def test_user_counts_read_task_counts(sqlite_db):
+    """Test that list totals come from task_counts, not a scan of the user's tasks"""
+    from app.sqlite_database import COUNT_USER_STATUS_TASKS, COUNT_USER_TASKS
+    for query, args in ((COUNT_USER_TASKS, (1,)), (COUNT_USER_STATUS_TASKS, (1, "todo"))):
+        plan = " ".join(row[-1] for row in sqlite_db._writer.execute(f"EXPLAIN QUERY PLAN {query}", args))
+        assert "task_counts" in plan and " tasks " not in f" {plan} "
+    
+    populate(sqlite_db)
+    sqlite_db.delete_task(1)
+    sqlite_db.update_task(2, status=TaskStatus.TODO)
+    memory_db = Database()
+    populate(memory_db)
+    memory_db.delete_task(1)
+    memory_db.update_task(2, status=TaskStatus.TODO)
+    for user_id in (1, 2, 99):
+        for status in (None, *TaskStatus):
+            assert sqlite_db.count_user_tasks(user_id, status) == memory_db.count_user_tasks(user_id, status)
+
+def test_tasks_round_trip(sqlite_db):
+    """Test that stored tasks read back unchanged"""
+    task = sqlite_db.create_task(7, "Round trip", "desc", TaskStatus.TODO)
+    assert sqlite_db.get_task(task.id) == task
+
+    updated = sqlite_db.update_task(task.id, description="new", title=None)
+    assert updated.title == "Round trip"
+    assert updated.description == "new"
+    assert updated.updated_ts >= task.updated_ts
+    assert sqlite_db.get_task(task.id) == updated
+
+    assert sqlite_db.update_task(999, title="missing") is None
+    assert sqlite_db.delete_task(task.id) is True
+    assert sqlite_db.delete_task(task.id) is False
+    assert sqlite_db.get_task(task.id) is None
+
+def test_keyset_pagination(sqlite_db):
+    """Test paging with an (value, id) key"""
+    for i in range(10):
+        sqlite_db.create_task(3, f"Task {i % 4}", None, TaskStatus.TODO)
+
+    for sort_by in ("title", "-title", "created_at"):
+        field = sort_by.lstrip("-")
+        expected = sqlite_db.get_user_tasks(3, limit=100, sort_by=sort_by)
+        pages, after = [], None
+        while True:
+            page = sqlite_db.get_user_tasks(3, limit=3, sort_by=sort_by, after=after)
+            if not page:
+                break
+            pages.extend(page)
+            after = (page[-1].sort_value(field), page[-1].id)
+        assert pages == expected
+
+def test_persists_across_connections(tmp_path):
+    """Test that data survives reopening the database"""
+    path = str(tmp_path / "tasks.db")
+    db = SQLiteDatabase(path)
+    task = db.create_task(1, "Durable", None, TaskStatus.TODO)
+    db.close()
+
+    reopened = SQLiteDatabase(path)
+    assert reopened.get_task(task.id) == task
+    reopened.close()
+
+def test_invalid_sort_field(sqlite_db):
+    """Test that unknown sort fields are rejected before reaching SQL"""
+    with pytest.raises(ValueError):
+        sqlite_db.get_user_tasks(1, sort_by="id; DROP TABLE tasks")
+
+def test_scan_tasks_matches_in_memory_backend(sqlite_db):
+    """Test that batched scans agree across backends"""
+    memory_db = Database()
+    populate(memory_db)
+    populate(sqlite_db)
+
+    for filters in ({}, {"status": TaskStatus.DONE}, {"user_id": 1}, {"user_id": 1, "status": TaskStatus.TODO}):
+        for after_id in (0, 1, 3):
+            assert strip_times(sqlite_db.scan_tasks(after_id=after_id, limit=2, **filters)) == \
+                strip_times(memory_db.scan_tasks(after_id=after_id, limit=2, **filters))
+
+def test_bulk_operations_match_in_memory_backend(sqlite_db):
+    """Test that the transactional bulk methods agree with the default loops"""
+    memory_db = Database()
+    for db in (memory_db, sqlite_db):
+        created = db.create_tasks(1, [
+            {"title": "A", "description": None, "status": TaskStatus.TODO},
+            {"title": "B", "description": "b", "status": TaskStatus.DONE},
+            {"title": "C"}
+        ])
+        assert [task.id for task in created] == [1, 2, 3]
+        assert db.update_tasks([(1, {"title": "A2"}), (9, {"title": "X"}), (3, {"status": TaskStatus.DONE})])[1] is None
+        assert db.delete_tasks([2, 2, 9]) == [True, False, False]
+
+    assert strip_times(sqlite_db.get_tasks([3, 9, 1])[::2]) == strip_times(memory_db.get_tasks([3, 9, 1])[::2])
+    assert sqlite_db.get_tasks([3, 9, 1])[1] is None
+    assert strip_times(sqlite_db.get_all_tasks()) == strip_times(memory_db.get_all_tasks())
+
+def test_versions_match_in_memory_backend(sqlite_db):
+    """Test that both backends version tasks and collections the same way"""
+    memory_db = Database()
+    for db in (memory_db, sqlite_db):
+        populate(db)
+        assert db.update_task(3, expected_version=5, title="Stale") is None
+        assert db.delete_task(3, expected_version=5) is False
+    assert sqlite_db.get_all_tasks()[0].version == memory_db.get_all_tasks()[0].version == 2
+    for task_id in (1, 2, 3, 99):
+        assert sqlite_db.get_task_version(task_id) == memory_db.get_task_version(task_id)
+    for user_id in (1, 2, 3):
+        assert sqlite_db.get_collection_version(user_id) == memory_db.get_collection_version(user_id)
+
+def test_reopen_keeps_salt_and_counts(tmp_path):
+    """Test that the ETag salt and status counts survive reopening the file"""
+    path = str(tmp_path / "tasks.db")
+    db = SQLiteDatabase(path)
+    db.create_task(1, "Kept", None, TaskStatus.TODO)
+    salt = db.etag_salt
+    db.close()
+    reopened = SQLiteDatabase(path)
+    assert reopened.get_task(1).version == 1
+    assert reopened.etag_salt == salt
+    assert reopened.count_tasks_by_status()[TaskStatus.TODO] == 1
+    reopened.close()
+
+def test_status_counts_match_in_memory_backend(sqlite_db):
+    """Test that trigger-kept counts match the in-memory store and a full scan"""
+    memory = Database()
+    for db in (memory, sqlite_db):
+        populate(db)
+        db.create_tasks(3, [{"title": "Bulk", "status": TaskStatus.DONE}] * 3)
+        db.update_tasks([(3, {"status": TaskStatus.TODO}), (5, {"status": TaskStatus.IN_PROGRESS})])
+        db.delete_tasks([6])
+    
+    assert sqlite_db.count_tasks_by_user() == memory.count_tasks_by_user()
+    assert sqlite_db.count_tasks_by_status() == memory.count_tasks_by_status()
+    for user_id in (1, 2, 3, 4):
+        assert sqlite_db.count_tasks_by_status(user_id) == memory.count_tasks_by_status(user_id)
+    scanned = dict.fromkeys(TaskStatus, 0)
+    for task in sqlite_db.get_all_tasks():
+        scanned[task.status] += 1
+    assert sqlite_db.count_tasks_by_status() == scanned
+
+def test_listeners_match_in_memory_backend(sqlite_db):
+    """Test that both backends report the same successful writes"""
+    events = {}
+    for db in (Database(), sqlite_db):
+        seen = events[db] = []
+        db.add_listener(lambda event, task: seen.append((event, task.id, task.user_id, task.version)))
+        populate(db)
+        db.update_task(99, title="Missing")
+        db.delete_task(99)
+        db.create_tasks(3, [{"title": "Bulk", "description": None, "status": TaskStatus.TODO}])
+        db.update_tasks([(1, {"title": "Bulk edit"})])
+        db.delete_tasks([3, 99])
+    assert list(events.values())[0] == list(events.values())[1]
+
+def test_changes_match_in_memory_backend(sqlite_db):
+    """Test that both backends report the same changes, in the same order, page by page"""
+    changes = {}
+    for db in (Database(), sqlite_db):
+        start = (db.create_task(1, "First", None, TaskStatus.TODO).created_ts, 0)
+        populate(db)
+        db.create_tasks(1, [{"title": "Bulk"}] * 3)
+        db.update_tasks([(3, {"title": "Bulk edit"})])
+        db.delete_tasks([6, 99])
+        db.update_task(1, status=TaskStatus.IN_PROGRESS)
+        
+        seen = changes[db] = []
+        after = start
+        while page := db.get_changes(1, after, 3):
+            seen.extend((type(change), change.id) for change in page)
+            after = change_key(page[-1])
+        assert db.get_changes(1, (0, 0)) is None
+    memory, sqlite = changes.values()
+    assert sqlite == memory
+    assert [c for c in sqlite if c[0] is TaskTombstone] == [(TaskTombstone, 2), (TaskTombstone, 6)]
+
+def test_purges_expired_tombstones(sqlite_db, monkeypatch):
+    """Test that deletes purge tombstones older than the retention window"""
+    clock = [1_000_000_000]
+    monkeypatch.setattr("app.sqlite_database.now_us", lambda: clock[0])
+    sqlite_db.tombstone_retention_us = 1_000
+    for i in range(2):
+        task = sqlite_db.create_task(1, f"Task {i}", None, TaskStatus.TODO)
+        sqlite_db.delete_task(task.id)
+        clock[0] += 120 * 1_000_000
+    
+    with sqlite_db._read() as conn:
+        assert conn.execute("SELECT task_id FROM task_tombstones").fetchall() == [(2,)]
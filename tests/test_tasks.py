@@ -1,4 +1,5 @@
 """Test task endpoints"""
+import json
 import pytest
 from fastapi import status
 
@@ -250,3 +251,391 @@ def test_admin_access_all_tasks(client, admin_token, user_token):
     
     assert response.status_code == status.HTTP_200_OK
     assert len(response.json()) > 0
+
+def test_list_tasks_cursor_pagination(client, user_token):
+    """Test keyset pagination with next_cursor"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for i in range(7):
+        client.post("/api/v1/tasks", json={"title": f"Task {i}"}, headers=headers)
+    
+    seen = []
+    response = client.get("/api/v1/tasks?limit=3&sort_by=-title", headers=headers)
+    data = response.json()
+    seen.extend(t["title"] for t in data["tasks"])
+    
+    # A task created mid-pagination must not shift later pages
+    client.post("/api/v1/tasks", json={"title": "Task 0a"}, headers=headers)
+    
+    while data["next_cursor"]:
+        response = client.get(
+            f"/api/v1/tasks?limit=3&sort_by=-title&include_total=false&cursor={data['next_cursor']}",
+            headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] is None
+        seen.extend(t["title"] for t in data["tasks"])
+    
+    assert seen == [f"Task {i}" for i in range(7)]
+
+def test_list_tasks_invalid_cursor(client, user_token):
+    """Test that malformed or mismatched cursors are rejected"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for i in range(3):
+        client.post("/api/v1/tasks", json={"title": f"Task {i}"}, headers=headers)
+    
+    response = client.get("/api/v1/tasks?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    next_cursor = client.get("/api/v1/tasks?limit=1", headers=headers).json()["next_cursor"]
+    response = client.get(f"/api/v1/tasks?sort_by=title&cursor={next_cursor}", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_list_tasks_invalid_sort_field(client, user_token):
+    """Test that unknown sort fields are rejected"""
+    response = client.get(
+        "/api/v1/tasks?sort_by=hashed_password",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_admin_all_tasks_filters_and_ndjson(client, admin_token, user_token):
+    """Test streamed admin listing with filters"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    created = [
+        client.post("/api/v1/tasks", json={"title": f"Task {i}", "status": status_value}, headers=headers).json()
+        for i, status_value in enumerate(["todo", "done", "done"])
+    ]
+    client.post("/api/v1/tasks", json={"title": "Admin task"}, headers=admin_headers)
+    
+    response = client.get("/api/v1/tasks/admin/all", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [t["title"] for t in response.json()] == ["Task 0", "Task 1", "Task 2", "Admin task"]
+    
+    user_id = created[0]["user_id"]
+    response = client.get(
+        f"/api/v1/tasks/admin/all?format=ndjson&status=done&user_id={user_id}",
+        headers=admin_headers
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.strip().split("\n")
+    assert [json.loads(line)["id"] for line in lines] == [created[1]["id"], created[2]["id"]]
+    
+    response = client.get(
+        f"/api/v1/tasks/admin/all?created_after={created[1]['created_at']}",
+        headers=admin_headers
+    )
+    assert [t["title"] for t in response.json()] == ["Task 2", "Admin task"]
+
+def test_admin_all_tasks_requires_admin(client, user_token):
+    """Test that regular users cannot dump all tasks"""
+    response = client.get(
+        "/api/v1/tasks/admin/all",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_batch_create_tasks(client, user_token):
+    """Test creating tasks in bulk with per-item validation errors"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.post(
+        "/api/v1/tasks/batch",
+        json={"tasks": [{"title": "First"}, {"title": ""}, {"title": "Third", "status": "done"}]},
+        headers=headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert data["failed"] == 1
+    first, invalid, third = data["results"]
+    assert first["status_code"] == 201 and first["task"]["title"] == "First"
+    assert invalid["status_code"] == 422
+    assert invalid["error"]["code"] == "VALIDATION_ERROR"
+    assert "title" in invalid["error"]["message"]
+    assert third["task"]["status"] == "done"
+    
+    response = client.get("/api/v1/tasks", headers=headers)
+    assert response.json()["total"] == 2
+
+def test_batch_update_and_delete_tasks(client, user_token, admin_token):
+    """Test bulk update and delete with missing and foreign tasks"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    own = [client.post("/api/v1/tasks", json={"title": f"Task {i}"}, headers=headers).json()["id"] for i in range(2)]
+    foreign = client.post("/api/v1/tasks", json={"title": "Admin task"}, headers=admin_headers).json()["id"]
+    
+    response = client.patch(
+        "/api/v1/tasks/batch",
+        json={"tasks": [
+            {"id": own[0], "status": "done"},
+            {"id": foreign, "title": "Hijacked"},
+            {"id": 99999, "title": "Missing"},
+            {"title": "No id"}
+        ]},
+        headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    codes = [result["status_code"] for result in response.json()["results"]]
+    assert codes == [200, 403, 404, 422]
+    assert response.json()["results"][0]["task"]["status"] == "done"
+    assert client.get(f"/api/v1/tasks/{foreign}", headers=admin_headers).json()["title"] == "Admin task"
+    
+    response = client.request(
+        "DELETE", "/api/v1/tasks/batch", json={"ids": [own[1], own[1], foreign]}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    codes = [result["status_code"] for result in response.json()["results"]]
+    assert codes == [204, 404, 403]
+    assert response.json()["succeeded"] == 1
+    assert client.get(f"/api/v1/tasks/{own[1]}", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+def test_batch_size_limit(client, user_token):
+    """Test that empty and oversized batches are rejected"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.post("/api/v1/tasks/batch", json={"tasks": []}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    
+    response = client.request("DELETE", "/api/v1/tasks/batch", json={"ids": list(range(10000))}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+def test_conditional_get_task(client, user_token):
+    """Test ETag and If-None-Match on a single task"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    task_id = client.post("/api/v1/tasks", json={"title": "Cached"}, headers=headers).json()["id"]
+    
+    response = client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    etag = response.headers["ETag"]
+    
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    
+    client.patch(f"/api/v1/tasks/{task_id}", json={"status": "done"}, headers=headers)
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+def test_conditional_list_tasks(client, user_token):
+    """Test that list ETags change with the collection and the query"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post("/api/v1/tasks", json={"title": "One"}, headers=headers)
+    
+    etag = client.get("/api/v1/tasks", headers=headers).headers["ETag"]
+    response = client.get("/api/v1/tasks", headers={**headers, "If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    other_query = client.get("/api/v1/tasks?limit=5", headers=headers).headers["ETag"]
+    assert other_query != etag
+    
+    client.post("/api/v1/tasks", json={"title": "Two"}, headers=headers)
+    response = client.get("/api/v1/tasks", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["total"] == 2
+
+def test_list_tasks_response_cache(client, user_token):
+    """Test that list pages are served from the cache until the user writes"""
+    from app.cache import list_cache
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post("/api/v1/tasks", json={"title": "One"}, headers=headers)
+    
+    hits = list_cache.stats()["hits"]
+    first = client.get("/api/v1/tasks", headers=headers)
+    second = client.get("/api/v1/tasks", headers=headers)
+    assert list_cache.stats()["hits"] == hits + 1
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["content-type"] == "application/json"
+    
+    client.post("/api/v1/tasks", json={"title": "Two"}, headers=headers)
+    response = client.get("/api/v1/tasks", headers=headers)
+    assert list_cache.stats()["hits"] == hits + 1
+    assert response.json()["total"] == 2
+    
+    stats = client.get("/health/detailed").json()["list_cache"]
+    assert stats["hits"] >= 1 and stats["entries"] >= 1
+
+def test_sparse_fieldsets(client, user_token, admin_token):
+    """Test that fields projects list, single and admin responses"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    task_id = client.post("/api/v1/tasks", json={"title": "Dash", "description": "x" * 500}, headers=headers).json()["id"]
+    
+    full = client.get("/api/v1/tasks", headers=headers)
+    response = client.get("/api/v1/tasks?fields=id,title,status", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["tasks"] == [{"title": "Dash", "status": "todo", "id": task_id}]
+    assert response.json()["total"] == 1
+    assert response.headers["ETag"] != full.headers["ETag"]
+    
+    response = client.get(f"/api/v1/tasks/{task_id}?fields=status", headers=headers)
+    assert response.json() == {"status": "todo"}
+    
+    # A cached projection must not validate the full task, nor another projection
+    projected_etag = response.headers["ETag"]
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": projected_etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["description"] == "x" * 500
+    assert response.headers["ETag"] != projected_etag
+    response = client.get(f"/api/v1/tasks/{task_id}?fields=title", headers={**headers, "If-None-Match": projected_etag})
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(f"/api/v1/tasks/{task_id}?fields=status,status", headers={**headers, "If-None-Match": projected_etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get("/api/v1/tasks/admin/all?fields=id,user_id", headers=admin_headers)
+    assert all(set(task) == {"id", "user_id"} for task in response.json())
+    response = client.get("/api/v1/tasks/admin/all?fields=title&format=ndjson", headers=admin_headers)
+    assert response.text == '{"title":"Dash"}\n'
+    
+    for url in ("/api/v1/tasks?fields=id,password", f"/api/v1/tasks/{task_id}?fields=", "/api/v1/tasks/admin/all?fields=nope"):
+        response = client.get(url, headers=admin_headers if "admin" in url else headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "allowed" in response.json()["error"]["message"]
+
+def test_search_tasks(client, user_token, admin_token):
+    """Test that search ranks, paginates and only sees the user's tasks"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for title, description in (("Write docs", None), ("Release", "update the documentation"), ("Chores", None)):
+        client.post("/api/v1/tasks", json={"title": title, "description": description}, headers=headers)
+    client.post("/api/v1/tasks", json={"title": "Admin docs"}, headers={"Authorization": f"Bearer {admin_token}"})
+    
+    response = client.get("/api/v1/tasks/search?q=doc&fields=title", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["tasks"] == [{"title": "Write docs"}, {"title": "Release"}]
+    assert data["total"] == 2
+    
+    response = client.get("/api/v1/tasks/search?q=doc&skip=1&limit=1", headers=headers)
+    assert [task["title"] for task in response.json()["tasks"]] == ["Release"]
+    
+    etag = response.headers["ETag"]
+    response = client.get("/api/v1/tasks/search?q=doc&skip=1&limit=1", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    for query in ("q=", "q=%21%21", "q=doc&fields=nope"):
+        response = client.get(f"/api/v1/tasks/search?{query}", headers=headers)
+        assert response.status_code in (status.HTTP_400_BAD_REQUEST, status.HTTP_422_UNPROCESSABLE_CONTENT)
+
+def test_task_stats(client, user_token, admin_token):
+    """Test the user and admin status counts"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    for task_status in ("todo", "todo", "done"):
+        client.post("/api/v1/tasks", json={"title": "Task", "status": task_status}, headers=headers)
+    client.post("/api/v1/tasks", json={"title": "Admin task"}, headers=admin_headers)
+    
+    response = client.get("/api/v1/tasks/stats", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"total": 3, "by_status": {"todo": 2, "in_progress": 0, "done": 1}}
+    
+    response = client.get("/api/v1/tasks/admin/stats", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    data = client.get("/api/v1/tasks/admin/stats", headers=admin_headers).json()
+    assert data["total"] == 4
+    assert data["by_status"] == {"todo": 3, "in_progress": 0, "done": 1}
+    assert [(user["user_id"], user["total"]) for user in data["users"]] == [(1, 1), (2, 3)]
+    
+    data = client.get("/api/v1/tasks/admin/stats?user_id=2", headers=admin_headers).json()
+    assert data["users"] == [{"total": 3, "by_status": {"todo": 2, "in_progress": 0, "done": 1}, "user_id": 2}]
+
+def test_task_changes_delta_sync(client, user_token):
+    """Test syncing created, updated and deleted tasks with since and cursors"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    first = client.post("/api/v1/tasks", json={"title": "First"}, headers=headers).json()
+    second = client.post("/api/v1/tasks", json={"title": "Second"}, headers=headers).json()
+    
+    response = client.get(f"/api/v1/tasks/changes?since={first['created_at']}&limit=1", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert ([t["id"] for t in data["tasks"]], data["deleted"], data["has_more"]) == ([first["id"]], [], True)
+    data = client.get(f"/api/v1/tasks/changes?cursor={data['next_cursor']}&limit=1", headers=headers).json()
+    assert ([t["id"] for t in data["tasks"]], data["has_more"]) == ([second["id"]], False)
+    cursor = data["next_cursor"]
+    
+    # Nothing new: the same cursor comes back
+    data = client.get(f"/api/v1/tasks/changes?cursor={cursor}", headers=headers).json()
+    assert (data["tasks"], data["deleted"], data["next_cursor"]) == ([], [], cursor)
+    
+    client.delete(f"/api/v1/tasks/{first['id']}", headers=headers)
+    client.patch(f"/api/v1/tasks/{second['id']}", json={"status": "done"}, headers=headers)
+    data = client.get(f"/api/v1/tasks/changes?cursor={cursor}", headers=headers).json()
+    assert [(t["id"], t["status"]) for t in data["tasks"]] == [(second["id"], "done")]
+    assert [t["id"] for t in data["deleted"]] == [first["id"]]
+    assert data["deleted"][0]["deleted_at"] <= data["tasks"][0]["updated_at"]
+    
+    for query in ("", f"since={first['created_at']}&cursor={cursor}", "cursor=garbage"):
+        response = client.get(f"/api/v1/tasks/changes?{query}", headers=headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    # Older than the tombstone retention window: deletions may be lost
+    response = client.get("/api/v1/tasks/changes?since=2000-01-01T00:00:00", headers=headers)
+    assert response.status_code == status.HTTP_410_GONE
+    assert response.json()["error"]["code"] == "SYNC_EXPIRED"
+
+def test_import_tasks(client, admin_token, user_token):
+    """Test bulk imports from streamed NDJSON and CSV bodies"""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    
+    def body():
+        # Records split across chunks, as a real upload would be
+        yield b'{"title": "Imported 1", "status": "done"}\n{"title": "Impor'
+        yield b'ted 2", "user_id": 2}\n{"title": ""}\n{"title": "Nobody\'s", "user_id": 99}\n'
+    
+    response = client.post("/api/v1/tasks/import", content=body(),
+                           headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["state"], data["format"], data["records"], data["imported"], data["failed"]) == (
+        "completed", "ndjson", 4, 2, 2
+    )
+    assert [error["line"] for error in data["errors"]] == [3, 4]
+    assert "not found" in data["errors"][1]["error"]
+    
+    user_headers = {"Authorization": f"Bearer {user_token}"}
+    titles = [t["title"] for t in client.get("/api/v1/tasks", headers=user_headers).json()["tasks"]]
+    assert titles == ["Imported 2"]
+    
+    csv_body = b'title,status,description\r\nFrom CSV,in_progress,"a\r\nb"\r\nSecond,,\r\n'
+    response = client.post("/api/v1/tasks/import?user_id=2", content=csv_body,
+                           headers={**headers, "Content-Type": "text/csv"})
+    assert (response.json()["format"], response.json()["imported"]) == ("csv", 2)
+    tasks = client.get("/api/v1/tasks?sort_by=-created_at", headers=user_headers).json()["tasks"]
+    assert [(t["title"], t["status"], t["description"]) for t in tasks] == [
+        ("Imported 2", "todo", None), ("From CSV", "in_progress", "a\nb"), ("Second", "todo", None)
+    ]
+    
+    response = client.post("/api/v1/tasks/import?format=csv", content=b"name\nx\n", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    imports = client.get("/api/v1/tasks/imports", headers=headers).json()
+    assert [(job["format"], job["state"]) for job in imports[:3]] == [
+        ("csv", "failed"), ("csv", "completed"), ("ndjson", "completed")
+    ]
+    assert client.post("/api/v1/tasks/import", content=b"", headers=user_headers).status_code == 403
+    assert client.get("/api/v1/tasks/imports", headers=user_headers).status_code == 403
+
+def test_if_match_optimistic_concurrency(client, user_token):
+    """Test that writes with a stale If-Match fail with 412"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.post("/api/v1/tasks", json={"title": "Shared"}, headers=headers)
+    task_id, etag = response.json()["id"], response.headers["ETag"]
+    
+    response = client.put(
+        f"/api/v1/tasks/{task_id}", json={"title": "First writer"}, headers={**headers, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    new_etag = response.headers["ETag"]
+    
+    for method, body in (("PUT", {"title": "Second"}), ("PATCH", {"status": "done"}), ("DELETE", None)):
+        response = client.request(method, f"/api/v1/tasks/{task_id}", json=body, headers={**headers, "If-Match": etag})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert response.json()["error"]["code"] == "PRECONDITION_FAILED"
+    
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).json()["title"] == "First writer"
+    response = client.delete(f"/api/v1/tasks/{task_id}", headers={**headers, "If-Match": new_etag})
+    assert response.status_code == status.HTTP_204_NO_CONTENT